@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Async Mail Cleanup Engine
+Runs several search -> select -> action jobs in parallel tabs of one Chrome
+context (attached over CDP), with a concurrency limit.
+
+Usage:
+    python async_mail_engine.py gmail delete "from:a@example.com" "from:b@example.com"
+    python async_mail_engine.py yahoo spam "from:skyscanner" --concurrency 4
+    python async_mail_engine.py gmail delete "from:a@example.com" --batched
+"""
+
+import argparse
+import asyncio
+import time
+
+from playwright.async_api import async_playwright
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from batch_actions import run_batched_action_async
+from browser_broker import CDP_URL
+from browser_waits import PROBE_JS, WAIT_LIST_CHANGE_JS, messages_affected
+from mail_providers import get_provider, get_action_selectors
+from request_blocker import install_request_blocking_async, print_blocking_report
+from step_trace import print_step, span, annotate
+
+DEFAULT_CONCURRENCY = 4
+STEP_TIMEOUT_MS = 15000
+SELECT_MORE_TIMEOUT_MS = 1500
+REFRESH_TIMEOUT_MS = 10000
+
+# Best effort: let the action's request go out before the tab closes
+SETTLE_TIMEOUT_MS = 3000
+
+async def click_first(page, selectors, timeout_ms):
+    """Wait until any selector is visible, then click the first one present"""
+    await page.wait_for_selector(', '.join(selectors), state='visible', timeout=timeout_ms)
+    for selector in selectors:
+        element = await page.query_selector(selector)
+        if element:
+            await element.click()
+            return selector
+    return None
+
+async def probe(page, config):
+    """Async counterpart of browser_waits.probe_counts()"""
+    return await page.evaluate(PROBE_JS, [config['row_selector'], config['count_selector']])
+
+async def settle(page):
+    """Give in-flight requests a moment to finish; Gmail never goes fully idle"""
+    try:
+        await page.wait_for_load_state('networkidle', timeout=SETTLE_TIMEOUT_MS)
+    except PlaywrightTimeoutError:
+        pass
+
+async def run_job(context, semaphore, provider, action, query, timeout_ms=STEP_TIMEOUT_MS,
+                  batched=False):
+    """Run one cleanup job in its own tab and return a result dict.
+
+    The job only counts as ok once the message list visibly changed after
+    the action, and the tab is kept open until the action's request had a
+    chance to complete.
+    """
+    config = get_provider(provider)
+    action_selectors = get_action_selectors(provider, action)
+    result = {'provider': provider, 'action': action, 'query': query, 'ok': False}
+
+    async with semaphore:
+        start = time.monotonic()
+        page = await context.new_page()
+        try:
+            with span("search", provider=provider, query=query):
+                await page.goto(config['search_url'](query), wait_until='domcontentloaded')
+                await page.wait_for_selector(f"{config['row_selector']}, {config['empty_selector']}",
+                                             state='visible', timeout=timeout_ms)
+                before = await probe(page, config)
+                if not before['rows']:
+                    result.update(ok=True, affected=0)
+                    print_step(action.upper(), f"{provider}: {query} - no matching messages", "info")
+                    return result
+
+            if batched:
+                # Whole select + action sequence in one in-page script
+                with span("action", provider=provider, mode='batched'):
+                    batch = await run_batched_action_async(page, provider, action)
+                if not batch['ok']:
+                    raise RuntimeError(f"batched action failed at {batch['failedStep']}")
+                result['selected_all_matching'] = batch['selectMore'] >= 0
+                result['selector'] = batch['selector']
+                with span("verify", provider=provider) as entry:
+                    result['affected'] = messages_affected(before, await probe(page, config))
+                    entry['affected'] = result['affected']
+                    if not result['affected']:
+                        raise RuntimeError("the message list did not change after the action")
+                    await settle(page)
+                result['ok'] = True
+                print_step(action.upper(), f"{provider}: {query}: {result['affected']} messages (batched)",
+                           "success")
+                return result
+
+            with span("select", provider=provider):
+                selector = await click_first(page, config['select_all'], timeout_ms)
+                if not selector:
+                    raise RuntimeError("select all checkbox not found")
+                annotate(selector=selector)
+
+                try:
+                    more = await page.wait_for_selector(config['select_more'], state='visible',
+                                                        timeout=SELECT_MORE_TIMEOUT_MS)
+                    await more.click()
+                    result['selected_all_matching'] = True
+                except PlaywrightTimeoutError:
+                    result['selected_all_matching'] = False
+
+            with span("action", provider=provider):
+                result['selector'] = await click_first(page, action_selectors, timeout_ms)
+                if not result['selector']:
+                    raise RuntimeError(f"{action} button not found")
+                annotate(selector=result['selector'])
+
+            # Same check as the sync runner: the list must refresh before we trust it
+            with span("verify", provider=provider) as entry:
+                try:
+                    await page.wait_for_function(
+                        WAIT_LIST_CHANGE_JS,
+                        arg=[config['row_selector'], config['count_selector'], before],
+                        timeout=REFRESH_TIMEOUT_MS)
+                except PlaywrightTimeoutError:
+                    raise RuntimeError("the message list did not change after the action")
+                result['affected'] = messages_affected(before, await probe(page, config))
+                entry['affected'] = result['affected']
+                await settle(page)
+
+            result['ok'] = True
+            print_step(action.upper(), f"{provider}: {query}: {result['affected']} messages", "success")
+        except Exception as e:
+            result['error'] = str(e)
+            print_step(action.upper(), f"{provider}: {query} failed: {e}", "info")
+        finally:
+            result['seconds'] = time.monotonic() - start
+            await page.close()
+
+    return result
+
+async def run_jobs(jobs, concurrency=DEFAULT_CONCURRENCY, cdp_url=CDP_URL, batched=False):
+    """Run (provider, action, query) jobs concurrently in one browser context"""
+    async with async_playwright() as p:
+        with span("cdp connect"):
+            browser = await p.chromium.connect_over_cdp(cdp_url)
+        print_step("BROWSER", f"Connected to Chrome at {cdp_url}", "success")
+
+        contexts = browser.contexts
+        context = contexts[0] if contexts else await browser.new_context()
+        block_stats = await install_request_blocking_async(context)
+
+        semaphore = asyncio.Semaphore(concurrency)
+        results = await asyncio.gather(*[
+            run_job(context, semaphore, provider, action, query, batched=batched)
+            for provider, action, query in jobs
+        ])
+
+        print_blocking_report(block_stats)
+
+        try:
+            await browser.close()
+        except Exception:
+            pass
+
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Run mail cleanup jobs in parallel tabs")
+    parser.add_argument('provider', choices=['gmail', 'yahoo'])
+    parser.add_argument('action', choices=['delete', 'spam'])
+    parser.add_argument('queries', nargs='+', help="search queries, one job each")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument('--cdp-url', default=CDP_URL)
+    parser.add_argument('--batched', action='store_true', help="run select + action as one in-page script")
+    args = parser.parse_args()
+
+    jobs = [(args.provider, args.action, q) for q in args.queries]
+    print_step("ENGINE", f"{len(jobs)} jobs, concurrency {args.concurrency}", "work")
+
+    start = time.monotonic()
+    results = asyncio.run(run_jobs(jobs, args.concurrency, args.cdp_url, args.batched))
+    wall = time.monotonic() - start
+
+    ok = sum(1 for r in results if r['ok'])
+    serial = sum(r['seconds'] for r in results)
+    print("\n" + "="*60)
+    print(f"✅ {ok}/{len(results)} jobs succeeded")
+    print(f"⏱️  Wall time {wall:.1f}s (sum of job times {serial:.1f}s)")
+    print("="*60)
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Automation interrupted by user")
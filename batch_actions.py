@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+In-Page Batched Actions
+Runs the whole select all -> "select all conversations" -> delete/spam
+sequence inside the page with a single page.evaluate(), instead of a
+query + click round trip per step. Between steps the script waits on DOM
+mutations in the page and it returns one structured result.
+
+Selectors are passed in learned order (selector_resolver) and the winners
+are fed back into the same hit table.
+"""
+
+import time
+
+from browser_waits import LIST_SIGNATURE_JS, record_wait
+from mail_providers import get_provider, get_action_selectors
+from selector_resolver import MATCH_JS, site_of, rank_selectors, record_result
+
+SELECT_ALL_TIMEOUT_MS = 5000
+SELECT_MORE_TIMEOUT_MS = 1500
+ACTION_TIMEOUT_MS = 5000
+REFRESH_TIMEOUT_MS = 10000
+
+# Takes {rowSelector, selectAll, selectMore, action, timeouts} and returns
+# {ok, failedStep, selectAll, selectMore, action, rowsBefore, rowsAfter,
+# refreshed, ms}. selectAll/selectMore/action are indexes into the lists.
+BATCH_ACTION_JS = """
+async (args) => {
+    const visible = (el) => !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+    const match = """ + MATCH_JS.strip() + """;
+    const find = (selectors) => {
+        for (let i = 0; i < selectors.length; i++) {
+            const el = match(selectors[i]).find(visible);
+            if (el) return {index: i, el};
+        }
+        return null;
+    };
+    const waitFor = (check, timeout) => new Promise((resolve) => {
+        const first = check();
+        if (first) return resolve(first);
+        const observer = new MutationObserver(() => {
+            const hit = check();
+            if (hit) {
+                observer.disconnect();
+                clearTimeout(timer);
+                resolve(hit);
+            }
+        });
+        const timer = setTimeout(() => { observer.disconnect(); resolve(null); }, timeout);
+        observer.observe(document.body, {childList: true, subtree: true, attributes: true});
+    });
+    // Gmail's toolbar reacts to mousedown/mouseup, not just click()
+    const press = (el) => {
+        for (const type of ['mousedown', 'mouseup', 'click']) {
+            el.dispatchEvent(new MouseEvent(type, {bubbles: true, cancelable: true, view: window}));
+        }
+    };
+    const rows = () => document.querySelectorAll(args.rowSelector).length;
+    const signature = () => (""" + LIST_SIGNATURE_JS.strip() + """)(args.rowSelector);
+
+    const result = {ok: false, failedStep: null, selectAll: -1, selectMore: -1, action: -1,
+                    rowsBefore: rows(), rowsAfter: null, refreshed: false, ms: {}};
+    let t = performance.now();
+    const lap = (step) => { const now = performance.now(); result.ms[step] = Math.round(now - t); t = now; };
+
+    const selectAll = await waitFor(() => find(args.selectAll), args.timeouts.selectAll);
+    lap('select_all');
+    if (!selectAll) { result.failedStep = 'select_all'; return result; }
+    result.selectAll = selectAll.index;
+    press(selectAll.el);
+
+    // The action button only shows up once the selection took
+    const action = await waitFor(() => find(args.action), args.timeouts.action);
+    lap('action_ready');
+    if (!action) { result.failedStep = 'action'; return result; }
+
+    const more = await waitFor(() => find(args.selectMore), args.timeouts.selectMore);
+    lap('select_more');
+    if (more) {
+        result.selectMore = more.index;
+        press(more.el);
+    }
+
+    const before = rows();
+    const beforeSignature = signature();
+    result.rowsBefore = before;
+    const button = find(args.action) || action;
+    result.action = button.index;
+    press(button.el);
+
+    // A list that refills to the same row count still shows different rows
+    result.refreshed = !!(await waitFor(() => rows() !== before || signature() !== beforeSignature,
+                                        args.timeouts.refresh));
+    lap('refresh');
+    result.rowsAfter = rows();
+    result.ok = true;
+    return result;
+}
+"""
+
+def batch_args(page, provider, action):
+    """Evaluate arguments with every selector list in learned order"""
+    config = get_provider(provider)
+    site = site_of(page)
+    return {
+        'rowSelector': config['row_selector'],
+        'selectAll': rank_selectors(site, "select_all", config['select_all']),
+        'selectMore': [config['select_more']],
+        'action': rank_selectors(site, action, get_action_selectors(provider, action)),
+        'timeouts': {
+            'selectAll': SELECT_ALL_TIMEOUT_MS,
+            'selectMore': SELECT_MORE_TIMEOUT_MS,
+            'action': ACTION_TIMEOUT_MS,
+            'refresh': REFRESH_TIMEOUT_MS,
+        },
+    }
+
+def record_batch(page, action, args, result, started):
+    """Feed the winning selectors back to the hit table and log the timing"""
+    site = site_of(page)
+    for key, step, failed in (("select_all", 'selectAll', 'select_all'), (action, 'action', 'action')):
+        index = result[step]
+        if index >= 0:
+            record_result(site, key, args[step][:index + 1], args[step][index])
+        elif result['failedStep'] == failed:
+            record_result(site, key, args[step], None)
+    result['selector'] = args['action'][result['action']] if result['action'] >= 0 else None
+    record_wait(f"batched {action}", started, result['ok'], REFRESH_TIMEOUT_MS / 1000)
+    return result
+
+def run_batched_action(page, provider, action):
+    """Run select all + action in one round trip; returns the result dict"""
+    started = time.monotonic()
+    args = batch_args(page, provider, action)
+    result = page.evaluate(BATCH_ACTION_JS, args)
+    return record_batch(page, action, args, result, started)
+
+async def run_batched_action_async(page, provider, action):
+    """Async-API variant of run_batched_action()"""
+    started = time.monotonic()
+    args = batch_args(page, provider, action)
+    result = await page.evaluate(BATCH_ACTION_JS, args)
+    return record_batch(page, action, args, result, started)
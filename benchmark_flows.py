@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Cleanup Flow Benchmark
+Drives the real cleanup_runner flows headless against the local mock
+mailboxes (mock_mailbox.py) and reports per-step latency and messages per
+second for several mailbox sizes.
+
+The real mail.google.com / mail.yahoo.com URLs are routed to the mock, so
+the flows, selectors and provider table run unchanged. Selector stats,
+step timings and cleanup marks go to a temporary directory so a benchmark
+never touches the real ones in ~/ali.
+
+Besides the cleanup_runner modes, two scenarios call the standalone
+scripts' own functions directly (select_all_emails, then delete_emails for
+Gmail or mark_as_spam for Yahoo): "flow" at every size, and "refill", a
+page-by-page run where every action refills the list, to the same row
+count or, on a trailing part page, partly. Each pass's reported message count is checked against what the mock
+actually removed.
+
+Before any browser work the message accounting (browser_waits
+messages_affected) is checked against canned probes, including a list that
+refills to the same row count; --check-only stops after that.
+
+Usage:
+    python benchmark_flows.py                              # both providers, 100/10k/100k
+    python benchmark_flows.py --check-only
+    python benchmark_flows.py --provider gmail --mode batched --mode keyboard
+    python benchmark_flows.py --mode flow --mode refill
+    python benchmark_flows.py --sizes 100 1000 --no-select-more --json results.json
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+from urllib.parse import urlparse
+
+from playwright.sync_api import sync_playwright
+
+import browser_waits
+import cleanup_state
+import gmail_delete_final
+import mock_mailbox
+import selector_resolver
+import step_trace
+import yahoo_mail_automation
+from cleanup_runner import run_rule
+from mail_providers import PROVIDERS
+
+SIZES = [100, 10000, 100000]
+
+# (description, before probe, after probe, messages the action removed)
+ACCOUNTING_CASES = [
+    ("same-count refill, no total",
+     {'rows': 50, 'total': None, 'signature': "Deal #1000\nDeal #951"},
+     {'rows': 50, 'total': None, 'signature': "Deal #950\nDeal #901"}, 50),
+    ("same-count refill, total shown",
+     {'rows': 50, 'total': 1000, 'signature': "Deal #1000\nDeal #951"},
+     {'rows': 50, 'total': 950, 'signature': "Deal #950\nDeal #901"}, 50),
+    ("partial refill, no total",
+     {'rows': 50, 'total': None, 'signature': "Deal #70\nDeal #21"},
+     {'rows': 20, 'total': None, 'signature': "Deal #20\nDeal #1"}, 50),
+    ("last partial page",
+     {'rows': 30, 'total': None, 'signature': "Deal #30\nDeal #1"},
+     {'rows': 0, 'total': None, 'signature': ""}, 30),
+    ("select all conversations",
+     {'rows': 50, 'total': 5000, 'signature': "Deal #5000\nDeal #4951"},
+     {'rows': 0, 'total': None, 'signature': ""}, 5000),
+    ("nothing happened",
+     {'rows': 50, 'total': None, 'signature': "Deal #1000\nDeal #951"},
+     {'rows': 50, 'total': None, 'signature': "Deal #1000\nDeal #951"}, 0),
+]
+MODES = ['selector', 'batched', 'keyboard']
+SCENARIOS = ['flow', 'refill']
+ACTIONS = {'gmail': 'delete', 'yahoo': 'spam'}
+QUERY = "from:skyscanner"
+
+# The standalone scripts' own (select, action) functions per provider
+FLOWS = {
+    'gmail': (gmail_delete_final.select_all_emails, gmail_delete_final.delete_emails),
+    'yahoo': (yahoo_mail_automation.select_all_emails, yahoo_mail_automation.mark_as_spam),
+}
+
+# Mailbox sizes in the refill scenario, in pages: whole pages refill the
+# list to the same row count, a trailing part page refills it partly
+REFILL_PAGES = [3, 1.4]
+
+def isolate_state(directory):
+    """Point every persisted stats/state file at a scratch directory"""
+    directory = Path(directory)
+    step_trace.TRACE_FILE = directory / "step_traces.jsonl"
+    cleanup_state.STATE_FILE = directory / "cleanup_state.json"
+    selector_resolver.SELECTOR_STATS_FILE = directory / "selector_stats.json"
+    selector_resolver._stats = None
+
+def check_accounting():
+    """Run ACCOUNTING_CASES through messages_affected(); returns the failures"""
+    failures = []
+    for name, before, after, expected in ACCOUNTING_CASES:
+        got = browser_waits.messages_affected(before, after)
+        if got != expected:
+            failures.append(f"{name}: expected {expected}, got {got}")
+    return failures
+
+def route_to_mock(context, base_url):
+    """Serve the real mail origins from the mock server"""
+    for provider, config in PROVIDERS.items():
+        def handle(route, request, provider=provider):
+            url = urlparse(request.url)
+            path = url.path + (f"?{url.query}" if url.query else "")
+            forwarded = urllib.request.Request(
+                base_url + path,
+                data=request.post_data_buffer,
+                method=request.method,
+                headers={'Content-Type': request.headers.get('content-type', 'text/plain'),
+                         'X-Mock-Provider': provider},
+            )
+            with urllib.request.urlopen(forwarded) as response:
+                route.fulfill(status=response.status,
+                              headers={'Content-Type': response.headers['Content-Type']},
+                              body=response.read())
+        context.route(f"{config['origin']}/**", handle)
+
+def step_summary(timings):
+    """{step: (count, total seconds)} from browser_waits records"""
+    steps = {}
+    for entry in timings:
+        count, total = steps.get(entry['step'], (0, 0.0))
+        steps[entry['step']] = (count + 1, total + entry['seconds'])
+    return steps
+
+def run_case(context, provider, mode, messages):
+    """Clean one mock mailbox of `messages` messages; returns a result dict"""
+    mock_mailbox.reset(provider, messages)
+    rule = {'name': f"bench-{provider}-{mode}-{messages}", 'provider': provider,
+            'action': ACTIONS[provider], 'query': QUERY, 'incremental': False}
+
+    page = context.new_page()
+    browser_waits.STEP_TIMINGS.clear()
+    start = time.monotonic()
+    try:
+        status = run_rule(page, rule, full=True, mode=mode)
+    finally:
+        page.close()
+    seconds = time.monotonic() - start
+
+    left = mock_mailbox.MAILBOX[provider]
+    return {
+        'provider': provider,
+        'mode': mode,
+        'messages': messages,
+        'status': status,
+        'left': left,
+        'seconds': round(seconds, 3),
+        'msgs_per_sec': round((messages - left) / seconds, 1) if seconds else 0.0,
+        'steps': {step: {'count': count, 'seconds': round(total, 3)}
+                  for step, (count, total) in step_summary(browser_waits.STEP_TIMINGS).items()},
+    }
+
+def run_flow_case(context, provider, messages, mode='flow'):
+    """Clean one mock mailbox through the script's select/action functions.
+
+    Passes repeat until the mailbox is empty or a pass fails. The count each
+    action reports (its "verify" span) must match what the mock removed;
+    mismatches are returned in the result.
+    """
+    select_all, act = FLOWS[provider]
+    config = PROVIDERS[provider]
+    mock_mailbox.reset(provider, messages)
+
+    verified = []
+    def collect(entry):
+        if entry['step'] == 'verify':
+            verified.append(entry)
+    step_trace.STEP_HOOKS.append(collect)
+
+    page = context.new_page()
+    browser_waits.STEP_TIMINGS.clear()
+    status, passes, mismatches = 'done', 0, []
+    start = time.monotonic()
+    try:
+        page.goto(config['search_url'](QUERY), wait_until='domcontentloaded')
+        browser_waits.wait_for_visible(page, f"{config['row_selector']}, {config['empty_selector']}",
+                                       "search results", timeout=15)
+        while mock_mailbox.MAILBOX[provider]:
+            passes += 1
+            before = mock_mailbox.MAILBOX[provider]
+            verified.clear()
+            # The action returns None when its button was not found, False
+            # when it clicked but nothing moved
+            moved = act(page) if select_all(page) else None
+            removed = before - mock_mailbox.MAILBOX[provider]
+            reported = verified[-1].get('affected', 0) if verified else 0
+            if reported != removed:
+                mismatches.append(f"pass {passes}: reported {reported}, mock removed {removed}")
+            if not moved:
+                status = 'not found' if moved is None else 'stalled'
+                break
+    finally:
+        step_trace.STEP_HOOKS.remove(collect)
+        page.close()
+    seconds = time.monotonic() - start
+
+    left = mock_mailbox.MAILBOX[provider]
+    return {
+        'provider': provider,
+        'mode': mode,
+        'messages': messages,
+        'status': status,
+        'left': left,
+        'passes': passes,
+        'mismatches': mismatches,
+        'seconds': round(seconds, 3),
+        'msgs_per_sec': round((messages - left) / seconds, 1) if seconds else 0.0,
+        'steps': {step: {'count': count, 'seconds': round(total, 3)}
+                  for step, (count, total) in step_summary(browser_waits.STEP_TIMINGS).items()},
+    }
+
+def run_refill_cases(context, provider):
+    """Page-by-page flow runs where each action refills the list (REFILL_PAGES sizes)"""
+    select_more = mock_mailbox.SETTINGS['select_more']
+    mock_mailbox.SETTINGS['select_more'] = False
+    try:
+        return [run_flow_case(context, provider, int(pages * mock_mailbox.SETTINGS['page_size']),
+                              mode='refill')
+                for pages in REFILL_PAGES]
+    finally:
+        mock_mailbox.SETTINGS['select_more'] = select_more
+
+def print_results(results):
+    """Per-case throughput table followed by per-step latency"""
+    print("\n" + "=" * 72)
+    print("📊 Benchmark results")
+    print("=" * 72)
+    print(f"{'provider':<8} {'mode':<9} {'messages':>9} {'status':<9} {'seconds':>8} {'msgs/s':>10}")
+    for r in results:
+        print(f"{r['provider']:<8} {r['mode']:<9} {r['messages']:>9} {r['status']:<9} "
+              f"{r['seconds']:>8.2f} {r['msgs_per_sec']:>10.1f}")
+        for mismatch in r.get('mismatches', []):
+            print(f"   ❌ {mismatch}")
+
+    for r in results:
+        print(f"\n⏱️  {r['provider']} / {r['mode']} / {r['messages']} messages")
+        for step, s in sorted(r['steps'].items(), key=lambda item: -item[1]['seconds']):
+            print(f"   {step:<32} {s['count']:>5}x  {s['seconds']:>7.3f}s  "
+                  f"({s['seconds'] / s['count'] * 1000:.0f} ms avg)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cleanup flows against mock mailboxes")
+    parser.add_argument('--provider', action='append', choices=list(PROVIDERS))
+    parser.add_argument('--mode', action='append', choices=MODES + SCENARIOS)
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--page-size', type=int, default=mock_mailbox.DEFAULT_PAGE_SIZE)
+    parser.add_argument('--latency-ms', type=int, default=mock_mailbox.DEFAULT_LATENCY_MS)
+    parser.add_argument('--no-select-more', action='store_true',
+                        help="force page-by-page passes (no 'select all conversations')")
+    parser.add_argument('--headed', action='store_true')
+    parser.add_argument('--json', help="also write the results to this file")
+    parser.add_argument('--check-only', action='store_true', help="only check the message accounting")
+    args = parser.parse_args()
+
+    failures = check_accounting()
+    for failure in failures:
+        print(f"❌ Accounting: {failure}")
+    if failures or args.check_only:
+        if not failures:
+            print(f"✅ Accounting: {len(ACCOUNTING_CASES)} cases ok")
+        return 1 if failures else 0
+
+    providers = args.provider or list(PROVIDERS)
+    modes = args.mode or MODES + SCENARIOS
+
+    isolate_state(tempfile.mkdtemp(prefix="mail-bench-"))
+    server, base_url = mock_mailbox.start_server(page_size=args.page_size,
+                                                 latency_ms=args.latency_ms,
+                                                 select_more=not args.no_select_more)
+    print(f"🚀 Mock mailboxes at {base_url}")
+
+    results = []
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=not args.headed)
+        context = browser.new_context(viewport={'width': 1400, 'height': 900})
+        route_to_mock(context, base_url)
+
+        for provider in providers:
+            for mode in modes:
+                if mode == 'refill':
+                    results.extend(run_refill_cases(context, provider))
+                    continue
+                for messages in args.sizes:
+                    if mode == 'flow':
+                        results.append(run_flow_case(context, provider, messages))
+                    else:
+                        results.append(run_case(context, provider, mode, messages))
+
+        browser.close()
+    server.shutdown()
+
+    print_results(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    return 0 if all(r['status'] == 'done' and r['left'] == 0 and not r.get('mismatches')
+                    for r in results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
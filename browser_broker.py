@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Browser Session Broker
+Keeps one debug-enabled Windows Chrome alive across automation runs.
+Scripts attach to it over CDP, reuse the logged-in context and its open
+tabs, and hand tabs back when done instead of killing and relaunching
+Chrome every run.
+
+Usage:
+    python browser_broker.py start     # launch Chrome if it is not running
+    python browser_broker.py status    # show open tabs and leases
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+from browser_waits import record_wait
+from step_trace import print_step, span
+
+DEBUG_PORT = 9222
+CDP_URL = f"http://localhost:{DEBUG_PORT}"
+CHROME_EXE = 'C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe'
+
+# Dedicated, persistent profile so logins survive between runs and the
+# user's everyday Chrome windows are never touched
+PROFILE_DIR = 'C:\\chrome-automation\\profile'
+
+# Lean automation profile: no background traffic, sync, extensions or
+# component updates competing with the mail tabs, background tabs never
+# throttled, and a disk cache big enough that the mail apps' bundles stay
+# cached between runs (see profile_warmup.py)
+DISK_CACHE_BYTES = 512 * 1024 * 1024
+LEAN_FLAGS = [
+    "--no-first-run",
+    "--no-default-browser-check",
+    "--disable-background-networking",
+    "--disable-sync",
+    "--disable-extensions",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-domain-reliability",
+    "--disable-client-side-phishing-detection",
+    "--disable-breakpad",
+    "--metrics-recording-only",
+    "--disable-background-timer-throttling",
+    "--disable-backgrounding-occluded-windows",
+    "--disable-renderer-backgrounding",
+    "--disable-features=Translate,OptimizationHints,MediaRouter",
+    f"--disk-cache-size={DISK_CACHE_BYTES}",
+]
+
+# Readiness probe: first retry after 10 ms, doubling up to 80 ms between polls
+PROBE_INITIAL_INTERVAL = 0.01
+PROBE_MAX_INTERVAL = 0.08
+PROBE_TIMEOUT = 20
+
+LEASE_FILE = Path.home() / "ali" / "broker_tabs.json"
+
+def debug_endpoint(path, timeout=0.5):
+    """GET a JSON endpoint on the debugging port, or None if unreachable"""
+    try:
+        with urllib.request.urlopen(f"{CDP_URL}{path}", timeout=timeout) as response:
+            return json.loads(response.read().decode())
+    except Exception:
+        return None
+
+def is_browser_running():
+    """True when a browser is answering on the debugging port"""
+    return debug_endpoint("/json/version") is not None
+
+def wait_for_debug_port(timeout=PROBE_TIMEOUT):
+    """Poll /json/version with capped exponential backoff until Chrome answers.
+
+    Returns the seconds it took for the browser to become ready, or None if
+    it did not answer within `timeout`. The latency is also recorded in the
+    step-timing log as "browser ready".
+    """
+    started = time.monotonic()
+    interval = PROBE_INITIAL_INTERVAL
+    while True:
+        if debug_endpoint("/json/version", timeout=0.2) is not None:
+            record_wait("browser ready", started, True, timeout)
+            return time.monotonic() - started
+        if time.monotonic() - started >= timeout:
+            record_wait("browser ready", started, False, timeout)
+            return None
+        time.sleep(interval)
+        interval = min(interval * 2, PROBE_MAX_INTERVAL)
+
+def chrome_args():
+    """Command-line flags for the broker-owned Chrome"""
+    return [
+        f"--remote-debugging-port={DEBUG_PORT}",
+        f"--user-data-dir={PROFILE_DIR}",
+    ] + LEAN_FLAGS
+
+def launch_chrome():
+    """Start the debug Chrome through PowerShell (never kills other Chrome windows)"""
+    arg_list = ','.join(f'"{arg}"' for arg in chrome_args())
+    ps_command = f'Start-Process -FilePath "{CHROME_EXE}" -ArgumentList {arg_list}'
+    subprocess.Popen(['powershell.exe', '-Command', ps_command],
+                     stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+def start_browser():
+    """Launch the broker Chrome unless it is already running; True if it was launched"""
+    if is_browser_running():
+        return False
+
+    print_step("BROWSER", "No broker Chrome running, launching one...", "info")
+    with span("browser launch"):
+        launch_chrome()
+
+        # Connect only once the debugging port answers
+        ready = wait_for_debug_port()
+        if ready is None:
+            raise RuntimeError(f"Chrome did not open port {DEBUG_PORT} within {PROBE_TIMEOUT}s")
+    print_step("BROWSER", f"Browser ready after {ready * 1000:.0f} ms", "success")
+    return True
+
+def ensure_browser(p):
+    """Attach to the broker Chrome, launching it first if needed; returns a Browser"""
+    if start_browser():
+        with span("cdp connect"):
+            browser = p.chromium.connect_over_cdp(CDP_URL)
+        print_step("BROWSER", "Connected to Windows Chrome!", "success")
+        return browser
+
+    start = time.monotonic()
+    with span("cdp connect"):
+        browser = p.chromium.connect_over_cdp(CDP_URL)
+    print_step("BROWSER", f"Attached to running Chrome in {time.monotonic() - start:.2f}s", "success")
+    return browser
+
+def get_context(browser):
+    """The logged-in default context of the broker Chrome"""
+    contexts = browser.contexts
+    if contexts:
+        return contexts[0]
+    return browser.new_context(viewport={'width': 1400, 'height': 900})
+
+# ---------------------------------------------------------------------------
+# Tab leases
+# ---------------------------------------------------------------------------
+
+def _load_leases():
+    try:
+        with open(LEASE_FILE) as f:
+            leases = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    # Drop leases held by processes that no longer exist
+    alive = {}
+    for target_id, lease in leases.items():
+        try:
+            os.kill(lease['pid'], 0)
+            alive[target_id] = lease
+        except (OSError, KeyError):
+            continue
+    return alive
+
+def _save_leases(leases):
+    LEASE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(LEASE_FILE, 'w') as f:
+        json.dump(leases, f, indent=2)
+
+def target_id(page):
+    """CDP target id of a page, stable across attaching processes"""
+    session = page.context.new_cdp_session(page)
+    try:
+        return session.send('Target.getTargetInfo')['targetInfo']['targetId']
+    finally:
+        session.detach()
+
+def acquire_tab(context, origin):
+    """Lease an idle open tab already on `origin`, or open a new one.
+
+    The returned page is marked as in use by this process until
+    release_tab() is called (or the process exits).
+    """
+    leases = _load_leases()
+
+    page = None
+    for candidate in context.pages:
+        if candidate.url.startswith(origin) and target_id(candidate) not in leases:
+            page = candidate
+            print_step("BROKER", f"Reusing open tab: {candidate.url[:60]}", "success")
+            break
+
+    if page is None:
+        page = context.new_page()
+        print_step("BROKER", f"Opened new tab for {origin}", "info")
+
+    return lease_tab(page, origin, leases)
+
+def lease_tab(page, origin, leases=None):
+    """Mark `page` as in use by this process; returns the page"""
+    leases = _load_leases() if leases is None else leases
+    leases[target_id(page)] = {'pid': os.getpid(), 'origin': origin, 'since': time.time()}
+    _save_leases(leases)
+    return page
+
+def tab_leased(page):
+    """True while some live process holds a lease on `page`"""
+    return target_id(page) in _load_leases()
+
+def try_lease_tab(page, origin):
+    """Lease `page` only if no live process holds it; True if leased"""
+    leases = _load_leases()
+    if target_id(page) in leases:
+        return False
+    lease_tab(page, origin, leases)
+    return True
+
+def release_tab(page):
+    """Return a leased tab to the pool; the tab stays open for the next run"""
+    try:
+        tid = target_id(page)
+    except Exception:
+        return
+    leases = _load_leases()
+    leases.pop(tid, None)
+    _save_leases(leases)
+
+def detach(browser):
+    """Disconnect from the broker Chrome without closing it"""
+    try:
+        browser.close()
+    except Exception:
+        pass
+
+def shutdown(browser, timeout=10):
+    """Quit the broker Chrome itself; True once the debugging port is closed"""
+    try:
+        browser.new_browser_cdp_session().send("Browser.close")
+    except Exception:
+        pass
+    detach(browser)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if not is_browser_running():
+            return True
+        time.sleep(0.1)
+    return False
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+
+    if command == "start":
+        if is_browser_running():
+            print_step("BROKER", f"Chrome already running on port {DEBUG_PORT}", "success")
+            return
+        launch_chrome()
+        ready = wait_for_debug_port()
+        if ready is not None:
+            print_step("BROKER", f"Chrome ready on port {DEBUG_PORT} after {ready * 1000:.0f} ms", "success")
+            return
+        print_step("BROKER", "Chrome did not open the debugging port", "info")
+        sys.exit(1)
+
+    elif command == "status":
+        version = debug_endpoint("/json/version")
+        if not version:
+            print_step("BROKER", "No broker Chrome running", "info")
+            return
+        print_step("BROKER", f"{version.get('Browser')} on port {DEBUG_PORT}", "success")
+        leases = _load_leases()
+        for tab in debug_endpoint("/json/list") or []:
+            if tab.get('type') != 'page':
+                continue
+            lease = leases.get(tab['id'])
+            state = f"leased by pid {lease['pid']}" if lease else "idle"
+            print(f"   [{state}] {tab.get('url', '')[:80]}")
+
+    else:
+        print("Usage: python browser_broker.py [start|status]")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
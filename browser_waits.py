@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Condition-Based Waits for Browser Flows
+Replaces fixed time.sleep() pauses with waits that return as soon as the
+page is ready (selector visible, URL change, network idle, message list
+change). Every wait has a timeout and is recorded as a "wait" span in the
+step trace (step_trace.py).
+"""
+
+import time
+
+from selector_resolver import MATCH_JS
+from step_trace import record_span
+
+# In-memory record of this run's waits: dicts with step, seconds, ok, timeout
+STEP_TIMINGS = []
+
+def record_wait(step, started, ok, timeout):
+    """Record one finished wait for this run's timings and the step trace"""
+    STEP_TIMINGS.append({
+        'step': step,
+        'seconds': round(time.monotonic() - started, 3),
+        'ok': ok,
+        'timeout': timeout,
+    })
+    return record_span(step, started, ok, kind='wait', timeout=timeout)
+
+def print_step_timings():
+    """Print how long each wait of this run took"""
+    if not STEP_TIMINGS:
+        return
+    print("\n⏱️  Step timings:")
+    for entry in STEP_TIMINGS:
+        mark = "✓" if entry['ok'] else "✗ timeout"
+        print(f"   {entry['step']:<28} {entry['seconds']:>7.2f}s  {mark}")
+    total = sum(entry['seconds'] for entry in STEP_TIMINGS)
+    print(f"   {'total waiting':<28} {total:>7.2f}s")
+
+def wait_until(step, predicate, timeout=10, interval=0.1, progress=None, progress_every=30,
+               page=None):
+    """Poll predicate() until it returns truthy or the timeout (seconds) expires.
+
+    If given, progress(remaining_seconds) is called every progress_every
+    seconds so long waits (manual login) can report that they are alive.
+    Pass the sync Playwright `page` to pause with page.wait_for_timeout()
+    so its route handlers (request_blocker.py) keep running in between.
+    """
+    started = time.monotonic()
+    next_progress = progress_every
+    while True:
+        try:
+            if predicate():
+                return record_wait(step, started, True, timeout)
+        except Exception:
+            pass
+        elapsed = time.monotonic() - started
+        if elapsed >= timeout:
+            return record_wait(step, started, False, timeout)
+        if progress and elapsed >= next_progress:
+            progress(int(timeout - elapsed))
+            next_progress += progress_every
+        if page is not None:
+            page.wait_for_timeout(interval * 1000)
+        else:
+            time.sleep(interval)
+
+# ---------------------------------------------------------------------------
+# Playwright (sync API)
+# ---------------------------------------------------------------------------
+
+def wait_for_visible(page, selector, step, timeout=10):
+    """Wait for a selector to become visible; returns the element or None"""
+    started = time.monotonic()
+    try:
+        element = page.wait_for_selector(selector, state='visible', timeout=timeout * 1000)
+        record_wait(step, started, True, timeout)
+        return element
+    except Exception:
+        record_wait(step, started, False, timeout)
+        return None
+
+# [index, element] for the first selector with a visible match, or null
+FIND_ANY_JS = """
+(selectors) => {
+    const visible = (el) => !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+    const match = """ + MATCH_JS.strip() + """;
+    for (let i = 0; i < selectors.length; i++) {
+        const el = match(selectors[i]).find(visible);
+        if (el) return [i, el];
+    }
+    return null;
+}
+"""
+
+def wait_for_any(page, selectors, step, timeout=5):
+    """Race all candidate selectors under one deadline.
+
+    Returns (selector, element) for the first candidate (in list order) with
+    a visible match, or (None, None) once the timeout expires - so a page
+    with none of them costs `timeout`, not timeout x len(selectors). The
+    element is the one the browser found, not a second lookup that could
+    pick a different (hidden) match of the same selector.
+    """
+    started = time.monotonic()
+    try:
+        handle = page.wait_for_function(FIND_ANY_JS, arg=list(selectors), timeout=timeout * 1000)
+        selector = selectors[handle.get_property('0').json_value()]
+        element = handle.get_property('1').as_element()
+        record_wait(step, started, True, timeout)
+        return selector, element
+    except Exception:
+        record_wait(step, started, False, timeout)
+        return None, None
+
+def wait_for_hidden(page, selector, step, timeout=10):
+    """Wait for a selector to be detached or hidden"""
+    started = time.monotonic()
+    try:
+        page.wait_for_selector(selector, state='hidden', timeout=timeout * 1000)
+        return record_wait(step, started, True, timeout)
+    except Exception:
+        return record_wait(step, started, False, timeout)
+
+def wait_for_url_change(page, old_url, step, timeout=10):
+    """Wait until the page URL differs from old_url"""
+    started = time.monotonic()
+    try:
+        page.wait_for_url(lambda url: url != old_url, timeout=timeout * 1000)
+        return record_wait(step, started, True, timeout)
+    except Exception:
+        return record_wait(step, started, False, timeout)
+
+def wait_for_network_idle(page, step, timeout=10):
+    """Wait for the page to have no network activity for 500 ms"""
+    started = time.monotonic()
+    try:
+        page.wait_for_load_state('networkidle', timeout=timeout * 1000)
+        return record_wait(step, started, True, timeout)
+    except Exception:
+        return record_wait(step, started, False, timeout)
+
+def count_rows(page, row_selector):
+    """Number of elements matching row_selector, in one evaluation"""
+    return page.evaluate("(s) => document.querySelectorAll(s).length", row_selector)
+
+# Text of the first and last row. When a page of results is removed and
+# the list refills from the next page to the same row count, this changes
+# even though the number of rows does not.
+LIST_SIGNATURE_JS = """
+(rowSelector) => {
+    const rows = document.querySelectorAll(rowSelector);
+    if (!rows.length) return '';
+    const text = (row) => (row.textContent || '').replace(/\\s+/g, ' ').trim().slice(0, 200);
+    return text(rows[0]) + '\\n' + text(rows[rows.length - 1]);
+}
+"""
+
+# Visible rows, list signature and, where the site shows one, the
+# "1-50 of 1,234" total
+PROBE_JS = """
+([rowSelector, countSelector]) => {
+    const rows = document.querySelectorAll(rowSelector).length;
+    const signature = (""" + LIST_SIGNATURE_JS.strip() + """)(rowSelector);
+    let total = null;
+    if (countSelector) {
+        for (const el of document.querySelectorAll(countSelector)) {
+            const m = (el.textContent || '').match(/of\\s+(?:about\\s+)?([\\d.,\\s\\u00a0\\u202f]+)/i);
+            if (m) { total = parseInt(m[1].replace(/\\D/g, ''), 10); break; }
+        }
+    }
+    return {rows, total, signature};
+}
+"""
+
+# Different row count, different rows, or a different total
+LIST_CHANGED_JS = """
+(before, now) => now.rows !== before.rows || now.signature !== before.signature
+    || (now.total !== null && before.total !== null && now.total !== before.total)
+"""
+
+# Waitable predicate: [rowSelector, countSelector, before probe] -> changed
+WAIT_LIST_CHANGE_JS = (f"([r, c, before]) => ({LIST_CHANGED_JS.strip()})"
+                       f"(before, ({PROBE_JS.strip()})([r, c]))")
+
+def probe_counts(page, row_selector, count_selector=None):
+    """{'rows', 'total' (or None), 'signature'} of the message list in one evaluation"""
+    return page.evaluate(PROBE_JS, [row_selector, count_selector])
+
+def list_changed(before, after):
+    """True when two probe_counts() results show a different message list"""
+    if after['rows'] != before['rows'] or after.get('signature') != before.get('signature'):
+        return True
+    return None not in (before.get('total'), after.get('total')) and after['total'] != before['total']
+
+def messages_affected(before, after):
+    """Messages an action removed, from probes taken before and after it"""
+    if before.get('total') is not None and after.get('total') is not None:
+        if before['total'] > after['total']:
+            return before['total'] - after['total']
+    if after['rows'] == 0 and before.get('total') is not None:
+        # Emptied list (the total disappears with it): every match went
+        return before['total']
+    # Otherwise the whole selected page went, whether the list refilled to
+    # the same row count, partly refilled (50 rows, 20 left to show) or
+    # emptied. Without a total a partial refill looks like a shrink, so the
+    # row difference would undercount.
+    return before['rows'] if list_changed(before, after) else 0
+
+def wait_for_list_change(page, row_selector, before, step, timeout=10, count_selector=None):
+    """Wait until the message list differs from the probe_counts() result `before`"""
+    started = time.monotonic()
+    try:
+        page.wait_for_function(
+            WAIT_LIST_CHANGE_JS,
+            arg=[row_selector, count_selector, before],
+            timeout=timeout * 1000,
+        )
+        return record_wait(step, started, True, timeout)
+    except Exception:
+        return record_wait(step, started, False, timeout)
+
+# ---------------------------------------------------------------------------
+# Selenium
+# ---------------------------------------------------------------------------
+
+def wait_for_css_visible(driver, selector, step, timeout=10):
+    """Wait for a CSS selector to be visible; returns the element or None"""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
+    started = time.monotonic()
+    try:
+        element = WebDriverWait(driver, timeout, poll_frequency=0.1).until(
+            EC.visibility_of_element_located((By.CSS_SELECTOR, selector)))
+        record_wait(step, started, True, timeout)
+        return element
+    except Exception:
+        record_wait(step, started, False, timeout)
+        return None
+
+def wait_for_xpath_visible(driver, xpath, step, timeout=10):
+    """Wait for an XPath to be visible; returns the element or None"""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
+    started = time.monotonic()
+    try:
+        element = WebDriverWait(driver, timeout, poll_frequency=0.1).until(
+            EC.visibility_of_element_located((By.XPATH, xpath)))
+        record_wait(step, started, True, timeout)
+        return element
+    except Exception:
+        record_wait(step, started, False, timeout)
+        return None
+
+def wait_for_driver_row_count_change(driver, row_selector, before, step, timeout=10):
+    """Selenium wait until the number of rows differs from `before`"""
+    script = "return document.querySelectorAll(arguments[0]).length;"
+    return wait_until(step, lambda: driver.execute_script(script, row_selector) != before, timeout)
@@ -81,149 +81,200 @@ def analyze_gmail_screenshot(image_path):
 
     return img_pil, results
 
-def detect_checkbox(gray, bgr):
-    """Detect the select-all checkbox in top-left area"""
+# Compact per-target detection record. A structured array keeps one row per
+# requested target, and the field names match the old dict keys so callers
+# can keep using det['center'][0] / det['bbox'].
+DETECTION_DTYPE = np.dtype([
+    ('name', 'U16'),
+    ('found', '?'),
+    ('bbox', 'i4', 4),
+    ('center', 'i4', 2),
+    ('size', 'i4', 2),
+    ('score', 'f4'),
+])
+
+TARGETS = ('checkbox', 'delete', 'select_all_link')
+
+def _bounding_boxes(edges, mode):
+    """Return an (N, 4) int array of contour bounding rects (x, y, w, h)"""
+    contours, _ = cv2.findContours(edges, mode, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return np.empty((0, 4), dtype=np.int32)
+    return np.array([cv2.boundingRect(c) for c in contours], dtype=np.int32)
+
+def _fill(row, x, y, w, h, score):
+    """Write one detection into a DETECTION_DTYPE row"""
+    row['found'] = True
+    row['bbox'] = (x, y, x + w, y + h)
+    row['center'] = (x + w // 2, y + h // 2)
+    row['size'] = (w, h)
+    row['score'] = score
+
+def _locate_checkbox(gray, row):
+    """Find the select-all checkbox in top-left area"""
 
-    # Focus on top-left region where checkbox typically appears
     # Gmail checkbox is usually within: x: 10-150, y: 50-200
     roi_y_start, roi_y_end = 50, 250
     roi_x_start, roi_x_end = 10, 200
 
-    roi = gray[roi_y_start:roi_y_end, roi_x_start:roi_x_end]
-
-    # Edge detection
-    edges = cv2.Canny(roi, 30, 100)
-
-    # Find contours
-    contours, _ = cv2.findContours(edges, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
-
-    candidates = []
-
-    for contour in contours:
-        x, y, w, h = cv2.boundingRect(contour)
+    edges = cv2.Canny(gray[roi_y_start:roi_y_end, roi_x_start:roi_x_end], 30, 100)
+    boxes = _bounding_boxes(edges, cv2.RETR_TREE)
+    x, y, w, h = boxes.T
 
-        # Checkbox criteria: square-ish, 14-28 pixels typically
-        if 12 <= w <= 32 and 12 <= h <= 32:
-            aspect_ratio = w / float(h)
-            if 0.75 <= aspect_ratio <= 1.35:  # Nearly square
-                # Convert to absolute coordinates
-                abs_x = x + roi_x_start
-                abs_y = y + roi_y_start
-                center_x = abs_x + w // 2
-                center_y = abs_y + h // 2
+    # Checkbox criteria: square-ish, 14-28 pixels typically
+    aspect = w / np.maximum(h, 1)
+    keep = (w >= 12) & (w <= 32) & (h >= 12) & (h <= 32) & (aspect >= 0.75) & (aspect <= 1.35)
+    if not keep.any():
+        return False
 
-                # Calculate "leftmost + topmost" score
-                score = abs_x * 0.3 + abs_y * 0.7
+    x, y, w, h = x[keep] + roi_x_start, y[keep] + roi_y_start, w[keep], h[keep]
 
-                candidates.append({
-                    'bbox': (abs_x, abs_y, abs_x + w, abs_y + h),
-                    'center': (center_x, center_y),
-                    'size': (w, h),
-                    'score': score
-                })
+    # "leftmost + topmost" score
+    score = x * 0.3 + y * 0.7
+    i = int(np.argmin(score))
+    _fill(row, x[i], y[i], w[i], h[i], score[i])
+    return True
 
-    if candidates:
-        # Get the topmost, leftmost checkbox
-        best = min(candidates, key=lambda c: c['score'])
-        print(f"  ✓ Found at center: ({best['center'][0]}, {best['center'][1]})")
-        print(f"    Bbox: {best['bbox']}, Size: {best['size']}")
-        return best
-    else:
-        print("  ✗ Not found")
-        return None
+def _locate_delete_button(gray, row):
+    """Find the delete/trash button in the toolbar"""
 
-def detect_delete_button(gray, bgr):
-    """Detect the delete/trash button"""
-
-    # Delete button is typically in toolbar area
     # Usually around x: 100-400, y: 50-200
     roi_y_start, roi_y_end = 50, 250
     roi_x_start, roi_x_end = 80, 500
 
-    roi = gray[roi_y_start:roi_y_end, roi_x_start:roi_x_end]
-
-    # Edge detection
-    edges = cv2.Canny(roi, 50, 150)
-
-    # Find contours
-    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    edges = cv2.Canny(gray[roi_y_start:roi_y_end, roi_x_start:roi_x_end], 50, 150)
+    boxes = _bounding_boxes(edges, cv2.RETR_EXTERNAL)
+    x, y, w, h = boxes.T
+
+    # Delete icon is typically 18-45 pixels, nearly square or slightly taller
+    aspect = h / np.maximum(w, 1)
+    keep = (w >= 16) & (w <= 50) & (h >= 16) & (h <= 50) & (aspect >= 0.8) & (aspect <= 1.5)
+    if not keep.any():
+        return False
+
+    x, y, w, h = x[keep] + roi_x_start, y[keep] + roi_y_start, w[keep], h[keep]
+
+    # Prefer elements around x=150-250 (typical delete button position)
+    score = np.abs(x + w // 2 - 200) + np.abs(y + h // 2 - 140) * 0.5
+    i = int(np.argmin(score))
+    _fill(row, x[i], y[i], w[i], h[i], score[i])
+    return True
+
+def propose_text_lines(gray, roi=None, kernel=(20, 3), min_size=(40, 8),
+                       max_size=(900, 40), min_aspect=2.0):
+    """Propose candidate text lines using edges + horizontal dilation only.
+
+    roi is (x1, y1, x2, y2) in image coordinates (whole frame if None).
+    Returns an (N, 4) int32 array of absolute (x1, y1, x2, y2) boxes sorted
+    top-to-bottom, left-to-right. No OCR is run here; the boxes are meant to
+    be cropped and handed to OCR individually.
+    """
+    if roi is None:
+        roi = (0, 0, gray.shape[1], gray.shape[0])
+    roi_x_start, roi_y_start, roi_x_end, roi_y_end = roi
+
+    edges = cv2.Canny(gray[roi_y_start:roi_y_end, roi_x_start:roi_x_end], 50, 150)
+
+    # Apply morphological operations to connect characters into lines
+    element = cv2.getStructuringElement(cv2.MORPH_RECT, kernel)
+    dilated = cv2.dilate(edges, element, iterations=1)
+
+    # Connected components, not outer contours: a closed outline (the message
+    # panel, a banner's background) would otherwise hide every line inside it
+    _, _, stats, _ = cv2.connectedComponentsWithStats(dilated, connectivity=8)
+    boxes = stats[1:, :4].astype(np.int32)
+    x, y, w, h = boxes.T
+
+    keep = ((w >= min_size[0]) & (h >= min_size[1]) &
+            (w <= max_size[0]) & (h <= max_size[1]) &
+            (w >= min_aspect * h))
+    boxes = boxes[keep]
+
+    lines = np.empty((len(boxes), 4), dtype=np.int32)
+    lines[:, 0] = boxes[:, 0] + roi_x_start
+    lines[:, 1] = boxes[:, 1] + roi_y_start
+    lines[:, 2] = lines[:, 0] + boxes[:, 2]
+    lines[:, 3] = lines[:, 1] + boxes[:, 3]
+    return lines[np.lexsort((lines[:, 0], lines[:, 1]))]
+
+def _locate_select_all_link(gray, row):
+    """Find the 'Select all conversations' link text"""
 
-    candidates = []
-
-    for contour in contours:
-        x, y, w, h = cv2.boundingRect(contour)
-
-        # Delete icon is typically 18-45 pixels, nearly square or slightly taller
-        if 16 <= w <= 50 and 16 <= h <= 50:
-            aspect_ratio = h / float(w)
-            if 0.8 <= aspect_ratio <= 1.5:  # Square to slightly tall
-                abs_x = x + roi_x_start
-                abs_y = y + roi_y_start
-                center_x = abs_x + w // 2
-                center_y = abs_y + h // 2
+    # Search area: x: 50-800, y: 100-250
+    # Link text is typically wide (100-400px) and short (15-35px tall)
+    lines = propose_text_lines(gray, roi=(50, 100, 900, 280), min_size=(80, 12),
+                               max_size=(500, 40), min_aspect=3.0)
+    if not len(lines):
+        return False
+
+    # Widest text element is likely the full link text
+    w = lines[:, 2] - lines[:, 0]
+    i = int(np.argmax(w))
+    x1, y1, x2, y2 = lines[i]
+    _fill(row, x1, y1, x2 - x1, y2 - y1, -w[i])
+    return True
+
+LOCATORS = {
+    'checkbox': _locate_checkbox,
+    'delete': _locate_delete_button,
+    'select_all_link': _locate_select_all_link,
+}
+
+def locate(frame, targets=TARGETS):
+    """Locate several Gmail UI elements in one pass.
+
+    frame may be a grayscale or BGR ndarray. Returns a DETECTION_DTYPE array
+    with one row per target, in the requested order; rows that were not
+    detected have found=False. Nothing is printed, so this is safe to call
+    in a tight loop.
+    """
+    gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+    results = np.zeros(len(targets), dtype=DETECTION_DTYPE)
+    for i, name in enumerate(targets):
+        results[i]['name'] = name
+        LOCATORS[name](gray, results[i])
+    return results
+
+def as_dict(detection):
+    """Convert a found DETECTION_DTYPE row to the legacy dict, or None"""
+    if not detection['found']:
+        return None
+    return {
+        'bbox': tuple(int(v) for v in detection['bbox']),
+        'center': tuple(int(v) for v in detection['center']),
+        'size': tuple(int(v) for v in detection['size']),
+        'score': float(detection['score'])
+    }
 
-                # Prefer elements around x=150-250 (typical delete button position)
-                position_score = abs(center_x - 200) + abs(center_y - 140) * 0.5
+def _report(detection):
+    """Print the found-at lines for a detection"""
+    print(f"  ✓ Found at center: ({detection['center'][0]}, {detection['center'][1]})")
+    print(f"    Bbox: {detection['bbox']}, Size: {detection['size']}")
 
-                candidates.append({
-                    'bbox': (abs_x, abs_y, abs_x + w, abs_y + h),
-                    'center': (center_x, center_y),
-                    'size': (w, h),
-                    'score': position_score
-                })
+def detect_checkbox(gray, bgr):
+    """Detect the select-all checkbox in top-left area"""
+    det = locate(gray, ('checkbox',))[0]
+    if det['found']:
+        _report(as_dict(det))
+    else:
+        print("  ✗ Not found")
+    return as_dict(det)
 
-    if candidates:
-        # Get best match based on expected position
-        best = min(candidates, key=lambda c: c['score'])
-        print(f"  ✓ Found at center: ({best['center'][0]}, {best['center'][1]})")
-        print(f"    Bbox: {best['bbox']}, Size: {best['size']}")
-        return best
+def detect_delete_button(gray, bgr):
+    """Detect the delete/trash button"""
+    det = locate(gray, ('delete',))[0]
+    if det['found']:
+        _report(as_dict(det))
     else:
         print("  ✗ Not found")
-        return None
+    return as_dict(det)
 
 def detect_select_all_link(gray, bgr, img_pil):
     """Detect 'Select all conversations' link - appears after clicking checkbox"""
-
-    # This link appears in top area, typically centered or left-aligned
-    # Search area: x: 50-800, y: 100-250
-    roi_y_start, roi_y_end = 100, 280
-    roi_x_start, roi_x_end = 50, 900
-
-    roi = gray[roi_y_start:roi_y_end, roi_x_start:roi_x_end]
-
-    # Look for text-like regions using edge detection and morphology
-    edges = cv2.Canny(roi, 50, 150)
-
-    # Apply morphological operations to connect text
-    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (20, 3))
-    dilated = cv2.dilate(edges, kernel, iterations=1)
-
-    contours, _ = cv2.findContours(dilated, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-    candidates = []
-
-    for contour in contours:
-        x, y, w, h = cv2.boundingRect(contour)
-
-        # Link text is typically wide (100-400px) and short (15-35px tall)
-        if 80 <= w <= 500 and 12 <= h <= 40:
-            aspect_ratio = w / float(h)
-            if aspect_ratio >= 3.0:  # Wide horizontal text
-                abs_x = x + roi_x_start
-                abs_y = y + roi_y_start
-                center_x = abs_x + w // 2
-                center_y = abs_y + h // 2
-
-                candidates.append({
-                    'bbox': (abs_x, abs_y, abs_x + w, abs_y + h),
-                    'center': (center_x, center_y),
-                    'size': (w, h)
-                })
-
-    if candidates:
-        # Get the widest text element (likely the full link text)
-        best = max(candidates, key=lambda c: c['size'][0])
+    det = locate(gray, ('select_all_link',))[0]
+    if det['found']:
+        best = as_dict(det)
         print(f"  ⚠ Potentially found at center: ({best['center'][0]}, {best['center'][1]})")
         print(f"    Bbox: {best['bbox']}, Size: {best['size']}")
         print(f"    Note: This link only appears AFTER clicking the checkbox")
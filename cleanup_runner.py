@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+Cleanup Rules Runner
+Reads cleanup_rules.json - a list of (provider, query, action) rules - and
+runs every enabled rule. Rules are grouped by provider and executed in one
+authenticated tab per provider, so browser start-up and login are paid
+once per provider rather than once per sender.
+
+Usage:
+    python cleanup_runner.py                   # all enabled rules
+    python cleanup_runner.py --only skyscanner-gmail
+    python cleanup_runner.py --rules other_rules.json
+    python cleanup_runner.py --max-rows 5000
+
+Each rule loops select -> act -> re-search until the search comes back
+empty, so result sets larger than one page are cleared in one run. A rule
+may set "max_rows" to cap how much it processes.
+
+Rules are incremental by default: once a rule has completed, later runs
+only search mail newer than its last run (see cleanup_state.py). Set
+"incremental": false on a rule, or pass --full, to search all history.
+
+Progress is checkpointed after every pass. If a run is interrupted (browser
+crash, expired session, Ctrl-C) the next run re-attaches and resumes the
+rule with the same search and counts; --restart discards checkpoints.
+
+--batched runs select all + action as one in-page script per pass
+(batch_actions.py) instead of one CDP round trip per query and click.
+--keyboard tries the sites' keyboard shortcuts first (keyboard_actions.py)
+and falls back to clicking per step; the winning strategy is remembered.
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+from playwright.sync_api import sync_playwright
+
+from batch_actions import run_batched_action
+import browser_broker
+from browser_waits import (wait_for_visible, probe_counts, messages_affected,
+                           wait_for_list_change, print_step_timings)
+from cleanup_state import (get_mark, update_mark, since_timestamp, incremental_query, run_started,
+                           get_checkpoint, save_checkpoint, clear_checkpoint)
+from keyboard_actions import (keyboard_select_all, keyboard_action, click_select_all,
+                              strategy_order, record_strategy)
+from mail_providers import get_provider, get_action_selectors
+import memory_governor
+from request_blocker import install_request_blocking, print_blocking_report
+import screenshot_ring
+from selector_resolver import click_first
+from session_store import restore_session
+from step_trace import print_step, span, start_playwright_trace, stop_playwright_trace
+
+RULES_FILE = Path(__file__).parent / "cleanup_rules.json"
+
+# Safety valve for the page loop when actions stop changing the list
+MAX_STALLED_PASSES = 2
+
+def load_rules(path=RULES_FILE):
+    """Load and validate enabled rules from the rules file"""
+    if not Path(path).exists():
+        print(f"Error: Rules file not found: {path}")
+        return None
+
+    try:
+        with open(path, 'r') as f:
+            config = json.load(f)
+    except json.JSONDecodeError as e:
+        print(f"Error: Invalid JSON in rules file: {e}")
+        return None
+
+    rules = []
+    for i, rule in enumerate(config.get('rules', [])):
+        if not rule.get('enabled', True):
+            continue
+        rule.setdefault('name', f"rule-{i + 1}")
+        try:
+            get_action_selectors(rule['provider'], rule['action'])
+        except (KeyError, ValueError) as e:
+            print(f"Error: Invalid rule {rule['name']}: {e}")
+            return None
+        if not rule.get('query'):
+            print(f"Error: Rule {rule['name']} has no query")
+            return None
+        rules.append(rule)
+    return rules
+
+def group_by_provider(rules):
+    """{provider: [rules...]} preserving file order within each provider"""
+    groups = {}
+    for rule in rules:
+        groups.setdefault(rule['provider'], []).append(rule)
+    return groups
+
+def search(page, config, query):
+    """Navigate the tab to the search results.
+
+    Returns a probe_counts() dict, with rows == 0 only when the site's
+    empty-results placeholder is showing. Returns None when neither rows
+    nor the placeholder appeared (slow load, expired session, changed
+    selectors) - that is not an empty search.
+    """
+    with span("search", query=query) as entry:
+        page.goto(config['search_url'](query), wait_until='domcontentloaded')
+
+        # Either a result row or the empty-results placeholder ends the wait
+        ready = f"{config['row_selector']}, {config['empty_selector']}"
+        counts = None
+        if wait_for_visible(page, ready, "search results", timeout=15):
+            counts = probe_counts(page, config['row_selector'], config['count_selector'])
+            if counts['rows'] == 0 and not page.is_visible(config['empty_selector']):
+                counts = None
+        if counts is None:
+            entry['outcome'] = 'timeout'
+            return None
+        entry.update(counts)
+        return counts
+
+def run_action(page, provider, action):
+    """Click the toolbar button for `action` and wait for the list to refresh.
+
+    Returns None if the button was not found, otherwise whether the message
+    list changed (i.e. the action visibly took effect).
+    """
+    config = get_provider(provider)
+    selectors = get_action_selectors(provider, action)
+
+    with span("action", action=action) as entry:
+        wait_for_visible(page, ', '.join(selectors), f"{action} button", timeout=5)
+        before = probe_counts(page, config['row_selector'], config['count_selector'])
+        if not click_first(page, action, selectors):
+            entry['outcome'] = 'failed'
+            return None
+
+    with span("refresh", action=action) as entry:
+        entry['changed'] = wait_for_list_change(page, config['row_selector'], before,
+                                                f"{action}: list refresh", timeout=10,
+                                                count_selector=config['count_selector'])
+        return entry['changed']
+
+def first_strategy(page, step, attempts, succeeded):
+    """Run `attempts[strategy]()` in learned order until one succeeds.
+
+    Returns (result, winning strategy or None) and records the outcome.
+    """
+    tried = []
+    result = None
+    for strategy in strategy_order(page, step):
+        tried.append(strategy)
+        result = attempts[strategy]()
+        if succeeded(result):
+            record_strategy(page, step, tried, strategy)
+            return result, strategy
+    record_strategy(page, step, tried, None)
+    return result, None
+
+def run_keyboard_pass(page, rule):
+    """Select all + action, shortcuts first; returns run_action()'s contract"""
+    provider, action = rule['provider'], rule['action']
+
+    selected, select_by = first_strategy(page, "select_all", {
+        'keyboard': lambda: keyboard_select_all(page, provider),
+        'selector': lambda: click_select_all(page, provider),
+    }, lambda ok: ok)
+    if not selected:
+        return None
+
+    refreshed, action_by = first_strategy(page, action, {
+        'keyboard': lambda: keyboard_action(page, provider, action),
+        'selector': lambda: run_action(page, provider, action),
+    }, lambda refreshed: refreshed is not None)
+    print(f"   strategy: select_all={select_by}, {action}={action_by}")
+    return refreshed
+
+# run_rule() outcomes. 'not found' (the select-all checkbox or action button
+# never showed) and 'stalled' (clicked, but nothing moved) are failures too,
+# kept apart because they need different fixes.
+STATUS_ICONS = {'done': "✓", 'empty': "○", 'skipped': "-",
+                'failed': "✗", 'not found': "✗", 'stalled': "✗"}
+FAILED_STATUSES = ('failed', 'not found', 'stalled')
+
+def run_rule(page, rule, max_rows=None, full=False, mode='selector', restart=False):
+    """Repeat search -> select all -> action until the search returns no rows.
+
+    Stops early once `max_rows` messages have been processed in this run
+    (rule's own "max_rows" wins over the command-line cap). The rule's
+    high-water mark only advances when the search was drained completely;
+    until then a checkpoint lets the next run pick up where this one stopped.
+    """
+    config = get_provider(rule['provider'])
+    max_rows = rule.get('max_rows', max_rows)
+    print("\n" + "-" * 60)
+    print_step("RULE", f"{rule['name']}: {rule['action']} {rule['query']}", "work")
+
+    checkpoint = None if restart else get_checkpoint(rule['name'])
+    if checkpoint and checkpoint.get('rule_query') == rule['query']:
+        # Same search and start time as the interrupted run, so its mark stays exact
+        started = checkpoint['started']
+        query = checkpoint['query']
+        processed = checkpoint['messages']
+        passes = checkpoint['pages']
+        print_step("RULE", f"Resuming after {passes} pages / {processed} messages: {query}", "info")
+    else:
+        started = run_started()
+        since = None
+        if rule.get('incremental', True) and not full:
+            since = since_timestamp(get_mark(rule['name']))
+        query = incremental_query(rule['provider'], rule['query'], since)
+        if query != rule['query']:
+            print_step("RULE", f"Incremental search: {query}", "search")
+        processed = 0
+        passes = 0
+        save_checkpoint(rule['name'], rule_query=rule['query'], query=query, started=started,
+                        pages=0, messages=0)
+
+    run_processed = 0
+    stalled = 0
+    start = time.monotonic()
+
+    while True:
+        before = search(page, config, query)
+        if before is None:
+            # Not a drained search: keep the mark and checkpoint, and retry
+            stalled += 1
+            print_step("RULE", "Search results did not load", "info")
+            if stalled >= MAX_STALLED_PASSES:
+                return 'failed'
+            continue
+        rows = before['rows']
+        if rows == 0:
+            update_mark(rule['name'], last_run=started)
+            clear_checkpoint(rule['name'])
+            break
+        if max_rows and run_processed >= max_rows:
+            print_step("RULE", f"Reached max_rows={max_rows}, stopping", "info")
+            break
+        if run_processed == 0 and before['total'] is not None:
+            print_step("RULE", f"{before['total']} matching messages", "search")
+        pass_start = time.monotonic()
+
+        if mode == 'batched':
+            with span("action", action=rule['action'], mode='batched') as entry:
+                result = run_batched_action(page, rule['provider'], rule['action'])
+                entry.update(selector=result['selector'], failed_step=result['failedStep'])
+                if not result['ok']:
+                    entry['outcome'] = 'failed'
+            if not result['ok']:
+                print_step("RULE", f"Batched action found no {result['failedStep']} element", "info")
+                return 'not found'
+            refreshed = result['refreshed']
+        elif mode == 'keyboard':
+            refreshed = run_keyboard_pass(page, rule)
+            if refreshed is None:
+                print_step("RULE", f"Could not select all or {rule['action']} by shortcut or button", "info")
+                return 'not found'
+        else:
+            if not config['select_all_emails'](page):
+                return 'not found'
+            refreshed = run_action(page, rule['provider'], rule['action'])
+            if refreshed is None:
+                print_step("RULE", f"Could not find the {rule['action']} button", "info")
+                return 'not found'
+
+        # One probe after the action says how many messages actually went
+        with span("verify", action=rule['action']) as entry:
+            after = probe_counts(page, config['row_selector'], config['count_selector'])
+            affected = messages_affected(before, after)
+            pass_seconds = time.monotonic() - pass_start
+            entry.update(before=before, after=after, affected=affected, refreshed=refreshed,
+                         msgs_per_sec=round(affected / pass_seconds, 1) if pass_seconds else None)
+
+        # Passes that removed nothing mean the action is not sticking
+        stalled = 0 if affected else stalled + 1
+        if stalled >= MAX_STALLED_PASSES:
+            print_step("RULE", f"Clicked {rule['action']}, but the list stopped changing at "
+                               f"{rows} rows, stopping", "info")
+            return 'stalled'
+
+        passes += 1
+        processed += affected
+        run_processed += affected
+        save_checkpoint(rule['name'], pages=passes, messages=processed, last_total=after['total'])
+        elapsed = time.monotonic() - start
+        print(f"   pass {passes}: {affected} messages ({affected / pass_seconds:.1f} msgs/s), "
+              f"{processed} total ({run_processed / elapsed:.1f} msgs/s this run)")
+
+    if passes == 0:
+        print_step("RULE", "No matching messages", "info")
+        return 'empty'
+    return 'done'
+
+def run_provider(context, provider, rules, max_rows=None, full=False, mode='selector', restart=False):
+    """Log in once for a provider and run all of its rules in the same tab"""
+    config = get_provider(provider)
+    results = {}
+
+    restore_session(context, config['session_name'])
+    page = browser_broker.acquire_tab(context, config['origin'])
+    screenshot_ring.watch_page(page)
+    try:
+        if not page.url.startswith(config['origin']):
+            with span("navigate", url=config['home_url']):
+                page.goto(config['home_url'], wait_until='domcontentloaded')
+
+        if not config['wait_for_login'](page):
+            print_step("LOGIN", f"Not logged in to {provider}, skipping {len(rules)} rule(s)", "info")
+            return {rule['name']: 'skipped' for rule in rules}
+
+        for rule in rules:
+            # Long Gmail sessions pile up heap; start the rule in a fresh tab if so
+            try:
+                fresh = memory_governor.recycle_if_needed(page, config['home_url'])
+            except Exception as e:
+                print_step("MEMORY", f"Could not recycle tab: {e}", "info")
+                fresh = page
+            if fresh is not page:
+                page = fresh
+                screenshot_ring.watch_page(page)
+            try:
+                with span("rule", rule=rule['name'], mode=mode) as entry:
+                    results[rule['name']] = run_rule(page, rule, max_rows, full, mode, restart)
+                    if results[rule['name']] in FAILED_STATUSES:
+                        entry['outcome'] = 'failed'
+            except Exception as e:
+                print_step("RULE", f"{rule['name']} error: {e}", "info")
+                results[rule['name']] = 'failed'
+    finally:
+        browser_broker.release_tab(page)
+
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Run declarative mail cleanup rules")
+    parser.add_argument('--rules', default=str(RULES_FILE), help="rules JSON file")
+    parser.add_argument('--only', action='append', help="run only the named rule(s)")
+    parser.add_argument('--max-rows', type=int, help="stop each rule after this many rows")
+    parser.add_argument('--full', action='store_true', help="ignore last-run marks and search all history")
+    parser.add_argument('--restart', action='store_true', help="ignore checkpoints of interrupted runs")
+    strategy = parser.add_mutually_exclusive_group()
+    strategy.add_argument('--batched', dest='mode', action='store_const', const='batched',
+                          help="run select + action as one in-page script")
+    strategy.add_argument('--keyboard', dest='mode', action='store_const', const='keyboard',
+                          help="use keyboard shortcuts, falling back to clicks")
+    parser.set_defaults(mode='selector')
+    args = parser.parse_args()
+
+    rules = load_rules(args.rules)
+    if rules is None:
+        return 1
+    if args.only:
+        rules = [r for r in rules if r['name'] in args.only]
+    if not rules:
+        print("No enabled rules to run")
+        return 1
+
+    groups = group_by_provider(rules)
+    print(f"🚀 {len(rules)} rule(s) across {len(groups)} provider(s)")
+
+    start = time.monotonic()
+    results = {}
+    with sync_playwright() as p:
+        browser = browser_broker.ensure_browser(p)
+        context = browser_broker.get_context(browser)
+        block_stats = install_request_blocking(context)
+        start_playwright_trace(context)
+
+        for provider, provider_rules in groups.items():
+            results.update(run_provider(context, provider, provider_rules, args.max_rows,
+                                        args.full, args.mode, args.restart))
+
+        print_step_timings()
+        print_blocking_report(block_stats)
+        stop_playwright_trace(context)
+        browser_broker.detach(browser)
+
+    # Summary
+    print("\n" + "=" * 60)
+    print("📊 Summary")
+    print("=" * 60)
+    for name, status in results.items():
+        print(f"{STATUS_ICONS[status]} {name}: {status}")
+    print(f"\nCompleted in {time.monotonic() - start:.1f}s")
+
+    return 0 if all(s in ('done', 'empty') for s in results.values()) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
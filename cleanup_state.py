@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Cleanup State (High-Water Marks)
+Remembers, per rule, when it last completed and the last IMAP UID it
+processed, and turns that into date-bounded queries so scheduled runs only
+touch mail that arrived since the previous run.
+
+While a rule is running it also keeps a checkpoint (pages and messages
+processed, the exact search in use, the run's start time, the last IMAP
+UID done) so an interrupted job resumes where it stopped.
+"""
+
+import json
+import threading
+import time
+from pathlib import Path
+
+STATE_FILE = Path.home() / "ali" / "cleanup_state.json"
+
+IMAP_MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+               'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+# Re-scan this much before the mark to absorb clock skew and late delivery
+OVERLAP_SECONDS = 3600
+
+# Serializes read-modify-write of the state file between threads
+# (multi_account_runner accounts, imap_cleanup workers)
+_lock = threading.Lock()
+
+def load_state():
+    """{rule_key: {...}} from disk, empty if missing or unreadable"""
+    try:
+        with open(STATE_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_state(state):
+    """Write the state file atomically"""
+    STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = STATE_FILE.with_suffix('.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(state, f, indent=2)
+    tmp.replace(STATE_FILE)
+
+def get_mark(key):
+    """High-water mark dict for a rule key, or {}"""
+    return load_state().get(key, {})
+
+def update_mark(key, **fields):
+    """Merge fields (last_run, last_uid, uidvalidity, ...) into a rule's mark"""
+    with _lock:
+        state = load_state()
+        mark = state.setdefault(key, {})
+        mark.update(fields)
+        save_state(state)
+    return mark
+
+def get_checkpoint(key):
+    """Progress of an unfinished run of a rule, or None"""
+    return get_mark(key).get('checkpoint')
+
+def save_checkpoint(key, **progress):
+    """Merge progress fields into the rule's checkpoint"""
+    with _lock:
+        state = load_state()
+        checkpoint = state.setdefault(key, {}).setdefault('checkpoint', {})
+        checkpoint.update(progress, updated=int(time.time()))
+        save_state(state)
+    return checkpoint
+
+def clear_checkpoint(key):
+    """Drop the checkpoint once a run completes"""
+    with _lock:
+        state = load_state()
+        if state.get(key, {}).pop('checkpoint', None) is not None:
+            save_state(state)
+
+def since_timestamp(mark):
+    """Epoch seconds to search from, or None for a full-history search"""
+    last_run = mark.get('last_run')
+    if not last_run:
+        return None
+    return max(0, int(last_run) - OVERLAP_SECONDS)
+
+def incremental_query(provider, query, since):
+    """Add a date bound to a web search query.
+
+    Gmail's after: accepts epoch seconds, so the bound is exact. Yahoo Mail's
+    web search has no date operator, so Yahoo queries are returned as-is
+    (the IMAP backend bounds Yahoo by UID instead).
+    """
+    if since is None:
+        return query
+    if provider == 'gmail':
+        return f"{query} after:{since}"
+    return query
+
+def imap_since_date(since):
+    """IMAP SINCE date string (day granularity) for epoch seconds"""
+    t = time.localtime(since)
+    return f"{t.tm_mday:02d}-{IMAP_MONTHS[t.tm_mon - 1]}-{t.tm_year}"
+
+def run_started():
+    """Timestamp to store as last_run: taken before searching, so mail that
+    arrives during the run is picked up next time"""
+    return int(time.time())
@@ -10,6 +10,8 @@ import pytesseract
 from PIL import ImageGrab, Image, ImageDraw, ImageFont
 import sys
 
+from capture_and_detect_gmail import propose_text_lines
+
 def capture_screenshot():
     """Capture the current screen"""
     print("Capturing screenshot...")
@@ -141,37 +143,128 @@ def find_delete_button(image_bgr, screenshot_pil):
 
     return None
 
+# OCR budget for the select-all link: at most MAX_OCR_LINES proposed lines,
+# stitched into one mosaic no bigger than 1/OCR_BUDGET_RATIO of the strip
+MAX_OCR_LINES = 6
+OCR_BUDGET_RATIO = 10
+MOSAIC_GAP = 12
+
+def _link_colour_score(crop_rgb):
+    """Fraction of a line's text pixels that look like Gmail's blue link text"""
+    # Text is whatever differs from the line's background (its median colour),
+    # so a blue theme behind white text does not count as a link
+    gray = crop_rgb.mean(axis=2)
+    text = np.abs(gray - np.median(gray)) > 40
+    if not text.any():
+        return 0.0
+    r = crop_rgb[:, :, 0].astype(np.int16)
+    b = crop_rgb[:, :, 2].astype(np.int16)
+    return float(np.mean((b - r > 40)[text]))
+
+def _binarize(crop_rgb):
+    """Dark text on white, whatever the line's own colours"""
+    gray = cv2.cvtColor(crop_rgb, cv2.COLOR_RGB2GRAY)
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    # The background is the majority colour
+    if np.mean(binary) < 128:
+        binary = 255 - binary
+    return binary
+
+def _mosaic_size(sizes):
+    """(width, height) of a mosaic of crops with these (w, h) sizes"""
+    width = max(w for w, _ in sizes) + 2 * MOSAIC_GAP
+    height = sum(h + MOSAIC_GAP for _, h in sizes) + MOSAIC_GAP
+    return width, height
+
+def _mosaic(crops):
+    """Stack line crops into one image; returns (image, [(y1, y2)] band per crop)"""
+    width, height = _mosaic_size([(c.shape[1], c.shape[0]) for c in crops])
+    mosaic = np.full((height, width), 255, dtype=np.uint8)
+    bands = []
+    y = MOSAIC_GAP
+    for crop in crops:
+        mosaic[y:y + crop.shape[0], MOSAIC_GAP:MOSAIC_GAP + crop.shape[1]] = crop
+        bands.append((y, y + crop.shape[0]))
+        y += crop.shape[0] + MOSAIC_GAP
+    return mosaic, bands
+
+def _select_all_candidates(strip_rgb):
+    """Padded line boxes to OCR for the link, most link-blue first, within budget.
+
+    Returns (boxes, number of lines proposed).
+    """
+    strip_h, strip_w = strip_rgb.shape[:2]
+    strip_gray = cv2.cvtColor(strip_rgb, cv2.COLOR_RGB2GRAY)
+
+    # The banner can span most of the screen width, so only the height is capped
+    lines = propose_text_lines(strip_gray, min_size=(60, 8), max_size=(strip_w, 48), min_aspect=2.5)
+
+    pad = 4
+    crops = []
+    for x1, y1, x2, y2 in lines:
+        x1, y1 = max(0, x1 - pad), max(0, y1 - pad)
+        x2, y2 = min(strip_w, x2 + pad), min(strip_h, y2 + pad)
+        crops.append((_link_colour_score(strip_rgb[y1:y2, x1:x2]), (x1, y1, x2, y2)))
+    crops.sort(key=lambda c: c[0], reverse=True)
+
+    budget = strip_w * strip_h // OCR_BUDGET_RATIO
+    chosen = []
+    for _, box in crops:
+        if len(chosen) == MAX_OCR_LINES:
+            break
+        width, height = _mosaic_size([(x2 - x1, y2 - y1) for x1, y1, x2, y2 in chosen + [box]])
+        if width * height <= budget:
+            chosen.append(box)
+    return chosen, len(lines)
+
 def find_select_all_link(screenshot_pil):
-    """Find 'Select all conversations' link using OCR"""
+    """Find 'Select all conversations' link using text-line proposals + OCR"""
     print("\nSearching for 'Select all conversations' link...")
 
     # This link appears in the middle-top area after clicking checkbox
-    # Search in top 400 pixels
-    roi = screenshot_pil.crop((0, 0, screenshot_pil.width, 400))
-
-    # Use OCR to find the text
-    ocr_data = pytesseract.image_to_data(roi, output_type=pytesseract.Output.DICT)
-
-    # Look for variations of "select all" text
-    for i in range(len(ocr_data['text'])):
-        text = ocr_data['text'][i].lower()
-
-        if 'select' in text or 'all' in text or 'conversation' in text:
-            # Check nearby words to confirm it's the right link
-            context = ' '.join([ocr_data['text'][j].lower() for j in range(max(0, i-2), min(len(ocr_data['text']), i+5))])
-
-            if 'select all' in context or 'all conversation' in context:
-                x, y, w, h = (ocr_data['left'][i], ocr_data['top'][i],
-                             ocr_data['width'][i], ocr_data['height'][i])
-
-                center_x = x + w // 2
-                center_y = y + h // 2
+    # Search in top 400 pixels, but only OCR the best proposed text lines
+    strip_h = min(400, screenshot_pil.height)
+    strip_rgb = np.array(screenshot_pil.convert('RGB').crop((0, 0, screenshot_pil.width, strip_h)))
+    strip_pixels = screenshot_pil.width * strip_h
+
+    boxes, proposed = _select_all_candidates(strip_rgb)
+    if not boxes:
+        print(f"  No text lines proposed in the {strip_pixels} px strip")
+        print("  ⚠ 'Select all conversations' link not found (may not be visible yet)")
+        return None
+
+    # One tesseract run over all chosen lines instead of one per line
+    mosaic, bands = _mosaic([_binarize(strip_rgb[y1:y2, x1:x2]) for x1, y1, x2, y2 in boxes])
+    ocr_data = pytesseract.image_to_data(Image.fromarray(mosaic), config='--psm 6',
+                                         output_type=pytesseract.Output.DICT)
+    print(f"  OCR budget: {mosaic.size} px of {strip_pixels} px strip "
+          f"({len(boxes)} of {proposed} text lines proposed)")
+
+    for (cx1, cy1, cx2, cy2), (by1, by2) in zip(boxes, bands):
+        # Words of this line, by their vertical centre in the mosaic
+        idx = [j for j, t in enumerate(ocr_data['text'])
+               if t.strip() and by1 <= ocr_data['top'][j] + ocr_data['height'][j] // 2 < by2]
+        words = [ocr_data['text'][j].lower() for j in idx]
+        context = ' '.join(words)
+
+        if 'select all' not in context and 'all conversation' not in context:
+            continue
 
-                return {
-                    'bbox': (x, y, x + w, y + h),
-                    'center': (center_x, center_y),
-                    'text': context
-                }
+        # Point at the "Select" word inside the line when OCR returned it
+        i = next((j for j in idx if 'select' in ocr_data['text'][j].lower()), None)
+        if i is None:
+            i = next(j for j in idx if 'all' in ocr_data['text'][j].lower()
+                     or 'conversation' in ocr_data['text'][j].lower())
+
+        x = ocr_data['left'][i] - MOSAIC_GAP + cx1
+        y = ocr_data['top'][i] - by1 + cy1
+        w, h = ocr_data['width'][i], ocr_data['height'][i]
+
+        return {
+            'bbox': (x, y, x + w, y + h),
+            'center': (x + w // 2, y + h // 2),
+            'text': context
+        }
 
     print("  ⚠ 'Select all conversations' link not found (may not be visible yet)")
     return None
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Cached ChromeDriver Resolution
+Resolves the chromedriver for the Selenium path from a local cache keyed by
+the installed Chrome's major version, with a JSON manifest. A cache hit
+needs no network at all; webdriver-manager is only used (and imported) when
+no driver for this Chrome major version has been cached yet.
+
+Usage:
+    python driver_cache.py            # resolve and print the driver path
+    python driver_cache.py --refresh  # re-download for the current Chrome
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from step_trace import print_step, span
+
+DRIVER_CACHE_DIR = Path.home() / "ali" / "drivers"
+MANIFEST_FILE = DRIVER_CACHE_DIR / "manifest.json"
+
+CHROME_EXE = "/mnt/c/Program Files/Google/Chrome/Application/chrome.exe"
+LINUX_CHROME_COMMANDS = ["google-chrome", "google-chrome-stable", "chromium", "chromium-browser"]
+
+VERSION_PATTERN = re.compile(r"(\d+)\.\d+\.\d+\.\d+")
+
+def chrome_version(chrome_exe=CHROME_EXE):
+    """Installed Chrome version string, without starting Chrome where possible"""
+    # Windows Chrome keeps its files in a folder named after the version
+    app_dir = Path(chrome_exe).parent
+    if app_dir.is_dir():
+        versions = [d.name for d in app_dir.iterdir() if d.is_dir() and VERSION_PATTERN.fullmatch(d.name)]
+        if versions:
+            return max(versions, key=lambda v: tuple(int(x) for x in v.split('.')))
+
+    for command in LINUX_CHROME_COMMANDS:
+        if shutil.which(command):
+            try:
+                output = subprocess.run([command, "--version"], capture_output=True,
+                                        text=True, timeout=5).stdout
+            except (OSError, subprocess.SubprocessError):
+                continue
+            match = VERSION_PATTERN.search(output)
+            if match:
+                return match.group(0)
+    return None
+
+def load_manifest():
+    """{major: {path, chrome_version, installed}} for every cached driver"""
+    try:
+        with open(MANIFEST_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_manifest(manifest):
+    """Write the manifest atomically"""
+    DRIVER_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = MANIFEST_FILE.with_suffix('.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    tmp.replace(MANIFEST_FILE)
+
+def cached_driver(manifest, major):
+    """Path of a usable cached driver for `major`, or None"""
+    entry = manifest.get(str(major))
+    if entry and os.access(entry['path'], os.X_OK):
+        return entry['path']
+    return None
+
+def download_driver(major, version):
+    """Fetch a driver with webdriver-manager and copy it into the cache"""
+    from webdriver_manager.chrome import ChromeDriverManager
+
+    downloaded = Path(ChromeDriverManager().install())
+    target_dir = DRIVER_CACHE_DIR / str(major)
+    target_dir.mkdir(parents=True, exist_ok=True)
+    target = target_dir / downloaded.name
+    shutil.copy2(downloaded, target)
+    target.chmod(0o755)
+
+    manifest = load_manifest()
+    manifest[str(major)] = {
+        'path': str(target),
+        'chrome_version': version,
+        'installed': datetime.now().isoformat(timespec='seconds'),
+    }
+    save_manifest(manifest)
+    return str(target)
+
+def resolve_driver(refresh=False):
+    """Path to a chromedriver matching the installed Chrome, cache first.
+
+    Raises RuntimeError when the Chrome version cannot be read (the cache
+    is keyed by major version, so there would be nothing to look up) or
+    when the download fails with no driver for that major cached.
+    """
+    started = time.monotonic()
+    with span("driver resolve") as entry:
+        version = chrome_version()
+        entry['chrome_version'] = version
+        if not version:
+            raise RuntimeError(f"Could not read the installed Chrome version (no version folder next "
+                               f"to {CHROME_EXE}, and none of {', '.join(LINUX_CHROME_COMMANDS)} "
+                               f"answered --version). Install Chrome or fix CHROME_EXE.")
+        major = version.split('.')[0]
+        manifest = load_manifest()
+
+        path = None if refresh else cached_driver(manifest, major)
+        entry['source'] = 'cache'
+        if not path:
+            try:
+                path = download_driver(major, version)
+                entry['source'] = 'download'
+            except Exception as e:
+                # Offline (or --refresh failed): only a driver for this same
+                # major works; one for another Chrome version would not start
+                path = cached_driver(manifest, major)
+                if not path:
+                    raise RuntimeError(f"No cached ChromeDriver for Chrome {major} and the download "
+                                       f"failed: {e}") from e
+                print_step("DRIVER", f"Download failed ({e}); using cached driver for "
+                                     f"Chrome {major}", "info")
+                entry['source'] = 'cache (download failed)'
+
+    print_step("DRIVER", f"ChromeDriver for Chrome {version} from {entry['source']} "
+                         f"in {time.monotonic() - started:.2f}s", "success")
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description="Resolve a cached chromedriver for the installed Chrome")
+    parser.add_argument('--refresh', action='store_true', help="download again even if cached")
+    args = parser.parse_args()
+
+    try:
+        print(resolve_driver(refresh=args.refresh))
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,25 +5,69 @@ Uses Windows Chrome via CDP (same approach as yahoo_mail_automation.py)
 """
 
 from playwright.sync_api import sync_playwright
-import time
 import subprocess
+import time
 
-def print_step(step, message, status=""):
-    """Print formatted step message"""
-    icons = {"info": "ℹ️", "success": "✅", "wait": "⏳", "work": "🔧", "search": "🔍"}
-    icon = icons.get(status, "▶️")
-    print(f"{icon} [{step}] {message}")
+from browser_waits import (wait_until, wait_for_visible, probe_counts, messages_affected,
+                           wait_for_list_change)
+from selector_resolver import click_first
+from session_store import save_session, confirm_session
+from step_trace import print_step, span, traced
+
+SESSION_NAME = "gmail"
+
+# Elements only present in a logged-in Gmail
+LOGIN_INDICATORS = [
+    '[aria-label*="Compose"]',
+    '[aria-label*="Search mail"]',
+    'div[role="navigation"]',
+]
+
+# Gmail message list rows
+ROW_SELECTOR = 'tr.zA'
+
+# "No messages matched your search" cell
+EMPTY_SELECTOR = 'td.TC'
+
+# "1-50 of 1,234" result counter above the list
+COUNT_SELECTOR = 'span.Dj'
+
+# Gmail toolbar selectors, tried in order
+SELECT_ALL_SELECTORS = [
+    'div[role="checkbox"][aria-label*="Select"]',
+    'span[role="checkbox"]',
+    'div.oZ-jc.T-Jo',
+    '[aria-label="Select"]',
+    'div[gh="tm"] span[role="checkbox"]',
+]
+
+# "Select all conversations that match this search" banner link
+SELECT_MORE_SELECTOR = 'span:has-text("Select all")'
+
+DELETE_SELECTORS = [
+    'div[data-tooltip="Delete"]',
+    '[aria-label="Delete"]',
+    'div[aria-label="Delete"]',
+    'div.G-atb[data-tooltip="Delete"]',
+    'button[aria-label="Delete"]',
+]
+
+SPAM_SELECTORS = [
+    'div[data-tooltip="Report spam"]',
+    '[aria-label="Report spam"]',
+    'div.G-atb[data-tooltip="Report spam"]',
+    'button[aria-label="Report spam"]',
+]
+
+# Keyboard shortcuts (only active with Settings > Keyboard shortcuts on)
+SELECT_ALL_SHORTCUT = ['*', 'a']
+DELETE_SHORTCUT = ['#']
+SPAM_SHORTCUT = ['!']
 
 def is_logged_in(page):
     """Check if user is logged in to Gmail"""
     try:
-        indicators = [
-            '[aria-label*="Compose"]',
-            '[aria-label*="Search mail"]',
-            'div[role="navigation"]',
-        ]
-
-        for selector in indicators:
+        for selector in LOGIN_INDICATORS:
             if page.query_selector(selector):
                 return True
 
@@ -34,8 +78,14 @@ def is_logged_in(page):
     except:
         return False
 
+@traced("login wait")
 def wait_for_login(page, timeout=300):
     """Wait for user to complete manual login"""
+    # A restored session only needs one quick check
+    if confirm_session(page, LOGIN_INDICATORS):
+        print_step("LOGIN", "Session still valid - skipping login", "success")
+        return True
+
     print_step("LOGIN", "Please login to Gmail in the browser window", "wait")
     print("\n📋 Login steps:")
     print("   1. Enter your email")
@@ -44,16 +94,15 @@ def wait_for_login(page, timeout=300):
     print("   4. Complete any 2FA if required")
     print(f"\n⏳ Waiting up to {timeout} seconds for login...\n")
 
-    start_time = time.time()
-    while time.time() - start_time < timeout:
-        if is_logged_in(page):
-            print_step("LOGIN", "Login successful!", "success")
-            return True
-        time.sleep(2)
+    if wait_until("login", lambda: is_logged_in(page), timeout=timeout, interval=0.5, page=page):
+        print_step("LOGIN", "Login successful!", "success")
+        save_session(page.context, SESSION_NAME)
+        return True
 
     print_step("LOGIN", "Timeout waiting for login", "info")
     return False
 
+@traced("search")
 def search_emails(page, search_query):
     """Navigate to search results"""
     print_step("SEARCH", f"Searching for: {search_query}", "search")
@@ -61,7 +110,11 @@ def search_emails(page, search_query):
     try:
         search_url = f"https://mail.google.com/mail/u/0/#search/{search_query}"
         page.goto(search_url, wait_until='domcontentloaded')
-        time.sleep(5)
+
+        # Wait for the first result row instead of a fixed pause
+        if not wait_for_visible(page, ROW_SELECTOR, "search results", timeout=15):
+            print_step("SEARCH", "No result rows appeared", "info")
+            return False
 
         print_step("SEARCH", "Search page loaded", "success")
         return True
@@ -69,38 +122,24 @@ def search_emails(page, search_query):
         print_step("SEARCH", f"Error: {e}", "info")
         return False
 
+@traced("select")
 def select_all_emails(page):
     """Select all emails in the current view"""
     print_step("SELECT", "Selecting all emails...", "work")
 
     try:
-        # Gmail select all selectors
-        select_all_selectors = [
-            'div[role="checkbox"][aria-label*="Select"]',
-            'span[role="checkbox"]',
-            'div.oZ-jc.T-Jo',
-            '[aria-label="Select"]',
-            'div[gh="tm"] span[role="checkbox"]',
-        ]
-
-        for selector in select_all_selectors:
-            element = page.query_selector(selector)
-            if element:
-                try:
-                    element.click()
-                    time.sleep(1)
-                    print_step("SELECT", f"Clicked select all using: {selector}", "success")
-
-                    # Check for "Select all conversations that match this search"
-                    select_more = page.query_selector('span:has-text("Select all")')
-                    if select_more:
-                        select_more.click()
-                        time.sleep(1)
-                        print_step("SELECT", "Selected ALL matching emails", "success")
-
-                    return True
-                except:
-                    continue
+        # Resolve the checkbox in one round trip, learned order first
+        selector = click_first(page, "select_all", SELECT_ALL_SELECTORS)
+        if selector:
+            print_step("SELECT", f"Clicked select all using: {selector}", "success")
+
+            # Check for "Select all conversations that match this search"
+            select_more = wait_for_visible(page, SELECT_MORE_SELECTOR, "select-more link", timeout=2)
+            if select_more:
+                select_more.click()
+                print_step("SELECT", "Selected ALL matching emails", "success")
+
+            return True
 
         print_step("SELECT", "Could not find select all checkbox", "info")
         return False
@@ -109,37 +148,43 @@ def select_all_emails(page):
         print_step("SELECT", f"Error: {e}", "info")
         return False
 
+@traced("action")
 def delete_emails(page):
-    """Click the delete button"""
+    """Click the delete button.
+
+    Returns True if messages went, False if the button was clicked but
+    nothing was removed, None if the button was not found (or an error).
+    """
     print_step("DELETE", "Clicking delete button...", "work")
 
     try:
-        # Gmail delete button selectors
-        delete_selectors = [
-            'div[data-tooltip="Delete"]',
-            '[aria-label="Delete"]',
-            'div[aria-label="Delete"]',
-            'div.G-atb[data-tooltip="Delete"]',
-            'button[aria-label="Delete"]',
-        ]
-
-        for selector in delete_selectors:
-            element = page.query_selector(selector)
-            if element:
-                try:
-                    element.click()
-                    time.sleep(1)
-                    print_step("DELETE", "Clicked delete button!", "success")
-                    return True
-                except:
-                    continue
+        # The delete button only appears once something is selected
+        wait_for_visible(page, ', '.join(DELETE_SELECTORS), "delete button", timeout=5)
+        before = probe_counts(page, ROW_SELECTOR, COUNT_SELECTOR)
+        started = time.monotonic()
+
+        # Resolve the delete button in one round trip, learned order first
+        if click_first(page, "delete", DELETE_SELECTORS):
+            with span("verify") as verify:
+                changed = wait_for_list_change(page, ROW_SELECTOR, before, "delete: list refresh",
+                                               timeout=10, count_selector=COUNT_SELECTOR)
+                after = probe_counts(page, ROW_SELECTOR, COUNT_SELECTOR)
+                affected = messages_affected(before, after)
+                seconds = time.monotonic() - started
+                verify.update(changed=changed, affected=affected,
+                              msgs_per_sec=round(affected / seconds, 1) if seconds else None)
+            if not affected:
+                print_step("DELETE", "Clicked delete, but no messages were removed", "info")
+                return False
+            print_step("DELETE", f"Deleted {affected} messages ({affected / seconds:.1f} msgs/s)", "success")
+            return True
 
         print_step("DELETE", "Could not find delete button - may need to do manually", "info")
-        return False
+        return None
 
     except Exception as e:
         print_step("DELETE", f"Error: {e}", "info")
-        return False
+        return None
 
 def main():
     """Main automation function"""
@@ -0,0 +1,471 @@
+#!/usr/bin/env python3
+"""
+IMAP Bulk Cleanup Backend
+Sender-based cleanup without the web UI: UID SEARCH for the query, then
+chunked UID MOVE (or COPY + STORE \\Deleted + EXPUNGE when the server lacks
+MOVE) spread over a small pool of connections.
+
+Actions keep the web-flow semantics:
+    delete  -> move to Trash          (same as delete_emails)
+    spam    -> move to Spam / Bulk    (same as mark_as_spam)
+    archive -> move out of the Inbox
+
+Mailboxes are found by their special-use attribute (\\All, \\Trash,
+\\Junk, \\Archive) from LIST, so localized or "Google Mail"-branded
+folder names work; the usual names are only a fallback. Gmail searches All
+Mail; Yahoo has no such folder, so like its web search every folder except
+Trash, Spam, Sent and Drafts is searched.
+
+With --incremental, the highest processed UID (per mailbox and
+UIDVALIDITY) and the run time are kept in cleanup_state.py's state file,
+and the next run only searches newer messages.
+
+Every run also checkpoints the highest UID below which all chunks are done.
+If it is interrupted, the next run with the same provider/action/query
+resumes above that UID (if UIDVALIDITY is unchanged); --restart discards
+the checkpoint.
+
+Credentials come from --user / $IMAP_USER and $IMAP_PASSWORD (use an app
+password). --host/--port/--no-ssl point it at a local IMAP stand-in such
+as mock_imap.py.
+
+Usage:
+    python imap_cleanup.py gmail delete "from:no-reply@sender.skyscanner.com"
+    python imap_cleanup.py yahoo spam skyscanner.com --dry-run
+"""
+
+import argparse
+import imaplib
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from cleanup_state import (get_mark, update_mark, since_timestamp, imap_since_date, run_started,
+                           get_checkpoint, save_checkpoint, clear_checkpoint)
+from step_trace import print_step
+
+# Mailboxes are given as special-use attributes (RFC 6154) or plain names.
+# search_mailboxes None means every folder, as in the provider's web search.
+IMAP_PROVIDERS = {
+    'gmail': {
+        'host': 'imap.gmail.com',
+        'port': 993,
+        'search_mailboxes': ['\\All'],
+        'archive_mailbox': 'INBOX',
+        'targets': {
+            'delete': '\\Trash',
+            'spam': '\\Junk',
+            'archive': '\\All',
+        },
+        'fallback_names': {
+            '\\All': '[Gmail]/All Mail',
+            '\\Trash': '[Gmail]/Trash',
+            '\\Junk': '[Gmail]/Spam',
+        },
+    },
+    'yahoo': {
+        'host': 'imap.mail.yahoo.com',
+        'port': 993,
+        'search_mailboxes': None,
+        'archive_mailbox': 'INBOX',
+        'targets': {
+            'delete': '\\Trash',
+            'spam': '\\Junk',
+            'archive': '\\Archive',
+        },
+        'fallback_names': {
+            '\\Trash': 'Trash',
+            '\\Junk': 'Bulk',
+            '\\Archive': 'Archive',
+            '\\Sent': 'Sent',
+            '\\Drafts': 'Draft',
+        },
+    },
+}
+
+# Never searched when a provider searches every folder
+SKIPPED_ROLES = ['\\Trash', '\\Junk', '\\Sent', '\\Drafts']
+
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_CONNECTIONS = 4
+
+# One LIST response: (flags) "delimiter" name
+LIST_PATTERN = re.compile(r'\((?P<flags>[^)]*)\)\s+(?:"(?:[^"\\]|\\.)*"|NIL)\s+(?P<name>.*)$')
+
+def quote(text):
+    """IMAP quoted string (mailbox names like '[Gmail]/All Mail', search terms)"""
+    return '"' + text.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+def unquote(text):
+    """Mailbox name from a LIST response, quoted or as an atom"""
+    text = text.strip()
+    if len(text) >= 2 and text[0] == text[-1] == '"':
+        return re.sub(r'\\(.)', r'\1', text[1:-1])
+    return text
+
+def build_criteria(provider, query):
+    """Turn a web-style query into UID SEARCH criteria.
+
+    'from:addr' or a bare address -> FROM "addr". Anything else on Gmail is
+    passed through X-GM-RAW so Gmail's own search operators keep working.
+    """
+    query = query.strip()
+    match = re.fullmatch(r'(?:from:)?([^\s:"]+)', query)
+    if match:
+        return ['FROM', quote(match.group(1))]
+    if provider == 'gmail':
+        return ['X-GM-RAW', quote(query)]
+    raise ValueError(f"Unsupported query for {provider} IMAP: {query}")
+
+def uid_set(uids):
+    """Compress sorted UIDs into an IMAP sequence set like '1:5,9,12:14'"""
+    parts = []
+    start = prev = None
+    for uid in uids:
+        if start is None:
+            start = prev = uid
+        elif uid == prev + 1:
+            prev = uid
+        else:
+            parts.append(f"{start}:{prev}" if start != prev else str(start))
+            start = prev = uid
+    if start is not None:
+        parts.append(f"{start}:{prev}" if start != prev else str(start))
+    return ','.join(parts)
+
+def connect(host, port, user, password, use_ssl=True):
+    """Open and authenticate one IMAP connection"""
+    conn = imaplib.IMAP4_SSL(host, port) if use_ssl else imaplib.IMAP4(host, port)
+    conn.login(user, password)
+    return conn
+
+def capabilities(conn):
+    """Server capabilities as a set of upper-case strings"""
+    return {c.decode().upper() if isinstance(c, bytes) else c.upper() for c in conn.capabilities}
+
+def list_mailboxes(conn):
+    """[(name, {lower-case flags})] for every mailbox; flags include special-use roles"""
+    typ, data = conn.list()
+    if typ != 'OK':
+        raise RuntimeError(f"LIST failed: {data}")
+    mailboxes = []
+    for item in data:
+        if not item:
+            continue
+        if isinstance(item, tuple):
+            # Name sent as a literal: (b'(flags) "/" {n}', b'name')
+            line, name = item[0].decode(), item[1].decode()
+            flags = re.match(r'\(([^)]*)\)', line).group(1)
+        else:
+            match = LIST_PATTERN.match(item.decode())
+            if not match:
+                continue
+            flags, name = match.group('flags'), unquote(match.group('name'))
+        mailboxes.append((name, {f.lower() for f in flags.split()}))
+    return mailboxes
+
+def find_mailbox(mailboxes, provider, mailbox):
+    """Name of the mailbox with a special-use role, else the provider's usual name.
+
+    Plain names (e.g. INBOX) are returned unchanged. Raises RuntimeError when
+    the server has no such mailbox.
+    """
+    if not mailbox.startswith('\\'):
+        return mailbox
+    for name, flags in mailboxes:
+        if mailbox.lower() in flags:
+            return name
+    fallback = IMAP_PROVIDERS[provider]['fallback_names'].get(mailbox)
+    if fallback and any(name == fallback for name, _ in mailboxes):
+        return fallback
+    raise RuntimeError(f"No {mailbox} mailbox on this server "
+                       f"(mailboxes: {', '.join(name for name, _ in mailboxes)})")
+
+def source_mailboxes(mailboxes, provider, action, target):
+    """Mailboxes to search for an action, in LIST order"""
+    cfg = IMAP_PROVIDERS[provider]
+    if action == 'archive':
+        return [cfg['archive_mailbox']]
+    if cfg['search_mailboxes'] is not None:
+        return [find_mailbox(mailboxes, provider, m) for m in cfg['search_mailboxes']]
+
+    skipped = {target}
+    for role in SKIPPED_ROLES:
+        try:
+            skipped.add(find_mailbox(mailboxes, provider, role))
+        except RuntimeError:
+            pass
+    return [name for name, flags in mailboxes
+            if name not in skipped and not flags & {'\\noselect', '\\nonexistent'}]
+
+def select(conn, mailbox, readonly=False):
+    typ, data = conn.select(quote(mailbox), readonly=readonly)
+    if typ != 'OK':
+        raise RuntimeError(f"Cannot select {mailbox}: {data}")
+
+def uidvalidity(conn):
+    """UIDVALIDITY of the currently selected mailbox, or None"""
+    typ, data = conn.response('UIDVALIDITY')
+    if data and data[0]:
+        return int(data[0])
+    return None
+
+def search_uids(conn, criteria):
+    """UID SEARCH, returning a sorted list of ints"""
+    typ, data = conn.uid('SEARCH', None, *criteria)
+    if typ != 'OK':
+        raise RuntimeError(f"UID SEARCH failed: {data}")
+    return sorted(int(u) for u in b' '.join(d for d in data if d).split())
+
+def deleted_uids(conn):
+    """UIDs already flagged \\Deleted in the selected mailbox"""
+    return search_uids(conn, ['DELETED'])
+
+def apply_chunk(conn, uids, target, caps):
+    """Move one chunk of UIDs to `target` with as few commands as the server allows.
+
+    Without MOVE or UIDPLUS the flagged messages go with a plain EXPUNGE,
+    which removes every \\Deleted message in the mailbox; run_cleanup()
+    refuses that path while other messages are flagged.
+    """
+    seq = uid_set(uids)
+    mailbox = quote(target)
+
+    if 'MOVE' in caps:
+        typ, data = conn.uid('MOVE', seq, mailbox)
+        if typ != 'OK':
+            raise RuntimeError(f"UID MOVE failed: {data}")
+        return
+
+    typ, data = conn.uid('COPY', seq, mailbox)
+    if typ != 'OK':
+        raise RuntimeError(f"UID COPY failed: {data}")
+    conn.uid('STORE', seq, '+FLAGS.SILENT', r'(\Deleted)')
+    if 'UIDPLUS' in caps:
+        conn.uid('EXPUNGE', seq)
+    else:
+        conn.expunge()
+
+def chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def clean_mailbox(pool, open_connection, mailbox, target, criteria, caps, chunk_size, connections,
+                  dry_run=False, mark=None, checkpoint_key=None):
+    """Search one mailbox and move every match to `target`; returns its summary dict.
+
+    `pool` holds open connections (at least one) and grows with
+    open_connection() up to `connections`. `mark` is a high-water mark from
+    cleanup_state (last_run, last_uid, uidvalidity); when given, only newer
+    messages are searched. With `checkpoint_key`, progress is checkpointed
+    after each contiguous run of finished chunks and a previous interrupted
+    run is resumed.
+    """
+    started = time.monotonic()
+    first = pool[0]
+    select(first, mailbox, readonly=dry_run)
+    validity = uidvalidity(first)
+
+    mark = mark or {}
+    last_uid = mark.get('last_uid') if mark.get('uidvalidity') == validity else None
+    since = since_timestamp(mark)
+
+    checkpoint = get_checkpoint(checkpoint_key) if checkpoint_key and not dry_run else None
+    if checkpoint and checkpoint.get('uidvalidity') != validity:
+        print_step("RESUME", f"{mailbox}: UIDVALIDITY changed; discarding checkpoint", "info")
+        checkpoint = None
+    floor = last_uid
+    if checkpoint:
+        floor = max(floor or 0, checkpoint['done_uid']) or None
+        print_step("RESUME", f"{mailbox}: {checkpoint['processed']} messages already done, "
+                             f"continuing above UID {floor}", "info")
+
+    if floor:
+        criteria = criteria + ['UID', f"{floor + 1}:*"]
+    if since is not None and not last_uid:
+        criteria = criteria + ['SINCE', imap_since_date(since)]
+
+    # "n:*" always includes the highest UID, even when it is below n
+    uids = [u for u in search_uids(first, criteria) if not floor or u > floor]
+    print_step("SEARCH", f"{len(uids)} messages match {' '.join(criteria)} in {mailbox}", "search")
+    summary = {'matched': len(uids), 'processed': 0, 'seconds': 0.0,
+               'resumed': checkpoint['processed'] if checkpoint else 0,
+               'started': checkpoint['started'] if checkpoint else run_started(),
+               'uidvalidity': validity, 'max_uid': max(uids) if uids else floor}
+    if dry_run or not uids:
+        if checkpoint_key and not dry_run:
+            clear_checkpoint(checkpoint_key)
+        summary['seconds'] = time.monotonic() - started
+        return summary
+
+    if 'MOVE' not in caps and 'UIDPLUS' not in caps:
+        # A plain EXPUNGE removes every \\Deleted message, not just ours
+        others = set(deleted_uids(first)) - set(uids)
+        if others:
+            raise RuntimeError(f"{mailbox}: the server supports neither MOVE nor UIDPLUS, so moved "
+                               f"messages can only be removed with a plain EXPUNGE, which would also "
+                               f"erase {len(others)} other message(s) already flagged \\Deleted. "
+                               f"Expunge or undelete them in your mail client first.")
+        print_step("EXPUNGE", f"{mailbox}: server lacks MOVE and UIDPLUS; using plain EXPUNGE, which also "
+                              f"removes anything another client flags \\Deleted during the run", "info")
+
+    if checkpoint_key:
+        save_checkpoint(checkpoint_key, uidvalidity=validity, done_uid=floor or 0,
+                        processed=summary['resumed'], started=summary['started'])
+
+    batches = list(chunks(uids, chunk_size))
+
+    # One connection per worker; each has this mailbox selected
+    while len(pool) < min(connections, len(batches)):
+        pool.append(open_connection())
+    workers = pool[:max(1, min(connections, len(batches)))]
+    for conn in workers[1:]:
+        select(conn, mailbox)
+
+    free = list(workers)
+    lock = threading.Lock()
+    finished = set()
+    progress = {'contiguous': 0}
+
+    def worker(index):
+        batch = batches[index]
+        with lock:
+            conn = free.pop()
+        try:
+            apply_chunk(conn, batch, target, caps)
+        finally:
+            with lock:
+                free.append(conn)
+
+        with lock:
+            summary['processed'] += len(batch)
+            # Chunks finish out of order; only checkpoint below the first gap
+            finished.add(index)
+            contiguous = progress['contiguous']
+            while contiguous in finished:
+                contiguous += 1
+            if checkpoint_key and contiguous > progress['contiguous']:
+                done = sum(len(b) for b in batches[:contiguous])
+                save_checkpoint(checkpoint_key, done_uid=batches[contiguous - 1][-1],
+                                processed=summary['resumed'] + done)
+            progress['contiguous'] = contiguous
+            elapsed = time.monotonic() - started
+            rate = summary['processed'] / elapsed * 60 if elapsed else 0
+            print(f"   {summary['processed']}/{len(uids)} processed ({rate:,.0f} msg/min)")
+
+    with ThreadPoolExecutor(max_workers=len(workers)) as executor:
+        list(executor.map(worker, range(len(batches))))
+
+    if checkpoint_key:
+        clear_checkpoint(checkpoint_key)
+    summary['seconds'] = time.monotonic() - started
+    return summary
+
+def run_cleanup(provider, action, query, user, password, host=None, port=None, use_ssl=True,
+                chunk_size=DEFAULT_CHUNK_SIZE, connections=DEFAULT_CONNECTIONS, dry_run=False,
+                state_key=None, incremental=False, restart=False):
+    """Search every source mailbox and act on the matches; returns a summary dict.
+
+    With `state_key`, each mailbox keeps its checkpoint (and, with
+    `incremental`, its high-water mark) under "<state_key>:<mailbox>";
+    `restart` discards the checkpoints first.
+    """
+    cfg = IMAP_PROVIDERS[provider]
+    if action not in cfg['targets']:
+        raise ValueError(f"Unknown action '{action}' (expected one of: {', '.join(cfg['targets'])})")
+
+    host = host or cfg['host']
+    port = port or cfg['port']
+    criteria = build_criteria(provider, query)
+
+    def open_connection():
+        return connect(host, port, user, password, use_ssl)
+
+    started = time.monotonic()
+    pool = [open_connection()]
+    try:
+        caps = capabilities(pool[0])
+        mailboxes = list_mailboxes(pool[0])
+        target = find_mailbox(mailboxes, provider, cfg['targets'][action])
+        sources = source_mailboxes(mailboxes, provider, action, target)
+        print_step("MAILBOX", f"Searching {', '.join(sources)} -> {target}", "info")
+
+        summary = {'provider': provider, 'action': action, 'query': query, 'target': target,
+                   'matched': 0, 'processed': 0, 'resumed': 0, 'seconds': 0.0, 'mailboxes': {}}
+        for mailbox in sources:
+            key = f"{state_key}:{mailbox}" if state_key else None
+            if key and restart:
+                clear_checkpoint(key)
+            result = clean_mailbox(pool, open_connection, mailbox, target, criteria, caps,
+                                   chunk_size, connections, dry_run=dry_run,
+                                   mark=get_mark(key) if key and incremental else None,
+                                   checkpoint_key=key)
+            summary['mailboxes'][mailbox] = result
+            for field in ('matched', 'processed', 'resumed'):
+                summary[field] += result[field]
+
+            if key and incremental and not dry_run:
+                # A resumed run keeps the first attempt's start time as its mark
+                update_mark(key, last_run=result['started'], last_uid=result['max_uid'],
+                            uidvalidity=result['uidvalidity'])
+
+        summary['seconds'] = time.monotonic() - started
+        return summary
+
+    finally:
+        for conn in pool:
+            try:
+                conn.logout()
+            except Exception:
+                pass
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk mail cleanup over IMAP")
+    parser.add_argument('provider', choices=list(IMAP_PROVIDERS))
+    parser.add_argument('action', choices=['delete', 'spam', 'archive'])
+    parser.add_argument('query', help="sender address or 'from:address' (Gmail also accepts raw search)")
+    parser.add_argument('--user', default=os.environ.get('IMAP_USER'))
+    parser.add_argument('--host')
+    parser.add_argument('--port', type=int)
+    parser.add_argument('--no-ssl', action='store_true', help="plain IMAP (local stand-in servers)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--connections', type=int, default=DEFAULT_CONNECTIONS)
+    parser.add_argument('--dry-run', action='store_true', help="only count matching messages")
+    parser.add_argument('--incremental', action='store_true', help="only messages newer than the last run")
+    parser.add_argument('--restart', action='store_true', help="ignore the checkpoint of an interrupted run")
+    args = parser.parse_args()
+
+    password = os.environ.get('IMAP_PASSWORD')
+    if not args.user or not password:
+        print("❌ Set --user (or IMAP_USER) and IMAP_PASSWORD")
+        sys.exit(1)
+
+    try:
+        summary = run_cleanup(args.provider, args.action, args.query, args.user, password,
+                              host=args.host, port=args.port, use_ssl=not args.no_ssl,
+                              chunk_size=args.chunk_size, connections=args.connections,
+                              dry_run=args.dry_run, incremental=args.incremental, restart=args.restart,
+                              state_key=f"imap:{args.provider}:{args.action}:{args.query}")
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    rate = summary['processed'] / summary['seconds'] * 60 if summary['seconds'] else 0
+    print("\n" + "="*60)
+    print(f"✅ {summary['processed']}/{summary['matched']} messages -> {args.action} ({summary['target']}) "
+          f"in {summary['seconds']:.1f}s ({rate:,.0f} msg/min)")
+    if len(summary['mailboxes']) > 1:
+        for mailbox, result in summary['mailboxes'].items():
+            print(f"   {mailbox}: {result['processed']}/{result['matched']}")
+    if summary['resumed']:
+        print(f"   plus {summary['resumed']} done by the interrupted run")
+    print("="*60)
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Cleanup interrupted by user")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Keyboard-Shortcut Actions
+Select all / delete / spam through the mail sites' own keyboard shortcuts
+(page.keyboard -> CDP Input.dispatchKeyEvent) instead of finding and
+clicking toolbar buttons. Each step reports whether the shortcut took, so
+callers can fall back to the selector path when shortcuts are disabled.
+
+Which strategy won is kept per site in the selector_resolver hit table
+(key "<step> strategy"), so a site with shortcuts turned off goes straight
+to the selector path on later runs.
+"""
+
+from browser_waits import wait_until, wait_for_visible, probe_counts, wait_for_list_change
+from mail_providers import get_provider
+from selector_resolver import site_of, rank_selectors, record_result
+from step_trace import print_step
+
+STRATEGIES = ['keyboard', 'selector']
+
+# How long to wait for a shortcut to show any effect before falling back
+SHORTCUT_TIMEOUT = 2
+
+# True when any select-all or row checkbox is checked or partly checked.
+# The toolbar is no proof: Yahoo shows it, disabled, with nothing selected.
+CHECKED_JS = """
+(selectors) => selectors.some((selector) => {
+    let els;
+    try {
+        els = document.querySelectorAll(selector);
+    } catch (e) {
+        return false;
+    }
+    return Array.from(els).some((el) => el.checked === true
+        || ['true', 'mixed'].includes(el.getAttribute('aria-checked')));
+})
+"""
+
+def strategy_order(page, step):
+    """Strategies for a step, best hit rate on this site first"""
+    return rank_selectors(site_of(page), f"{step} strategy", STRATEGIES)
+
+def record_strategy(page, step, tried, winner):
+    """Count the strategies tried for a step and which one worked"""
+    record_result(site_of(page), f"{step} strategy", tried, winner)
+
+def press_keys(page, keys):
+    """Press a shortcut sequence with focus on the page, not the search box"""
+    page.evaluate("() => document.activeElement && document.activeElement.blur()")
+    for key in keys:
+        page.keyboard.press(key)
+
+def keyboard_select_all(page, provider):
+    """Select all via shortcut; True once the checkboxes show the selection took"""
+    config = get_provider(provider)
+    keys = config['shortcuts']['select_all']
+    if not keys:
+        return False
+
+    press_keys(page, keys)
+
+    if not wait_until("select all (keyboard)", lambda: page.evaluate(CHECKED_JS, config['select_all']),
+                      timeout=SHORTCUT_TIMEOUT, page=page):
+        return False
+
+    click_select_more(page, config)
+    return True
+
+def click_select_more(page, config):
+    """Extend the selection to every match if the site offers it"""
+    select_more = wait_for_visible(page, config['select_more'], "select-more link", timeout=SHORTCUT_TIMEOUT)
+    if select_more:
+        select_more.click()
+
+def selection_active(page, provider):
+    """True if the list already has a selection, e.g. from a shortcut that took late"""
+    return page.evaluate(CHECKED_JS, get_provider(provider)['select_all'])
+
+def click_select_all(page, provider):
+    """Selector fallback for select all that never undoes an existing selection.
+
+    Clicking the select-all checkbox toggles it, so if a slow shortcut has
+    selected the list in the meantime the click would clear it again.
+    """
+    config = get_provider(provider)
+    if selection_active(page, provider):
+        print_step("SELECT", "List already selected, not clicking select all", "info")
+        click_select_more(page, config)
+        return True
+    return config['select_all_emails'](page)
+
+def keyboard_action(page, provider, action):
+    """Delete/spam via shortcut.
+
+    Returns True once the message list changes, None if it does not (no
+    shortcut, or shortcuts disabled) so the caller falls back to the
+    toolbar buttons - the same contract as cleanup_runner.run_action().
+    The toolbar cannot tell: Yahoo keeps it visible, disabled, afterwards.
+    """
+    config = get_provider(provider)
+    keys = config['shortcuts'].get(action)
+    if not keys:
+        return None
+
+    before = probe_counts(page, config['row_selector'], config['count_selector'])
+    press_keys(page, keys)
+
+    if not wait_for_list_change(page, config['row_selector'], before,
+                                f"{action} (keyboard): list refresh", timeout=10,
+                                count_selector=config['count_selector']):
+        return None
+    return True
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Mail Provider Table
+Search URLs, toolbar selectors and flow functions for Gmail and Yahoo Mail,
+shared by the engines and runners that drive more than one provider.
+"""
+
+from urllib.parse import quote
+
+import gmail_delete_final as gmail
+import yahoo_mail_automation as yahoo
+
+def gmail_search_url(query):
+    """Gmail search results URL for a raw query string"""
+    return f"https://mail.google.com/mail/u/0/#search/{quote(query)}"
+
+def yahoo_search_url(query):
+    """Yahoo search results URL (Yahoo expects the keyword double-encoded)"""
+    return f"https://mail.yahoo.com/d/search/keyword={quote(quote(query, safe=''), safe='')}"
+
+PROVIDERS = {
+    'gmail': {
+        'origin': "https://mail.google.com",
+        'home_url': "https://mail.google.com/mail/u/0/#inbox",
+        'search_url': gmail_search_url,
+        'row_selector': gmail.ROW_SELECTOR,
+        'empty_selector': gmail.EMPTY_SELECTOR,
+        'count_selector': gmail.COUNT_SELECTOR,
+        'wait_for_login': gmail.wait_for_login,
+        'select_all_emails': gmail.select_all_emails,
+        'session_name': gmail.SESSION_NAME,
+        'login_indicators': gmail.LOGIN_INDICATORS,
+        'select_all': gmail.SELECT_ALL_SELECTORS,
+        'select_more': gmail.SELECT_MORE_SELECTOR,
+        'actions': {
+            'delete': gmail.DELETE_SELECTORS,
+            'spam': gmail.SPAM_SELECTORS,
+        },
+        'shortcuts': {
+            'select_all': gmail.SELECT_ALL_SHORTCUT,
+            'delete': gmail.DELETE_SHORTCUT,
+            'spam': gmail.SPAM_SHORTCUT,
+        },
+    },
+    'yahoo': {
+        'origin': "https://mail.yahoo.com",
+        'home_url': "https://mail.yahoo.com",
+        'search_url': yahoo_search_url,
+        'row_selector': yahoo.ROW_SELECTOR,
+        'empty_selector': yahoo.EMPTY_SELECTOR,
+        'count_selector': yahoo.COUNT_SELECTOR,
+        'wait_for_login': yahoo.wait_for_login,
+        'select_all_emails': yahoo.select_all_emails,
+        'session_name': yahoo.SESSION_NAME,
+        'login_indicators': yahoo.LOGIN_INDICATORS,
+        'select_all': yahoo.SELECT_ALL_SELECTORS,
+        'select_more': yahoo.SELECT_MORE_SELECTOR,
+        'actions': {
+            'delete': yahoo.DELETE_SELECTORS,
+            'spam': yahoo.SPAM_SELECTORS,
+        },
+        'shortcuts': {
+            'select_all': yahoo.SELECT_ALL_SHORTCUT,
+            'delete': yahoo.DELETE_SHORTCUT,
+            'spam': yahoo.SPAM_SHORTCUT,
+        },
+    },
+}
+
+def get_provider(name):
+    """Look up a provider config, raising ValueError for unknown names"""
+    try:
+        return PROVIDERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown provider '{name}' (expected one of: {', '.join(PROVIDERS)})")
+
+def get_action_selectors(provider, action):
+    """Toolbar selectors for an action ('delete' or 'spam') on a provider"""
+    actions = get_provider(provider)['actions']
+    try:
+        return actions[action]
+    except KeyError:
+        raise ValueError(f"Unknown action '{action}' for {provider} (expected one of: {', '.join(actions)})")
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Browser Memory Governor
+Keeps a long-lived broker Chrome from growing without bound. Gmail's
+single-page app accumulates heap and DOM over hours, so each tab is
+sampled through CDP (Performance.getMetrics) and, between jobs, a tab over
+the limit is replaced by a fresh one on the same URL. `status` also lists
+the browser's processes from SystemInfo.getProcessInfo.
+
+There is no whole-browser memory budget: the broker Chrome runs on Windows,
+and its process ids are not visible from WSL, so the per-tab JS heap is
+the only memory figure available.
+
+cleanup_runner.py checks its tab before every rule. For a broker Chrome
+left open for days, run the watcher: it only recycles idle (unleased) tabs.
+
+Usage:
+    python memory_governor.py status                    # per-tab memory
+    python memory_governor.py watch                     # recycle every 5 min
+    python memory_governor.py watch --limit-mb 300 --interval 60
+"""
+
+import argparse
+import sys
+import time
+
+from playwright.sync_api import sync_playwright
+
+import browser_broker
+from step_trace import print_step, span
+
+# Per-tab JS heap above which a tab is recycled between jobs
+TAB_HEAP_LIMIT_MB = 400
+
+WATCH_INTERVAL = 300
+
+MB = 1024 * 1024
+
+def sample_tab(page):
+    """{heap_mb, heap_total_mb, nodes, documents, listeners} for one tab"""
+    session = page.context.new_cdp_session(page)
+    try:
+        session.send("Performance.enable")
+        metrics = {m['name']: m['value'] for m in session.send("Performance.getMetrics")['metrics']}
+    finally:
+        session.detach()
+    return {
+        'heap_mb': round(metrics.get('JSHeapUsedSize', 0) / MB, 1),
+        'heap_total_mb': round(metrics.get('JSHeapTotalSize', 0) / MB, 1),
+        'nodes': int(metrics.get('Nodes', 0)),
+        'documents': int(metrics.get('Documents', 0)),
+        'listeners': int(metrics.get('JSEventListeners', 0)),
+    }
+
+def browser_processes(browser):
+    """[{type, id, cpuTime}] for the browser's processes, or None"""
+    try:
+        session = browser.new_browser_cdp_session()
+    except Exception:
+        return None
+    try:
+        return session.send("SystemInfo.getProcessInfo")['processInfo']
+    except Exception:
+        return None
+    finally:
+        session.detach()
+
+def recycle_tab(page, url=None):
+    """Replace `page` with a fresh tab on `url` (default: its current URL).
+
+    The new tab is opened and loaded before the old one closes, so the
+    window never loses its last tab. The caller must hold the lease on
+    `page` (or know it is idle); the lease moves to the new tab.
+    """
+    context = page.context
+    url = url or page.url
+    with span("tab recycle", url=url):
+        fresh = context.new_page()
+        browser_broker.lease_tab(fresh, url)
+        try:
+            if url and url != "about:blank":
+                fresh.goto(url, wait_until='domcontentloaded')
+        except Exception:
+            # Keep working in the old tab rather than losing both
+            browser_broker.release_tab(fresh)
+            fresh.close()
+            raise
+        browser_broker.release_tab(page)
+        page.close()
+    return fresh
+
+def recycle_if_needed(page, url=None, limit_mb=TAB_HEAP_LIMIT_MB):
+    """Between jobs: return `page`, or a fresh tab if it has grown past the limit"""
+    try:
+        sample = sample_tab(page)
+    except Exception:
+        return page
+    if sample['heap_mb'] <= limit_mb:
+        return page
+
+    print_step("MEMORY", f"Tab heap {sample['heap_mb']:.0f} MB > {limit_mb} MB "
+                         f"({sample['nodes']} nodes), recycling", "work")
+    return recycle_tab(page, url)
+
+def govern(browser, limit_mb=TAB_HEAP_LIMIT_MB):
+    """One pass over every idle tab; returns how many were recycled"""
+    recycled = 0
+    for context in browser.contexts:
+        for page in list(context.pages):
+            try:
+                sample = sample_tab(page)
+                if sample['heap_mb'] <= limit_mb:
+                    continue
+                # Lease the tab ourselves so no runner picks it up mid-recycle
+                if not browser_broker.try_lease_tab(page, page.url):
+                    continue
+            except Exception:
+                continue
+            print_step("MEMORY", f"{sample['heap_mb']:.0f} MB in {page.url[:60]}, recycling", "work")
+            fresh = recycle_tab(page)
+            browser_broker.release_tab(fresh)
+            recycled += 1
+    return recycled
+
+def print_status(browser):
+    """Per-tab memory and the browser's process count"""
+    for context in browser.contexts:
+        for page in context.pages:
+            try:
+                s = sample_tab(page)
+                state = "leased" if browser_broker.tab_leased(page) else "idle"
+            except Exception as e:
+                print(f"   [?] {page.url[:70]} ({e})")
+                continue
+            print(f"   [{state}] heap {s['heap_mb']:>7.1f} MB  nodes {s['nodes']:>7}  "
+                  f"listeners {s['listeners']:>6}  {page.url[:60]}")
+
+    processes = browser_processes(browser)
+    if processes:
+        renderers = sum(1 for p in processes if p.get('type') == 'renderer')
+        print(f"   {len(processes)} browser processes ({renderers} renderers)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Sample and bound the broker Chrome's memory")
+    parser.add_argument('command', choices=['status', 'watch'])
+    parser.add_argument('--limit-mb', type=int, default=TAB_HEAP_LIMIT_MB, help="per-tab JS heap limit")
+    parser.add_argument('--interval', type=int, default=WATCH_INTERVAL, help="seconds between passes")
+    args = parser.parse_args()
+
+    if not browser_broker.is_browser_running():
+        print_step("MEMORY", "No broker Chrome running", "info")
+        return 1
+
+    with sync_playwright() as p:
+        browser = p.chromium.connect_over_cdp(browser_broker.CDP_URL)
+        try:
+            if args.command == 'status':
+                print_status(browser)
+                return 0
+
+            print_step("MEMORY", f"Watching tabs every {args.interval}s "
+                                 f"(limit {args.limit_mb} MB per tab)", "info")
+            while True:
+                recycled = govern(browser, args.limit_mb)
+                if recycled:
+                    print_step("MEMORY", f"Recycled {recycled} tab(s)", "success")
+                time.sleep(args.interval)
+        except KeyboardInterrupt:
+            return 0
+        finally:
+            browser_broker.detach(browser)
+
+if __name__ == "__main__":
+    sys.exit(main())
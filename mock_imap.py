@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+"""
+Mock IMAP Server
+A small local stand-in for the Gmail / Yahoo IMAP servers imap_cleanup.py
+talks to: LOGIN, LIST with special-use attributes, SELECT / EXAMINE, and
+UID SEARCH / MOVE / COPY / STORE / EXPUNGE over an in-memory set of
+mailboxes. MOVE, UIDPLUS and the special-use attributes can each be turned
+off to exercise the fallback paths.
+
+--check runs imap_cleanup against a series of scenarios (the default
+serve-mode mailbox, a "Google Mail" account, Yahoo folders beyond the Inbox, a Gmail query containing quotes,
+a server without MOVE / UIDPLUS) and reports each one.
+
+Usage:
+    python mock_imap.py --check
+    python mock_imap.py --provider yahoo --messages 500   # serve on 127.0.0.1:1143
+    IMAP_PASSWORD=x python imap_cleanup.py yahoo spam skyscanner.com \\
+        --user me --host 127.0.0.1 --port 1143 --no-ssl
+"""
+
+import argparse
+import re
+import socketserver
+import sys
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+DEFAULT_PORT = 1143
+DEFAULT_PROVIDER = 'gmail'
+DEFAULT_MESSAGES = 100
+
+# Mailbox layouts: (name, special-use attribute or None)
+LAYOUTS = {
+    'gmail': [
+        ('INBOX', None),
+        ('[Gmail]/All Mail', '\\All'),
+        ('[Gmail]/Trash', '\\Trash'),
+        ('[Gmail]/Spam', '\\Junk'),
+        ('[Gmail]/Sent Mail', '\\Sent'),
+    ],
+    # Accounts in the UK / Germany see the "Google Mail" brand
+    'googlemail': [
+        ('INBOX', None),
+        ('[Google Mail]/All Mail', '\\All'),
+        ('[Google Mail]/Bin', '\\Trash'),
+        ('[Google Mail]/Spam', '\\Junk'),
+        ('[Google Mail]/Sent Mail', '\\Sent'),
+    ],
+    'yahoo': [
+        ('INBOX', None),
+        ('Archive', '\\Archive'),
+        ('Bulk', '\\Junk'),
+        ('Draft', '\\Drafts'),
+        ('Sent', '\\Sent'),
+        ('Trash', '\\Trash'),
+        ('Travel', None),
+    ],
+}
+
+SENDER = "no-reply@sender.skyscanner.com"
+
+class Unsupported(Exception):
+    """Command the mock does not implement or has turned off; answered BAD"""
+
+class Mailstore:
+    """Mailboxes of messages: {uid, sender, subject, date, flags}"""
+
+    def __init__(self, layout, move=True, uidplus=True, special_use=True):
+        self.lock = threading.Lock()
+        self.order = [name for name, _ in LAYOUTS[layout]]
+        self.roles = dict(LAYOUTS[layout])
+        self.boxes = {name: {'uidvalidity': 1000 + i, 'uidnext': 1, 'messages': []}
+                      for i, name in enumerate(self.order)}
+        self.move = move
+        self.uidplus = uidplus
+        self.special_use = special_use
+        self.searches = []
+
+    def add(self, mailbox, count, sender=SENDER, subject="Deal", flags=()):
+        """Append `count` messages to a mailbox"""
+        box = self.boxes[mailbox]
+        now = datetime.now()
+        for i in range(count):
+            box['messages'].append({'uid': box['uidnext'], 'sender': sender,
+                                    'subject': f"{subject} #{i + 1}",
+                                    'date': now - timedelta(days=count - i), 'flags': set(flags)})
+            box['uidnext'] += 1
+
+    def count(self, mailbox, sender=None):
+        """Messages in a mailbox (optionally only from `sender`)"""
+        return sum(1 for m in self.boxes[mailbox]['messages'] if sender is None or m['sender'] == sender)
+
+    def seed(self, count):
+        """Serve-mode mail: `count` messages in INBOX and in All Mail.
+
+        Gmail lists every message in All Mail too, and that (\\All) is the
+        mailbox imap_cleanup searches; layouts without one get INBOX only.
+        """
+        self.add('INBOX', count)
+        for name, role in self.roles.items():
+            if role == '\\All':
+                self.add(name, count)
+
+    def capabilities(self):
+        caps = ['IMAP4rev1']
+        if self.move:
+            caps.append('MOVE')
+        if self.uidplus:
+            caps.append('UIDPLUS')
+        if self.special_use:
+            caps.append('SPECIAL-USE')
+        return ' '.join(caps)
+
+def tokenize(text):
+    """Split IMAP command arguments into atoms, unescaped quoted strings and (lists)"""
+    tokens = []
+    i = 0
+    while i < len(text):
+        c = text[i]
+        if c == ' ':
+            i += 1
+        elif c == '"':
+            value = []
+            i += 1
+            while text[i] != '"':
+                if text[i] == '\\':
+                    i += 1
+                value.append(text[i])
+                i += 1
+            tokens.append(''.join(value))
+            i += 1
+        elif c == '(':
+            end = text.index(')', i)
+            tokens.append(tokenize(text[i + 1:end]))
+            i = end + 1
+        else:
+            end = text.find(' ', i)
+            end = len(text) if end < 0 else end
+            tokens.append(text[i:end])
+            i = end
+    return tokens
+
+def parse_set(text, messages):
+    """UIDs in a sequence set like '1:5,9,12:*' that exist in `messages`"""
+    highest = max((m['uid'] for m in messages), default=0)
+    wanted = []
+    for part in text.split(','):
+        low, _, high = part.partition(':')
+        low = highest if low == '*' else int(low)
+        high = low if not high else (highest if high == '*' else int(high))
+        wanted.append((min(low, high), max(low, high)))
+    return {m['uid'] for m in messages if any(a <= m['uid'] <= b for a, b in wanted)}
+
+def matches(message, criteria, messages):
+    """Whether a message satisfies UID SEARCH criteria (the subset imap_cleanup sends)"""
+    i = 0
+    while i < len(criteria):
+        key = criteria[i].upper()
+        if key == 'ALL':
+            i += 1
+        elif key == 'DELETED':
+            if '\\Deleted' not in message['flags']:
+                return False
+            i += 1
+        elif key == 'FROM':
+            if criteria[i + 1].lower() not in message['sender'].lower():
+                return False
+            i += 2
+        elif key == 'X-GM-RAW':
+            # Enough of Gmail's syntax for the checks: from:addr plus "quoted phrase"
+            raw = criteria[i + 1]
+            sender = re.search(r'from:(\S+)', raw)
+            phrase = re.search(r'"([^"]*)"', raw)
+            if sender and sender.group(1).lower() not in message['sender'].lower():
+                return False
+            if phrase and phrase.group(1).lower() not in message['subject'].lower():
+                return False
+            i += 2
+        elif key == 'UID':
+            if message['uid'] not in parse_set(criteria[i + 1], messages):
+                return False
+            i += 2
+        elif key == 'SINCE':
+            if message['date'].date() < datetime.strptime(criteria[i + 1], "%d-%b-%Y").date():
+                return False
+            i += 2
+        else:
+            raise ValueError(f"unsupported search key {key}")
+    return True
+
+class MockImapHandler(socketserver.StreamRequestHandler):
+    """One client connection; commands run against the server's Mailstore"""
+
+    def send(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        self.store = self.server.store
+        self.selected = None
+        self.send("* OK mock IMAP ready")
+        for raw in self.rfile:
+            line = raw.decode().rstrip("\r\n")
+            tag, _, rest = line.partition(' ')
+            command, _, args = rest.partition(' ')
+            command = command.upper()
+            try:
+                if command == 'LOGOUT':
+                    self.send("* BYE logging out")
+                    self.send(f"{tag} OK LOGOUT completed")
+                    return
+                if command == 'UID':
+                    command, _, args = args.partition(' ')
+                    handler = getattr(self, f"uid_{command.lower()}", None)
+                else:
+                    handler = getattr(self, f"cmd_{command.lower()}", None)
+                if handler is None:
+                    raise Unsupported(command)
+                with self.store.lock:
+                    result = handler(tokenize(args))
+                self.send(f"{tag} OK {result or command.upper() + ' completed'}")
+            except Unsupported as e:
+                self.send(f"{tag} BAD unknown command {e}")
+            except Exception as e:
+                self.send(f"{tag} NO {e}")
+
+    def box(self):
+        if self.selected is None:
+            raise ValueError("no mailbox selected")
+        return self.store.boxes[self.selected]
+
+    def cmd_capability(self, args):
+        self.send(f"* CAPABILITY {self.store.capabilities()}")
+
+    def cmd_noop(self, args):
+        pass
+
+    def cmd_login(self, args):
+        pass
+
+    def cmd_list(self, args):
+        for name in self.store.order:
+            role = self.store.roles[name] if self.store.special_use else None
+            flags = '\\HasNoChildren' + (f" {role}" if role else "")
+            quoted = name.replace('\\', '\\\\').replace('"', '\\"')
+            self.send(f'* LIST ({flags}) "/" "{quoted}"')
+
+    def cmd_select(self, args, readonly=False):
+        if args[0] not in self.store.boxes:
+            raise ValueError(f"no mailbox {args[0]}")
+        self.selected = args[0]
+        box = self.box()
+        self.send("* FLAGS (\\Seen \\Deleted)")
+        self.send(f"* {len(box['messages'])} EXISTS")
+        self.send("* 0 RECENT")
+        self.send(f"* OK [UIDVALIDITY {box['uidvalidity']}] UIDs valid")
+        self.send(f"* OK [UIDNEXT {box['uidnext']}] next UID")
+        return "[READ-ONLY] EXAMINE completed" if readonly else "[READ-WRITE] SELECT completed"
+
+    def cmd_examine(self, args):
+        return self.cmd_select(args, readonly=True)
+
+    def cmd_expunge(self, args):
+        box = self.box()
+        box['messages'] = [m for m in box['messages'] if '\\Deleted' not in m['flags']]
+
+    def uid_search(self, args):
+        self.store.searches.append(args)
+        messages = self.box()['messages']
+        found = [str(m['uid']) for m in messages if matches(m, args, messages)]
+        self.send("* SEARCH" + (" " + " ".join(found) if found else ""))
+
+    def uid_copy(self, args, remove=False):
+        box = self.box()
+        uids = parse_set(args[0], box['messages'])
+        target = self.store.boxes[args[1]]
+        for message in [m for m in box['messages'] if m['uid'] in uids]:
+            target['messages'].append(dict(message, uid=target['uidnext'], flags=set(message['flags'])))
+            target['uidnext'] += 1
+        if remove:
+            box['messages'] = [m for m in box['messages'] if m['uid'] not in uids]
+
+    def uid_move(self, args):
+        if not self.store.move:
+            raise Unsupported('UID MOVE')
+        self.uid_copy(args, remove=True)
+
+    def uid_store(self, args):
+        box = self.box()
+        uids = parse_set(args[0], box['messages'])
+        for message in box['messages']:
+            if message['uid'] in uids:
+                message['flags'].update(args[2])
+
+    def uid_expunge(self, args):
+        if not self.store.uidplus:
+            raise Unsupported('UID EXPUNGE')
+        box = self.box()
+        uids = parse_set(args[0], box['messages'])
+        box['messages'] = [m for m in box['messages']
+                           if not (m['uid'] in uids and '\\Deleted' in m['flags'])]
+
+class MockImapServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+def start_server(store, port=0):
+    """Serve `store` in a background thread; returns (server, port)"""
+    server = MockImapServer(('127.0.0.1', port), MockImapHandler)
+    server.store = store
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.server_address[1]
+
+# ---------------------------------------------------------------------------
+# Checks
+# ---------------------------------------------------------------------------
+
+def run_against(store, provider, action, query, **options):
+    """imap_cleanup.run_cleanup() against a fresh mock server"""
+    import imap_cleanup
+
+    server, port = start_server(store)
+    try:
+        return imap_cleanup.run_cleanup(provider, action, query, "me", "secret", host='127.0.0.1',
+                                        port=port, use_ssl=False, chunk_size=7, connections=3,
+                                        **options)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def check_default_serve_layout():
+    store = Mailstore(DEFAULT_PROVIDER)
+    store.seed(DEFAULT_MESSAGES)
+    summary = run_against(store, DEFAULT_PROVIDER, 'delete', f"from:{SENDER}")
+    if summary['matched'] != DEFAULT_MESSAGES or store.count('[Gmail]/Trash', SENDER) != DEFAULT_MESSAGES:
+        return (f"expected {DEFAULT_MESSAGES} messages in [Gmail]/Trash, "
+                f"got {store.count('[Gmail]/Trash', SENDER)}")
+
+def check_google_mail_brand():
+    store = Mailstore('googlemail')
+    store.add('[Google Mail]/All Mail', 20)
+    store.add('[Google Mail]/All Mail', 5, sender="friend@example.com")
+    run_against(store, 'gmail', 'delete', f"from:{SENDER}")
+    if store.count('[Google Mail]/Bin', SENDER) != 20 or store.count('[Google Mail]/All Mail') != 5:
+        return "delete did not land in [Google Mail]/Bin"
+
+def check_yahoo_folders():
+    store = Mailstore('yahoo')
+    store.add('INBOX', 10)
+    store.add('Travel', 15)
+    store.add('Trash', 4)
+    summary = run_against(store, 'yahoo', 'spam', SENDER)
+    if store.count('Bulk', SENDER) != 25 or summary['matched'] != 25:
+        return f"expected 25 messages from INBOX + Travel in Bulk, got {store.count('Bulk', SENDER)}"
+    if store.count('Trash') != 4:
+        return "messages in Trash were searched too"
+
+def check_fallback_names():
+    store = Mailstore('yahoo', special_use=False)
+    store.add('INBOX', 9)
+    run_against(store, 'yahoo', 'spam', SENDER)
+    if store.count('Bulk', SENDER) != 9:
+        return "spam without SPECIAL-USE did not land in Bulk"
+
+def check_quoted_query():
+    store = Mailstore('gmail')
+    store.add('[Gmail]/All Mail', 6, subject="Price alert")
+    store.add('[Gmail]/All Mail', 3, subject="Newsletter")
+    query = f'from:{SENDER} "price alert"'
+    run_against(store, 'gmail', 'spam', query)
+    sent = [args[1] for args in store.searches if args and args[0] == 'X-GM-RAW']
+    if sent[:1] != [query]:
+        return f"X-GM-RAW arrived as {sent[:1]}, expected {query!r}"
+    if store.count('[Gmail]/Spam') != 6:
+        return f"expected 6 messages in Spam, got {store.count('[Gmail]/Spam')}"
+
+def check_no_uidplus():
+    store = Mailstore('yahoo', move=False, uidplus=False)
+    store.add('INBOX', 12)
+    run_against(store, 'yahoo', 'delete', SENDER)
+    if store.count('Trash', SENDER) != 12 or store.count('INBOX') != 0:
+        return "COPY + EXPUNGE fallback did not move everything"
+
+def check_refuses_foreign_deleted():
+    store = Mailstore('yahoo', move=False, uidplus=False)
+    store.add('INBOX', 12)
+    store.add('INBOX', 2, sender="friend@example.com", flags={'\\Deleted'})
+    try:
+        run_against(store, 'yahoo', 'delete', SENDER)
+    except RuntimeError:
+        pass
+    else:
+        return "plain EXPUNGE ran with unrelated \\Deleted messages in the mailbox"
+    if store.count('INBOX') != 14 or store.count('Trash'):
+        return "mailbox was changed before refusing"
+
+CHECKS = [
+    ("default serve layout", check_default_serve_layout),
+    ("Google Mail brand (special-use)", check_google_mail_brand),
+    ("Yahoo folders beyond INBOX", check_yahoo_folders),
+    ("no SPECIAL-USE: usual names", check_fallback_names),
+    ("Gmail query with quotes", check_quoted_query),
+    ("no MOVE / UIDPLUS", check_no_uidplus),
+    ("refuse EXPUNGE of unrelated mail", check_refuses_foreign_deleted),
+]
+
+def run_checks():
+    """Run CHECKS with cleanup state in a scratch directory; returns the failures"""
+    import cleanup_state
+
+    cleanup_state.STATE_FILE = Path(tempfile.mkdtemp(prefix="mock-imap-")) / "cleanup_state.json"
+    failures = []
+    for name, check in CHECKS:
+        try:
+            problem = check()
+        except Exception as e:
+            problem = f"{type(e).__name__}: {e}"
+        print(f"{'❌' if problem else '✅'} {name}" + (f": {problem}" if problem else ""))
+        if problem:
+            failures.append(name)
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a mock IMAP mailbox on localhost")
+    parser.add_argument('--check', action='store_true', help="run imap_cleanup against the check scenarios")
+    parser.add_argument('--provider', choices=list(LAYOUTS), default=DEFAULT_PROVIDER)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--messages', type=int, default=DEFAULT_MESSAGES, help=f"messages from {SENDER}")
+    parser.add_argument('--no-move', action='store_true')
+    parser.add_argument('--no-uidplus', action='store_true')
+    parser.add_argument('--no-special-use', action='store_true')
+    args = parser.parse_args()
+
+    if args.check:
+        return 1 if run_checks() else 0
+
+    store = Mailstore(args.provider, move=not args.no_move, uidplus=not args.no_uidplus,
+                      special_use=not args.no_special_use)
+    store.seed(args.messages)
+    server, port = start_server(store, args.port)
+    print(f"📬 Mock {args.provider} IMAP on 127.0.0.1:{port} ({store.capabilities()})")
+    print("   Press Ctrl+C to stop")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
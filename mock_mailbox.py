@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Mock Mailbox Server
+A local stand-in for the Gmail and Yahoo Mail pages the automation drives:
+the same select-all checkbox, "select all conversations" banner, toolbar
+buttons, keyboard shortcuts and paginated message list, backed by an
+in-memory mailbox of N messages. Lets the flows be benchmarked offline,
+headless and without real accounts.
+
+Usage:
+    python mock_mailbox.py --messages 10000          # browse http://127.0.0.1:8765/gmail
+    python mock_mailbox.py --port 8765 --no-shortcuts
+
+Pages are served at /gmail/... and /yahoo/...; requests carrying an
+X-Mock-Provider header (see benchmark_flows.py) get that provider's page
+at any path, so the real mail.google.com / mail.yahoo.com URLs can be
+routed here unchanged.
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+DEFAULT_PORT = 8765
+DEFAULT_PAGE_SIZE = 50
+DEFAULT_LATENCY_MS = 50
+
+# Messages left per provider, and how the mock behaves
+MAILBOX = {'gmail': 0, 'yahoo': 0}
+SETTINGS = {
+    'page_size': DEFAULT_PAGE_SIZE,
+    'latency_ms': DEFAULT_LATENCY_MS,
+    'select_more': True,
+    'shortcuts': True,
+}
+_lock = threading.Lock()
+
+GMAIL_BODY = """
+<div role="navigation">Inbox</div>
+<input aria-label="Search mail" value="">
+<div gh="tm">
+  <span role="checkbox" aria-label="Select" id="select-all">&#9744;</span>
+  <span id="tools" style="display:none">
+    <div role="button" data-action="delete" data-tooltip="Delete" aria-label="Delete">Delete</div>
+    <div role="button" data-action="spam" data-tooltip="Report spam" aria-label="Report spam">Report spam</div>
+  </span>
+</div>
+<span class="Dj" id="count"></span>
+<div id="banner" style="display:none"></div>
+<table><tbody id="list"></tbody></table>
+"""
+
+YAHOO_BODY = """
+<div data-test-id="app-canvas">
+  <button data-test-id="compose-button">Compose</button>
+  <div>
+    <input type="checkbox" aria-label="Select all messages" data-test-id="select-all-checkbox" id="select-all">
+    <span id="tools" style="display:none">
+      <button data-action="delete" data-test-id="toolbar-delete" aria-label="Delete">Delete</button>
+      <button data-action="spam" data-test-id="spam-button" aria-label="Spam">Spam</button>
+    </span>
+  </div>
+  <div id="banner" style="display:none"></div>
+  <ul id="list"></ul>
+</div>
+"""
+
+# Rendering and behaviour shared by both mocks; MOCK is injected per page
+PAGE_SCRIPT = """
+const state = {remaining: MOCK.remaining, selected: false, all: false, pendingStar: false};
+const $ = (id) => document.getElementById(id);
+
+function render() {
+    const list = $('list');
+    const shown = Math.min(MOCK.pageSize, state.remaining);
+    const html = [];
+    for (let i = 0; i < shown; i++) {
+        html.push(MOCK.provider === 'gmail'
+            ? `<tr class="zA"><td>Skyscanner</td><td>Deal #${state.remaining - i}</td></tr>`
+            : `<li data-test-id="message-list-item">Skyscanner - Deal #${state.remaining - i}</li>`);
+    }
+    if (!shown) {
+        html.push(MOCK.provider === 'gmail'
+            ? '<tr><td class="TC">No messages matched your search</td></tr>'
+            : '<li data-test-id="search-no-results">No results</li>');
+    }
+    list.innerHTML = html.join('');
+    if ($('count')) $('count').textContent = shown ? `1\u2013${shown} of ${state.remaining.toLocaleString('en-US')}` : '';
+    $('tools').style.display = state.selected ? '' : 'none';
+
+    const banner = $('banner');
+    if (state.selected && MOCK.selectMore && state.remaining > MOCK.pageSize) {
+        banner.style.display = '';
+        banner.innerHTML = state.all
+            ? `<span>All ${state.remaining} conversations are selected.</span>`
+            : (MOCK.provider === 'gmail'
+                ? `<span id="more">Select all ${state.remaining} conversations in Search</span>`
+                : `<button id="more">Select all ${state.remaining} conversations</button>`);
+        const more = $('more');
+        if (more) more.addEventListener('click', () => { state.all = true; render(); });
+    } else {
+        banner.style.display = 'none';
+        banner.innerHTML = '';
+    }
+}
+
+function select() {
+    if (!state.remaining) return;
+    state.selected = !state.selected;
+    state.all = false;
+    render();
+}
+
+async function act(action) {
+    if (!state.selected) return;
+    const count = state.all ? state.remaining : Math.min(MOCK.pageSize, state.remaining);
+    const response = await fetch('/api/act', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({provider: MOCK.provider, action, count}),
+    });
+    state.remaining = (await response.json()).remaining;
+    state.selected = false;
+    state.all = false;
+    render();
+}
+
+async function refresh() {
+    $('list').innerHTML = '';
+    const response = await fetch(`/api/state?provider=${MOCK.provider}`);
+    state.remaining = (await response.json()).remaining;
+    state.selected = false;
+    state.all = false;
+    render();
+}
+
+$('select-all').addEventListener('click', select);
+document.querySelectorAll('[data-action]').forEach((button) => {
+    button.addEventListener('click', () => act(button.dataset.action));
+});
+
+// Gmail: "*" "a" select all, "#" delete, "!" spam. Yahoo: Ctrl+A, Delete.
+document.addEventListener('keydown', (e) => {
+    if (!MOCK.shortcuts) return;
+    if (MOCK.provider === 'gmail') {
+        if (e.key === '*') { state.pendingStar = true; return; }
+        if (e.key === 'a' && state.pendingStar) { state.selected = false; select(); }
+        else if (e.key === '#') act('delete');
+        else if (e.key === '!') act('spam');
+        state.pendingStar = false;
+    } else {
+        if (e.key === 'a' && e.ctrlKey) { e.preventDefault(); state.selected = false; select(); }
+        else if (e.key === 'Delete') act('delete');
+    }
+});
+
+// Gmail searches by changing the URL fragment, which does not reload the page
+window.addEventListener('hashchange', refresh);
+render();
+"""
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Mock {title}</title></head>
+<body>{body}<script>const MOCK = {mock};{script}</script></body></html>
+"""
+
+def reset(provider, messages):
+    """Refill a provider's mock mailbox with `messages` messages"""
+    with _lock:
+        MAILBOX[provider] = messages
+
+def render_page(provider):
+    """Full HTML for a provider's mailbox page"""
+    mock = {
+        'provider': provider,
+        'remaining': MAILBOX[provider],
+        'pageSize': SETTINGS['page_size'],
+        'selectMore': SETTINGS['select_more'],
+        'shortcuts': SETTINGS['shortcuts'],
+    }
+    return PAGE_TEMPLATE.format(
+        title=provider.title(),
+        body=GMAIL_BODY if provider == 'gmail' else YAHOO_BODY,
+        mock=json.dumps(mock),
+        script=PAGE_SCRIPT,
+    )
+
+class MockMailHandler(BaseHTTPRequestHandler):
+    """Serves the mock pages and the small JSON API behind them"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, body, content_type, status=200):
+        data = body.encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_json(self, payload, status=200):
+        self.send_body(json.dumps(payload), 'application/json', status)
+
+    def provider(self, path):
+        """Provider from the routing header, else the first path segment"""
+        name = self.headers.get('X-Mock-Provider') or path.strip('/').split('/')[0]
+        return name if name in MAILBOX else None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/api/state':
+            provider = url.query.partition('provider=')[2]
+            if provider not in MAILBOX:
+                return self.send_json({'error': 'unknown provider'}, 404)
+            return self.send_json({'remaining': MAILBOX[provider]})
+
+        provider = self.provider(url.path)
+        if not provider:
+            return self.send_body("Try /gmail or /yahoo", 'text/plain', 404)
+        self.send_body(render_page(provider), 'text/html; charset=utf-8')
+
+    def do_POST(self):
+        if urlparse(self.path).path != '/api/act':
+            return self.send_json({'error': 'not found'}, 404)
+
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+        provider = request.get('provider')
+        if provider not in MAILBOX:
+            return self.send_json({'error': 'unknown provider'}, 404)
+
+        # Stand-in for the server round trip of a real delete/spam
+        time.sleep(SETTINGS['latency_ms'] / 1000)
+        with _lock:
+            MAILBOX[provider] = max(0, MAILBOX[provider] - int(request.get('count', 0)))
+            remaining = MAILBOX[provider]
+        self.send_json({'remaining': remaining})
+
+def start_server(port=0, **settings):
+    """Serve the mock in a background thread; returns (server, base_url)"""
+    SETTINGS.update(settings)
+    server = ThreadingHTTPServer(('127.0.0.1', port), MockMailHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve mock Gmail / Yahoo mailboxes on localhost")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--messages', type=int, default=100, help="messages per mailbox")
+    parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE)
+    parser.add_argument('--latency-ms', type=int, default=DEFAULT_LATENCY_MS)
+    parser.add_argument('--no-select-more', action='store_true', help="never offer 'select all conversations'")
+    parser.add_argument('--no-shortcuts', action='store_true', help="behave as if keyboard shortcuts are off")
+    args = parser.parse_args()
+
+    for provider in MAILBOX:
+        reset(provider, args.messages)
+    server, url = start_server(args.port, page_size=args.page_size, latency_ms=args.latency_ms,
+                               select_more=not args.no_select_more, shortcuts=not args.no_shortcuts)
+    print(f"📬 Mock mailboxes with {args.messages} messages each:")
+    print(f"   {url}/gmail")
+    print(f"   {url}/yahoo")
+    print("   Press Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
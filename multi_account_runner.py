@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Multi-Account Cleanup Runner
+Runs the cleanup rules for several Gmail / Yahoo accounts at once. Every
+account gets its own isolated browser.new_context() - restored from that
+account's saved session - inside the single broker Chrome, and all
+(account, rule) jobs share one global concurrency cap.
+
+Each account runs in its own thread with its own Playwright connection,
+and each rule goes through cleanup_runner.run_rule(): the same re-search
+loop, verification, high-water marks and checkpoints as a single-account
+run. Marks and checkpoints are keyed "<account>/<rule>". An account's
+rules run one after another in one tab, so they never race each other in
+the same mailbox.
+
+accounts.json lists the accounts; each runs the enabled rules for its
+provider from cleanup_rules.json, or only the rule names in its "rules".
+
+Usage:
+    python multi_account_runner.py --login work-gmail   # save a session once
+    python multi_account_runner.py                      # run all accounts
+    python multi_account_runner.py --concurrency 6 --only work-gmail
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from playwright.sync_api import sync_playwright
+
+from browser_broker import CDP_URL, start_browser, detach
+from cleanup_runner import load_rules, run_rule, STATUS_ICONS, FAILED_STATUSES
+from mail_providers import get_provider
+from request_blocker import install_request_blocking, print_blocking_report, new_stats
+from session_store import load_session, save_state
+from step_trace import print_step, span
+
+ACCOUNTS_FILE = Path(__file__).parent / "accounts.json"
+DEFAULT_CONCURRENCY = 4
+LOGIN_TIMEOUT_MS = 600000
+SESSION_CHECK_TIMEOUT_MS = 5000
+
+def load_accounts(path=ACCOUNTS_FILE):
+    """Enabled accounts from the accounts file, or None on error"""
+    if not Path(path).exists():
+        print(f"Error: Accounts file not found: {path}")
+        return None
+    try:
+        with open(path, 'r') as f:
+            config = json.load(f)
+    except json.JSONDecodeError as e:
+        print(f"Error: Invalid JSON in accounts file: {e}")
+        return None
+    return [a for a in config.get('accounts', []) if a.get('enabled', True)]
+
+def session_name(account):
+    """Stored-session name for an account (defaults to the account name)"""
+    return account.get('session', account['name'])
+
+def rules_for(account, rules):
+    """The rules an account should run"""
+    wanted = account.get('rules')
+    return [r for r in rules
+            if r['provider'] == account['provider'] and (not wanted or r['name'] in wanted)]
+
+def account_rule(account, rule):
+    """The rule with an account-scoped name, so marks and checkpoints stay per account"""
+    return dict(rule, name=f"{account['name']}/{rule['name']}")
+
+def session_is_live(page, account):
+    """One quick check that the restored session is still logged in"""
+    config = get_provider(account['provider'])
+    try:
+        page.goto(config['home_url'], wait_until='domcontentloaded')
+        page.wait_for_selector(', '.join(config['login_indicators']), state='attached',
+                               timeout=SESSION_CHECK_TIMEOUT_MS)
+        return True
+    except Exception:
+        return False
+
+def run_account(account, rules, semaphore, block_stats, cdp_url=CDP_URL, full=False,
+                mode='selector', restart=False):
+    """Run one account's rules in its own context; returns {rule name: status}"""
+    state = load_session(session_name(account))
+    if not state:
+        print_step("ACCOUNT", f"{account['name']}: no saved session (run --login {account['name']})", "info")
+        return {rule['name']: 'skipped' for rule in rules}
+
+    results = {}
+    with sync_playwright() as p:
+        with span("cdp connect", account=account['name']):
+            browser = p.chromium.connect_over_cdp(cdp_url)
+        context = browser.new_context(storage_state=state, viewport={'width': 1400, 'height': 900})
+        try:
+            install_request_blocking(context, stats=block_stats)
+            page = context.new_page()
+            if not session_is_live(page, account):
+                print_step("ACCOUNT", f"{account['name']}: saved session expired", "info")
+                return {rule['name']: 'skipped' for rule in rules}
+
+            for rule in rules:
+                with semaphore:
+                    try:
+                        with span("rule", account=account['name'], rule=rule['name'], mode=mode) as entry:
+                            results[rule['name']] = run_rule(page, account_rule(account, rule),
+                                                             full=full, mode=mode, restart=restart)
+                            if results[rule['name']] in FAILED_STATUSES:
+                                entry['outcome'] = 'failed'
+                    except Exception as e:
+                        print_step("RULE", f"{account['name']}/{rule['name']} error: {e}", "info")
+                        results[rule['name']] = 'failed'
+        finally:
+            context.close()
+            detach(browser)
+    return results
+
+def run_accounts(accounts, rules, concurrency=DEFAULT_CONCURRENCY, cdp_url=CDP_URL, full=False,
+                 mode='selector', restart=False):
+    """Run every account concurrently in one Chrome under a global job cap.
+
+    Returns {"<account>/<rule>": status}; one account failing does not
+    lose the others' results.
+    """
+    semaphore = threading.Semaphore(concurrency)
+    block_stats = new_stats()
+    results = {}
+    with ThreadPoolExecutor(max_workers=len(accounts)) as executor:
+        futures = [(account, executor.submit(run_account, account, rules_for(account, rules), semaphore,
+                                             block_stats, cdp_url, full, mode, restart))
+                   for account in accounts]
+        for account, future in futures:
+            try:
+                account_results = future.result()
+            except Exception as e:
+                print_step("ACCOUNT", f"{account['name']} error: {e}", "info")
+                account_results = {rule['name']: 'failed' for rule in rules_for(account, rules)}
+            for rule_name, status in account_results.items():
+                results[f"{account['name']}/{rule_name}"] = status
+    print_blocking_report(block_stats)
+    return results
+
+def login_account(account, cdp_url=CDP_URL):
+    """Open a fresh context for one account, wait for a manual login, save it"""
+    config = get_provider(account['provider'])
+    with sync_playwright() as p:
+        with span("cdp connect"):
+            browser = p.chromium.connect_over_cdp(cdp_url)
+        context = browser.new_context(viewport={'width': 1400, 'height': 900})
+        try:
+            page = context.new_page()
+            page.goto(config['home_url'], wait_until='domcontentloaded')
+
+            print_step("LOGIN", f"Log in to {account['name']} in the new browser window", "wait")
+            try:
+                page.wait_for_selector(', '.join(config['login_indicators']), state='attached',
+                                       timeout=LOGIN_TIMEOUT_MS)
+            except Exception:
+                print_step("LOGIN", "Timeout waiting for login", "info")
+                return False
+
+            save_state(session_name(account), context.storage_state())
+            print_step("LOGIN", f"Session saved for {account['name']}", "success")
+            return True
+        finally:
+            context.close()
+            detach(browser)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run cleanup rules for several accounts in parallel")
+    parser.add_argument('--accounts', default=str(ACCOUNTS_FILE))
+    parser.add_argument('--only', action='append', help="run only the named account(s)")
+    parser.add_argument('--login', metavar='ACCOUNT', help="log in to one account and save its session")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument('--full', action='store_true', help="ignore last-run marks and search all history")
+    parser.add_argument('--restart', action='store_true', help="ignore checkpoints of interrupted runs")
+    strategy = parser.add_mutually_exclusive_group()
+    strategy.add_argument('--batched', dest='mode', action='store_const', const='batched',
+                          help="run select + action as one in-page script")
+    strategy.add_argument('--keyboard', dest='mode', action='store_const', const='keyboard',
+                          help="use keyboard shortcuts, falling back to clicks")
+    parser.set_defaults(mode='selector')
+    args = parser.parse_args()
+
+    accounts = load_accounts(args.accounts)
+    if accounts is None:
+        return 1
+
+    # All accounts share the one broker Chrome
+    start_browser()
+
+    if args.login:
+        account = next((a for a in accounts if a['name'] == args.login), None)
+        if not account:
+            print(f"Error: Unknown account: {args.login}")
+            return 1
+        return 0 if login_account(account) else 1
+
+    if args.only:
+        accounts = [a for a in accounts if a['name'] in args.only]
+    rules = load_rules()
+    if not accounts or not rules:
+        print("No enabled accounts or rules to run")
+        return 1
+
+    print(f"🚀 {len(accounts)} account(s), concurrency {args.concurrency}")
+    start = time.monotonic()
+    results = run_accounts(accounts, rules, args.concurrency, full=args.full, mode=args.mode,
+                           restart=args.restart)
+
+    # Summary
+    print("\n" + "=" * 60)
+    print("📊 Summary")
+    print("=" * 60)
+    for name, status in results.items():
+        print(f"{STATUS_ICONS[status]} {name}: {status}")
+    print(f"\nCompleted in {time.monotonic() - start:.1f}s")
+
+    return 0 if all(s in ('done', 'empty') for s in results.values()) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
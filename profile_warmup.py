@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Automation Profile Warm-up and Launch Benchmark
+Keeps the broker Chrome's managed profile (browser_broker.PROFILE_DIR,
+started with browser_broker.LEAN_FLAGS) ready for fast launches: `warm`
+loads every mail origin once so the apps' scripts and styles sit in the
+profile's HTTP cache, and `measure` compares launch-to-interactive time
+with a cleared (cold) versus a warmed cache.
+
+measure quits and relaunches the broker Chrome several times; logins in the
+profile are kept, only the HTTP cache is cleared for the cold runs.
+
+Usage:
+    python profile_warmup.py warm                # e.g. after a Chrome update
+    python profile_warmup.py measure --runs 5
+"""
+
+import argparse
+import sys
+import time
+
+from playwright.sync_api import sync_playwright
+
+import browser_broker
+from mail_providers import PROVIDERS
+from step_trace import percentile, print_step, span
+
+# Resources served from the HTTP cache report a transferSize of 0
+RESOURCE_JS = """
+() => {
+    const entries = performance.getEntriesByType('resource');
+    const cached = entries.filter(e => e.transferSize === 0 && e.decodedBodySize > 0);
+    return {
+        resources: entries.length,
+        cached: cached.length,
+        transferredKb: Math.round(entries.reduce((sum, e) => sum + (e.transferSize || 0), 0) / 1024),
+    };
+}
+"""
+
+def mail_urls():
+    """Home URL of every supported mail provider"""
+    return [config['home_url'] for config in PROVIDERS.values()]
+
+def warm_cache(context, urls=None):
+    """Load each URL once in a throwaway tab so its assets land in the cache"""
+    for url in urls or mail_urls():
+        page = context.new_page()
+        try:
+            with span("cache warm", url=url):
+                page.goto(url, wait_until='load')
+            print_step("WARM", f"Cached {page.evaluate(RESOURCE_JS)['resources']} resources for {url}",
+                       "success")
+        except Exception as e:
+            print_step("WARM", f"{url}: {e}", "info")
+        finally:
+            page.close()
+
+def clear_cache(context):
+    """Empty the profile's HTTP cache (cookies and logins are untouched)"""
+    page = context.new_page()
+    try:
+        session = context.new_cdp_session(page)
+        session.send("Network.clearBrowserCache")
+        session.detach()
+    finally:
+        page.close()
+
+def with_broker(p, action):
+    """Launch the broker Chrome, run action(context), then quit Chrome"""
+    browser_broker.start_browser()
+    browser = p.chromium.connect_over_cdp(browser_broker.CDP_URL)
+    try:
+        return action(browser_broker.get_context(browser))
+    finally:
+        browser_broker.shutdown(browser)
+
+def measure_launch(p, url, cache):
+    """Launch Chrome and open `url`; returns seconds to ready/interactive/load"""
+    started = time.monotonic()
+    with span("profile launch", cache=cache, url=url) as entry:
+        browser_broker.launch_chrome()
+        if browser_broker.wait_for_debug_port() is None:
+            raise RuntimeError("Chrome did not open the debugging port")
+        ready = time.monotonic() - started
+
+        browser = p.chromium.connect_over_cdp(browser_broker.CDP_URL)
+        try:
+            page = browser_broker.get_context(browser).new_page()
+            page.goto(url, wait_until='domcontentloaded')
+            interactive = time.monotonic() - started
+            page.wait_for_load_state('load')
+            loaded = time.monotonic() - started
+            entry.update(page.evaluate(RESOURCE_JS))
+        finally:
+            browser_broker.shutdown(browser)
+        entry.update(ready=round(ready, 3), interactive=round(interactive, 3), loaded=round(loaded, 3))
+    return entry
+
+def print_comparison(results):
+    """p50 launch timings and cache hits, cold vs warm"""
+    print("\n" + "=" * 72)
+    print("📊 Launch-to-interactive, cold vs warm HTTP cache (p50)")
+    print("=" * 72)
+    print(f"{'url':<40} {'cache':<5} {'ready':>7} {'interactive':>12} {'load':>7} {'cached':>9} {'KB':>7}")
+    for (url, cache), runs in results.items():
+        p50 = {key: percentile([r[key] for r in runs], 50)
+               for key in ('ready', 'interactive', 'loaded', 'cached', 'resources', 'transferredKb')}
+        print(f"{url[:40]:<40} {cache:<5} {p50['ready']:>6.2f}s {p50['interactive']:>11.2f}s "
+              f"{p50['loaded']:>6.2f}s {p50['cached']:>4}/{p50['resources']:<4} {p50['transferredKb']:>7}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm and benchmark the automation Chrome profile")
+    parser.add_argument('command', choices=['warm', 'measure'])
+    parser.add_argument('--url', action='append', help="URL(s) to warm/measure (default: mail origins)")
+    parser.add_argument('--runs', type=int, default=3, help="launches per URL and cache state")
+    args = parser.parse_args()
+    urls = args.url or mail_urls()
+
+    with sync_playwright() as p:
+        if args.command == 'warm':
+            browser = browser_broker.ensure_browser(p)
+            try:
+                warm_cache(browser_broker.get_context(browser), urls)
+            finally:
+                browser_broker.detach(browser)
+            return 0
+
+        if browser_broker.is_browser_running():
+            print_step("MEASURE", "Quitting the running broker Chrome for the launch benchmark", "info")
+            browser = p.chromium.connect_over_cdp(browser_broker.CDP_URL)
+            browser_broker.shutdown(browser)
+
+        results = {}
+        for url in urls:
+            for _ in range(args.runs):
+                with_broker(p, clear_cache)
+                results.setdefault((url, 'cold'), []).append(measure_launch(p, url, 'cold'))
+            for _ in range(args.runs):
+                with_broker(p, lambda context: warm_cache(context, [url]))
+                results.setdefault((url, 'warm'), []).append(measure_launch(p, url, 'warm'))
+
+        # Leave the profile warm for the next real run
+        with_broker(p, lambda context: warm_cache(context, urls))
+
+    print_comparison(results)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
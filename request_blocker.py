@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Request Blocking for Mail Pages
+A page.route()/context.route() interception layer with per-site allow/deny
+rules (resource type and URL pattern). Blocks images, fonts, media, ad and
+tracker requests that the cleanup flows never look at, and reports how
+many requests (and roughly how many bytes) were saved per run.
+
+Rules are keyed by the hostname of the page making the request, so login
+pages (captchas etc.) are never affected. Override or extend them with
+~/ali/block_rules.json using the same shape as BLOCK_RULES.
+
+Sync-API route handlers only run while the script is inside a Playwright
+call, so every intercepted request stalls while the script is in
+time.sleep(). Pause with page.wait_for_timeout() (or wait_until(...,
+page=page)) while blocking is installed, and call
+remove_request_blocking() before handing the browser to the user.
+"""
+
+import json
+import re
+from pathlib import Path
+from urllib.parse import urlparse
+
+BLOCK_RULES_FILE = Path.home() / "ali" / "block_rules.json"
+
+AD_TRACKER_PATTERNS = [
+    r'doubleclick\.net',
+    r'googlesyndication\.com',
+    r'google-analytics\.com',
+    r'googletagmanager\.com',
+    r'adservice\.google',
+    r'ads\.yahoo\.com',
+    r'analytics\.yahoo\.com',
+    r'(^|\.)yimg\.com/.*/(ads?|beacon)',
+    # Tracking hosts only: first-party paths such as mail.google.com/.../pixel
+    # are app traffic
+    r'^https?://([^/]*\.)?(beacon|pixel)\.[^/]+/',
+    r'^https?://([^/]*\.)?beap\.gemini\.yahoo\.com/',
+]
+
+BLOCK_RULES = {
+    'mail.yahoo.com': {
+        'resource_types': ['image', 'media', 'font'],
+        'deny': AD_TRACKER_PATTERNS,
+        'allow': [],
+    },
+    'mail.google.com': {
+        'resource_types': ['image', 'media', 'font'],
+        'deny': AD_TRACKER_PATTERNS,
+        'allow': [],
+    },
+    'scholar.google.com': {
+        'resource_types': ['image', 'media', 'font', 'stylesheet'],
+        'deny': AD_TRACKER_PATTERNS,
+        'allow': [],
+    },
+}
+
+# Fallback sizes (bytes) for estimating savings before we have seen a real
+# response of that type in this run
+DEFAULT_SIZES = {
+    'image': 15000,
+    'media': 200000,
+    'font': 40000,
+    'stylesheet': 20000,
+    'script': 60000,
+}
+
+def load_rules():
+    """BLOCK_RULES merged with the optional JSON override file, regexes compiled"""
+    rules = dict(BLOCK_RULES)
+    try:
+        with open(BLOCK_RULES_FILE) as f:
+            rules.update(json.load(f))
+    except (OSError, ValueError):
+        pass
+
+    compiled = {}
+    for site, rule in rules.items():
+        compiled[site] = {
+            'resource_types': set(rule.get('resource_types', [])),
+            'deny': [re.compile(p) for p in rule.get('deny', [])],
+            'allow': [re.compile(p) for p in rule.get('allow', [])],
+        }
+    return compiled
+
+def new_stats():
+    """Per-run counters for one blocking layer"""
+    return {'blocked': 0, 'allowed': 0, 'by_type': {}, 'seen_bytes': {}, 'seen_count': {}}
+
+def rule_for(rules, page_url):
+    """Rule whose site matches the page's hostname (or a parent domain), if any"""
+    host = urlparse(page_url).hostname or ""
+    for site, rule in rules.items():
+        if host == site or host.endswith("." + site):
+            return rule
+    return None
+
+def should_block(rules, page_url, url, resource_type):
+    """Decide one request; allow patterns win over everything else"""
+    rule = rule_for(rules, page_url)
+    if rule is None:
+        return False
+    if any(p.search(url) for p in rule['allow']):
+        return False
+    if resource_type in rule['resource_types']:
+        return True
+    return any(p.search(url) for p in rule['deny'])
+
+def _page_url(request):
+    try:
+        return request.frame.page.url
+    except Exception:
+        return ""
+
+def _count_blocked(stats, resource_type):
+    stats['blocked'] += 1
+    stats['by_type'][resource_type] = stats['by_type'].get(resource_type, 0) + 1
+
+def _learn_size(stats, response):
+    """Track average Content-Length per resource type from allowed responses"""
+    length = response.headers.get('content-length')
+    if not length or not length.isdigit():
+        return
+    resource_type = response.request.resource_type
+    stats['seen_bytes'][resource_type] = stats['seen_bytes'].get(resource_type, 0) + int(length)
+    stats['seen_count'][resource_type] = stats['seen_count'].get(resource_type, 0) + 1
+
+def estimated_bytes_saved(stats):
+    """Blocked requests x average size of that type (observed, else default)"""
+    total = 0
+    for resource_type, count in stats['by_type'].items():
+        seen = stats['seen_count'].get(resource_type)
+        if seen:
+            avg = stats['seen_bytes'][resource_type] / seen
+        else:
+            avg = DEFAULT_SIZES.get(resource_type, 10000)
+        total += count * avg
+    return int(total)
+
+def install_request_blocking(target, rules=None, stats=None):
+    """Install blocking on a sync Page or BrowserContext; returns the stats dict"""
+    rules = rules if rules is not None else load_rules()
+    stats = stats if stats is not None else new_stats()
+
+    def handle(route, request):
+        if should_block(rules, _page_url(request), request.url, request.resource_type):
+            _count_blocked(stats, request.resource_type)
+            route.abort()
+        else:
+            stats['allowed'] += 1
+            route.continue_()
+
+    target.route("**/*", handle)
+    target.on("response", lambda response: _learn_size(stats, response))
+    return stats
+
+def remove_request_blocking(target):
+    """Stop intercepting requests on a sync Page or BrowserContext"""
+    try:
+        target.unroute("**/*")
+    except Exception:
+        pass
+
+async def install_request_blocking_async(target, rules=None, stats=None):
+    """Async-API counterpart of install_request_blocking()"""
+    rules = rules if rules is not None else load_rules()
+    stats = stats if stats is not None else new_stats()
+
+    async def handle(route, request):
+        if should_block(rules, _page_url(request), request.url, request.resource_type):
+            _count_blocked(stats, request.resource_type)
+            await route.abort()
+        else:
+            stats['allowed'] += 1
+            await route.continue_()
+
+    await target.route("**/*", handle)
+    target.on("response", lambda response: _learn_size(stats, response))
+    return stats
+
+def print_blocking_report(stats):
+    """Print requests and (estimated) bytes saved this run"""
+    total = stats['blocked'] + stats['allowed']
+    if not total:
+        return
+    saved_kb = estimated_bytes_saved(stats) / 1024
+    print(f"\n🚫 Blocked {stats['blocked']}/{total} requests (~{saved_kb:,.0f} KB saved)")
+    for resource_type, count in sorted(stats['by_type'].items(), key=lambda kv: -kv[1]):
+        print(f"   {resource_type:<12} {count}")
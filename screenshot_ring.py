@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Failure-Only Screenshot Ring Buffer
+Keeps the last few step screenshots of a page in memory as small JPEGs,
+captured only when a traced step ends (step_trace STEP_HOOKS). Nothing is
+written on a successful run; when a step fails or times out the buffer plus
+one shot of the failing state is dumped to ~/ali/failures/<run id>/.
+
+Usage (sync Playwright pages):
+    import screenshot_ring
+    screenshot_ring.watch_page(page)
+"""
+
+import base64
+import time
+from collections import deque
+from pathlib import Path
+
+import step_trace
+
+FAILURE_DIR = Path.home() / "ali" / "failures"
+
+RING_SIZE = 8
+SCALE = 0.5
+JPEG_QUALITY = 50
+
+_ring = deque(maxlen=RING_SIZE)
+_watched = {}
+
+def capture(page):
+    """Reduced-resolution JPEG of the viewport, or None if it cannot be taken"""
+    try:
+        if 'cdp' not in _watched:
+            _watched['cdp'] = page.context.new_cdp_session(page)
+        shot = _watched['cdp'].send("Page.captureScreenshot", {
+            'format': 'jpeg',
+            'quality': JPEG_QUALITY,
+            'clip': {'x': 0, 'y': 0, 'scale': SCALE, **_watched['size']},
+        })
+        return base64.b64decode(shot['data'])
+    except Exception:
+        try:
+            return page.screenshot(type='jpeg', quality=JPEG_QUALITY, scale='css')
+        except Exception:
+            return None
+
+def watch_page(page, size=RING_SIZE):
+    """Capture `page` at every step boundary from now on"""
+    global _ring
+    _ring = deque(maxlen=size)
+    _watched.clear()
+    _watched['page'] = page
+    _watched['size'] = page.viewport_size or page.evaluate(
+        "() => ({width: innerWidth, height: innerHeight})")
+    _watched['dumped'] = False
+
+def dump(entry):
+    """Write the buffered shots plus the failing state; returns the directory"""
+    folder = FAILURE_DIR / step_trace.RUN_ID
+    folder.mkdir(parents=True, exist_ok=True)
+
+    shots = list(_ring) + [(time.time(), f"FAILED-{entry['step']}", capture(_watched['page']))]
+    for i, (_, step, data) in enumerate(shots):
+        if data:
+            name = "".join(c if c.isalnum() or c in '-_' else '_' for c in step)
+            (folder / f"{i:02d}-{name}.jpg").write_bytes(data)
+    _ring.clear()
+    print(f"📸 Saved {len(shots)} failure screenshot(s) to {folder}")
+    return folder
+
+def on_step_end(entry):
+    """step_trace hook: buffer a shot on success, dump the buffer on failure"""
+    if 'page' not in _watched:
+        return
+    if entry['outcome'] == 'ok':
+        _ring.append((time.time(), entry['step'], capture(_watched['page'])))
+        _watched['dumped'] = False
+    elif not _watched['dumped']:
+        # Parent spans fail right after the step that broke; dump only once
+        dump(entry)
+        _watched['dumped'] = True
+
+step_trace.STEP_HOOKS.append(on_step_end)
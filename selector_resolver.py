@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Selector Resolver with Learned Ranking
+Resolves a list of candidate selectors in a single browser-side wait and
+keeps a per-site hit table so the selectors that match most often are
+tried first on the next run. Catch-all fallbacks (a bare checkbox role or
+type, a button by text) stay behind the specific selectors however often
+they hit.
+"""
+
+import json
+import re
+import threading
+from pathlib import Path
+from urllib.parse import urlparse
+
+from step_trace import annotate
+
+SELECTOR_STATS_FILE = Path.home() / "ali" / "selector_stats.json"
+
+# How long resolve_selector waits for any candidate to become visible
+RESOLVE_TIMEOUT = 2
+
+# A tag qualified only by role/type or by its text: matches whatever
+# checkbox or button happens to come first, so it is a last resort
+GENERIC_SELECTOR = re.compile(r'^[a-z]*(\[(role|type)="[^"]*"\]|:has-text\("[^"]*"\))$')
+
+# Elements matching one selector. It may be a comma-joined list; each part
+# may end in Playwright's :has-text("..."), which is not plain CSS. A part
+# the browser cannot parse matches nothing instead of sinking the rest.
+MATCH_JS = """
+(selector) => {
+    const parts = [];
+    let depth = 0, quote = null, start = 0;
+    for (let i = 0; i < selector.length; i++) {
+        const c = selector[i];
+        if (quote) {
+            if (c === '\\\\') i++;
+            else if (c === quote) quote = null;
+        } else if (c === '"' || c === "'") quote = c;
+        else if (c === '(' || c === '[') depth++;
+        else if (c === ')' || c === ']') depth--;
+        else if (c === ',' && depth === 0) {
+            parts.push(selector.slice(start, i).trim());
+            start = i + 1;
+        }
+    }
+    parts.push(selector.slice(start).trim());
+
+    const found = [];
+    for (const part of parts.filter(Boolean)) {
+        const m = part.match(/^(.*):has-text\\("(.*)"\\)$/);
+        let els;
+        try {
+            els = Array.from(document.querySelectorAll(m ? (m[1] || '*') : part));
+        } catch (e) {
+            continue;
+        }
+        if (m) {
+            const text = m[2].toLowerCase();
+            els = els.filter((el) => (el.textContent || '').toLowerCase().includes(text));
+        }
+        found.push(...els);
+    }
+    return found;
+}
+"""
+
+# Returns the index of the first selector with a visible match, or -1
+RESOLVE_JS = """
+(selectors) => {
+    const visible = (el) => !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+    const match = """ + MATCH_JS.strip() + """;
+    for (let i = 0; i < selectors.length; i++) {
+        if (match(selectors[i]).some(visible)) return i;
+    }
+    return -1;
+}
+"""
+
+_stats = None
+
+# Accounts run in threads (multi_account_runner) share the hit table
+_lock = threading.RLock()
+
+def load_stats():
+    """Load (once) the persisted hit table: {site: {key: {selector: entry}}}"""
+    global _stats
+    if _stats is None:
+        try:
+            with open(SELECTOR_STATS_FILE) as f:
+                _stats = json.load(f)
+        except (OSError, ValueError):
+            _stats = {}
+    return _stats
+
+def save_stats():
+    """Write the hit table back to disk"""
+    try:
+        SELECTOR_STATS_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with _lock, open(SELECTOR_STATS_FILE, 'w') as f:
+            json.dump(load_stats(), f, indent=2)
+    except OSError:
+        pass
+
+def site_of(page):
+    """Hostname used as the stats key for a page"""
+    return urlparse(page.url).hostname or "unknown"
+
+def is_generic(selector):
+    """True for a catch-all fallback such as 'input[type="checkbox"]'"""
+    return bool(GENERIC_SELECTOR.match(selector))
+
+def rank_selectors(site, key, selectors):
+    """Order selectors: specific before generic, then by hit rate, then as given"""
+    table = load_stats().get(site, {}).get(key, {})
+
+    def sort_key(item):
+        index, selector = item
+        entry = table.get(selector, {})
+        hit_rate = entry.get('hits', 0) / entry['tries'] if entry.get('tries') else 0.0
+        return (is_generic(selector), -hit_rate, index)
+
+    return [s for _, s in sorted(enumerate(selectors), key=sort_key)]
+
+def record_result(site, key, tried, winner):
+    """Count a try for every selector evaluated and a hit for the winner"""
+    with _lock:
+        table = load_stats().setdefault(site, {}).setdefault(key, {})
+        for selector in tried:
+            entry = table.setdefault(selector, {'hits': 0, 'tries': 0})
+            entry['tries'] += 1
+            if selector == winner:
+                entry['hits'] += 1
+        save_stats()
+
+def resolve_selector(page, key, selectors, timeout=RESOLVE_TIMEOUT):
+    """Return the first selector (in learned order) with a visible match, or None.
+
+    Waits up to `timeout` seconds for one to show, re-checking the whole
+    list in the browser on every poll.
+    """
+    site = site_of(page)
+    ranked = rank_selectors(site, key, selectors)
+    try:
+        handle = page.wait_for_function(f"(selectors) => ({RESOLVE_JS.strip()})(selectors) + 1",
+                                        arg=ranked, timeout=timeout * 1000)
+        index = handle.json_value() - 1
+    except Exception:
+        index = -1
+
+    if index < 0:
+        record_result(site, key, ranked, None)
+        return None
+
+    record_result(site, key, ranked[:index + 1], ranked[index])
+    return ranked[index]
+
+def click_first(page, key, selectors):
+    """Resolve and click; if the click fails, drop that selector and re-resolve"""
+    remaining = list(selectors)
+    retries = 0
+    while remaining:
+        selector = resolve_selector(page, key, remaining)
+        if not selector:
+            return None
+        try:
+            page.click(selector, timeout=5000)
+            annotate(selector=selector, retries=retries)
+            return selector
+        except Exception:
+            with _lock:
+                entry = load_stats()[site_of(page)][key][selector]
+                entry['hits'] -= 1
+                save_stats()
+            remaining.remove(selector)
+            retries += 1
+    return None
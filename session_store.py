@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Encrypted Session Store
+Saves an authenticated Playwright context's storage state (cookies and
+localStorage) to an encrypted local file after login, and restores it into
+new or existing contexts so repeat runs can skip the login phase.
+
+The Fernet key comes from $AUTOMATION_SESSION_KEY, or is generated once into
+~/ali/sessions/.key (mode 600).
+"""
+
+import json
+import os
+from pathlib import Path
+
+from cryptography.fernet import Fernet, InvalidToken
+
+SESSION_DIR = Path.home() / "ali" / "sessions"
+KEY_FILE = SESSION_DIR / ".key"
+
+def _fernet():
+    """Fernet instance for the session key, creating the key file if needed"""
+    key = os.environ.get("AUTOMATION_SESSION_KEY")
+    if key:
+        return Fernet(key.encode())
+
+    if not KEY_FILE.exists():
+        SESSION_DIR.mkdir(parents=True, exist_ok=True)
+        fd = os.open(KEY_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(Fernet.generate_key())
+    return Fernet(KEY_FILE.read_bytes().strip())
+
+def session_path(name):
+    """Encrypted state file for a session name (e.g. 'yahoo', 'gmail')"""
+    return SESSION_DIR / f"{name}.state.enc"
+
+def save_session(context, name):
+    """Encrypt and store the context's cookies + localStorage"""
+    return save_state(name, context.storage_state())
+
+def save_state(name, state):
+    """Encrypt and store an already-fetched storage state dict (async callers)"""
+    token = _fernet().encrypt(json.dumps(state).encode())
+
+    SESSION_DIR.mkdir(parents=True, exist_ok=True)
+    path = session_path(name)
+    tmp = path.with_suffix('.tmp')
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(token)
+    os.replace(tmp, path)
+    return path
+
+def load_session(name):
+    """Decrypted storage state dict, or None if missing or unreadable"""
+    path = session_path(name)
+    if not path.exists():
+        return None
+    try:
+        return json.loads(_fernet().decrypt(path.read_bytes()))
+    except (InvalidToken, ValueError):
+        return None
+
+def forget_session(name):
+    """Delete a stored session (e.g. after it was rejected by the site)"""
+    try:
+        session_path(name).unlink()
+    except FileNotFoundError:
+        pass
+
+def new_context(browser, name, **kwargs):
+    """browser.new_context() pre-loaded with the stored session, if any"""
+    state = load_session(name)
+    if state:
+        kwargs['storage_state'] = state
+    return browser.new_context(**kwargs)
+
+def restore_session(context, name):
+    """Load a stored session into an existing context (e.g. one attached over CDP).
+
+    Cookies are added directly; localStorage is seeded by an init script
+    on each saved origin before the page's own scripts run.
+    Returns True if a session was found.
+    """
+    state = load_session(name)
+    if not state:
+        return False
+
+    if state.get('cookies'):
+        context.add_cookies(state['cookies'])
+
+    origins = {o['origin']: o.get('localStorage', []) for o in state.get('origins', [])}
+    if origins:
+        context.add_init_script(
+            "(() => {"
+            f"  const origins = {json.dumps(origins)};"
+            "  const items = origins[location.origin];"
+            "  if (!items) return;"
+            "  for (const {name, value} of items) {"
+            "    if (localStorage.getItem(name) === null) localStorage.setItem(name, value);"
+            "  }"
+            "})();"
+        )
+    return True
+
+def confirm_session(page, indicators, timeout=5):
+    """One wait for any logged-in indicator; True if the session is live"""
+    try:
+        page.wait_for_selector(', '.join(indicators), state='attached', timeout=timeout * 1000)
+        return True
+    except Exception:
+        return False
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Step Tracing for Browser Automation Runs
+Records each step of a run (browser launch, CDP connect, navigate, login
+wait, search, select, action, verify) as a span with start/end time,
+duration, selector used, retries and outcome, appended to a JSONL file.
+print_step() still prints the familiar emoji line and attaches it to the
+open span.
+
+Usage:
+    python step_trace.py summary               # p50/p95 per step, all runs
+    python step_trace.py summary --runs 20     # only the 20 most recent runs
+
+Set AUTOMATION_TRACE=1 to also record a Playwright trace per context; it
+is kept (under ~/ali/traces) only when a span in the run failed.
+"""
+
+import argparse
+import contextvars
+import functools
+import json
+import math
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+
+TRACE_FILE = Path.home() / "ali" / "step_traces.jsonl"
+PLAYWRIGHT_TRACE_DIR = Path.home() / "ali" / "traces"
+
+RUN_ID = datetime.now().strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+
+# Called with the span dict whenever a step span ends without outcome "ok"
+# (wait spans are excluded: an optional wait timing out is not a failure)
+FAILURE_HOOKS = []
+
+# Called with the span dict whenever any step span (not a wait) ends
+STEP_HOOKS = []
+
+_current = contextvars.ContextVar('current_span', default=None)
+_failed = False
+
+def print_step(step, message, status=""):
+    """Print formatted step message and attach it to the open span"""
+    icons = {"info": "ℹ️", "success": "✅", "wait": "⏳", "work": "🔧", "search": "🔍"}
+    icon = icons.get(status, "▶️")
+    print(f"{icon} [{step}] {message}")
+
+    current = _current.get()
+    if current is not None:
+        current.setdefault('messages', []).append(f"[{step}] {message}")
+
+def annotate(**attrs):
+    """Set attributes (selector, retries, ...) on the innermost open span"""
+    current = _current.get()
+    if current is not None:
+        current.update(attrs)
+
+def write_span(entry):
+    """Append one finished span to the trace file and run failure hooks"""
+    global _failed
+    if entry.get('kind') != 'wait':
+        hooks = list(STEP_HOOKS)
+        if entry['outcome'] != 'ok':
+            _failed = True
+            hooks += FAILURE_HOOKS
+        for hook in hooks:
+            try:
+                hook(entry)
+            except Exception:
+                pass
+    try:
+        TRACE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with open(TRACE_FILE, 'a') as f:
+            f.write(json.dumps(entry) + "\n")
+    except OSError:
+        pass
+
+def new_span(step, attrs):
+    """Span dict for a step starting now, parented to the open span"""
+    parent = _current.get()
+    return {
+        'run': RUN_ID,
+        'id': uuid.uuid4().hex[:8],
+        'parent': parent['id'] if parent else None,
+        'step': step,
+        'start': datetime.now().isoformat(timespec='milliseconds'),
+        'outcome': 'ok',
+        **attrs,
+    }
+
+def finish_span(entry, started):
+    """Stamp end time and duration, then write the span"""
+    entry['end'] = datetime.now().isoformat(timespec='milliseconds')
+    entry['seconds'] = round(time.monotonic() - started, 3)
+    write_span(entry)
+
+@contextmanager
+def span(step, **attrs):
+    """Trace a block as one step; set entry['outcome'] = 'failed' to mark a soft failure"""
+    entry = new_span(step, attrs)
+    started = time.monotonic()
+    token = _current.set(entry)
+    try:
+        yield entry
+    except Exception as e:
+        entry['outcome'] = 'error'
+        entry['error'] = str(e)
+        raise
+    finally:
+        _current.reset(token)
+        finish_span(entry, started)
+
+def record_span(step, started, ok, **attrs):
+    """Record an already-finished step (e.g. a wait) as a span; returns ok"""
+    entry = new_span(step, attrs)
+    entry['start'] = (datetime.now() - timedelta(seconds=time.monotonic() - started)).isoformat(
+        timespec='milliseconds')
+    entry['outcome'] = 'ok' if ok else 'timeout'
+    finish_span(entry, started)
+    return ok
+
+def traced(step):
+    """Decorator: trace a flow function; a None/False return counts as failed"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(step) as entry:
+                result = func(*args, **kwargs)
+                if result is None or result is False:
+                    entry['outcome'] = 'failed'
+                return result
+        return wrapper
+    return decorate
+
+def run_failed():
+    """True once any span in this process ended without outcome "ok" """
+    return _failed
+
+# ---------------------------------------------------------------------------
+# Playwright trace on failure
+# ---------------------------------------------------------------------------
+
+def trace_enabled():
+    """Playwright tracing is opt-in since it slows every action down"""
+    return os.environ.get("AUTOMATION_TRACE") == "1"
+
+def start_playwright_trace(context):
+    """Start recording a Playwright trace if AUTOMATION_TRACE=1"""
+    if trace_enabled():
+        context.tracing.start(screenshots=True, snapshots=True)
+
+def stop_playwright_trace(context):
+    """Keep the trace only if the run failed; returns the saved path or None"""
+    if not trace_enabled():
+        return None
+    if not run_failed():
+        context.tracing.stop()
+        return None
+    PLAYWRIGHT_TRACE_DIR.mkdir(parents=True, exist_ok=True)
+    path = PLAYWRIGHT_TRACE_DIR / f"{RUN_ID}.zip"
+    context.tracing.stop(path=str(path))
+    print(f"🧾 Playwright trace saved: {path} (view with: playwright show-trace {path})")
+    return path
+
+# ---------------------------------------------------------------------------
+# Summary
+# ---------------------------------------------------------------------------
+
+def load_spans(path=TRACE_FILE, runs=None):
+    """Spans from the trace file, optionally only the `runs` most recent runs"""
+    spans = []
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    spans.append(json.loads(line))
+                except ValueError:
+                    continue
+    except OSError:
+        return []
+
+    if runs:
+        recent = list(dict.fromkeys(s['run'] for s in spans))[-runs:]
+        spans = [s for s in spans if s['run'] in recent]
+    return spans
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+def print_summary(spans):
+    """Per-step count, p50, p95, total time and failure rate, slowest first"""
+    steps = {}
+    for s in spans:
+        steps.setdefault(s['step'], []).append(s)
+    if not steps:
+        print("No spans recorded yet")
+        return
+
+    runs = len({s['run'] for s in spans})
+    print(f"📊 {len(spans)} spans from {runs} run(s)\n")
+    print(f"{'step':<32} {'count':>6} {'p50':>8} {'p95':>8} {'total':>9} {'failed':>7}")
+    by_total = sorted(steps.items(), key=lambda item: -sum(s['seconds'] for s in item[1]))
+    for step, entries in by_total:
+        seconds = [s['seconds'] for s in entries]
+        failed = sum(1 for s in entries if s['outcome'] != 'ok')
+        print(f"{step:<32} {len(entries):>6} {percentile(seconds, 50):>7.2f}s "
+              f"{percentile(seconds, 95):>7.2f}s {sum(seconds):>8.1f}s {failed:>7}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarise recorded automation step spans")
+    sub = parser.add_subparsers(dest='command', required=True)
+    summary = sub.add_parser('summary', help="p50/p95 per step across runs")
+    summary.add_argument('--runs', type=int, help="only the N most recent runs")
+    summary.add_argument('--file', default=str(TRACE_FILE))
+    args = parser.parse_args()
+
+    if args.command == 'summary':
+        print_summary(load_spans(args.file, args.runs))
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,22 @@ import time
 import os
 import platform
 
+from browser_waits import (wait_until, wait_for_any, wait_for_hidden, wait_for_url_change,
+                           print_step_timings)
+import session_store
+from step_trace import span
+
+SESSION_NAME = "yahoo"
+
+# Yahoo Mail specific logged-in indicators
+LOGGED_IN_INDICATORS = [
+    '[data-test-id="app-canvas"]',  # Yahoo Mail main canvas
+    'button[data-test-id="compose-button"]',  # Compose button
+    '[aria-label*="Inbox"]',  # Inbox label
+    'button[aria-label*="Settings"]',  # Settings button
+    '[data-test-id="message-list"]',  # Message list
+]
+
 def is_login_page(page):
     """
     Check if current page is a login page
@@ -32,16 +48,7 @@ def is_logged_in(page):
     Check if user is logged in to Yahoo Mail
     """
     try:
-        # Check for Yahoo Mail specific logged-in indicators
-        logged_in_indicators = [
-            '[data-test-id="app-canvas"]',  # Yahoo Mail main canvas
-            'button[data-test-id="compose-button"]',  # Compose button
-            '[aria-label*="Inbox"]',  # Inbox label
-            'button[aria-label*="Settings"]',  # Settings button
-            '[data-test-id="message-list"]',  # Message list
-        ]
-
-        for selector in logged_in_indicators:
+        for selector in LOGGED_IN_INDICATORS:
             if page.query_selector(selector):
                 return True
 
@@ -72,17 +79,17 @@ def accept_cookies(page):
         '[class*="consent-accept"]'
     ]
 
-    for selector in cookie_selectors:
+    # One deadline for all candidates instead of one check per selector
+    selector, element = wait_for_any(page, cookie_selectors, "cookie banner", timeout=3)
+    if element:
         try:
-            element = page.query_selector(selector)
-            if element and element.is_visible():
-                print(f"✓ Found cookie consent button: {selector}")
-                element.click()
-                time.sleep(2)
-                print("✓ Cookie consent accepted")
-                return True
+            print(f"✓ Found cookie consent button: {selector}")
+            element.click()
+            wait_for_hidden(page, selector, "cookie banner dismissed", timeout=5)
+            print("✓ Cookie consent accepted")
+            return True
         except:
-            continue
+            pass
 
     print("ℹ️  No cookie consent banner found (or already accepted)")
     return False
@@ -109,19 +116,25 @@ def main():
             # Path to your Chrome browser
             chrome_path = "/mnt/c/Program Files/Google/Chrome/Application/chrome.exe"
 
-            browser = p.chromium.launch(
-                executable_path=chrome_path,
-                **browser_args
-            )
+            with span("browser launch", executable=chrome_path):
+                browser = p.chromium.launch(
+                    executable_path=chrome_path,
+                    **browser_args
+                )
             print("✓ Chrome browser launched successfully!")
         except Exception as e:
             print(f"⚠️  Could not launch Chrome at {chrome_path}")
             print(f"   Error: {e}")
             print("   Trying default Chromium...")
-            browser = p.chromium.launch(**browser_args)
-
-        # Create browser context with larger viewport
-        context = browser.new_context(
+            with span("browser launch", executable="chromium"):
+                browser = p.chromium.launch(**browser_args)
+
+        # Create browser context with larger viewport, restoring any saved login
+        if session_store.load_session(SESSION_NAME):
+            print("🔑 Restoring saved Yahoo session...")
+        context = session_store.new_context(
+            browser,
+            SESSION_NAME,
             viewport={'width': 1920, 'height': 1080},
             user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         )
@@ -136,11 +149,14 @@ def main():
         print("📬 Navigating to Yahoo Mail...")
 
         try:
-            page.goto("https://mail.yahoo.com", wait_until='domcontentloaded', timeout=30000)
-            time.sleep(5)  # Give page time to load
+            with span("navigate", url="https://mail.yahoo.com"):
+                page.goto("https://mail.yahoo.com", wait_until='domcontentloaded', timeout=30000)
+
+            # Ready once we see either the inbox or a login form
+            wait_until("mail page ready", lambda: is_logged_in(page) or is_login_page(page), timeout=10)
 
-            # Check if already logged in
-            if is_logged_in(page):
+            # Check if already logged in (one quick check for restored sessions)
+            if is_logged_in(page) or session_store.confirm_session(page, LOGGED_IN_INDICATORS, timeout=2):
                 print("✅ Already logged in! Inbox opened successfully!")
                 print("\n" + "="*60)
                 print("🎉 SUCCESS - You're in your Yahoo Mail inbox!")
@@ -158,14 +174,11 @@ def main():
         except Exception as e:
             print(f"⚠️  Error loading Yahoo Mail: {e}")
 
-        time.sleep(3)
-
         # STEP 2: Accept cookies if present
         print("\n" + "="*60)
         print("STEP 2: Handling cookie consent...")
         print("="*60)
         accept_cookies(page)
-        time.sleep(2)
 
         # STEP 3: Check if we need to sign in
         print("\n" + "="*60)
@@ -184,23 +197,22 @@ def main():
                 '[data-ylk*="sign"]'
             ]
 
+            # Race all candidates under one 3 s deadline (was 3 s per selector)
             clicked = False
-            for selector in sign_in_selectors:
+            selector, element = wait_for_any(page, sign_in_selectors, "sign-in button", timeout=3)
+            if element:
                 try:
-                    element = page.wait_for_selector(selector, timeout=3000)
-                    if element and element.is_visible():
-                        print(f"✓ Found sign in button: {selector}")
-                        element.click()
-                        clicked = True
-                        time.sleep(3)
-                        break
+                    print(f"✓ Found sign in button: {selector}")
+                    old_url = page.url
+                    element.click()
+                    clicked = True
+                    wait_for_url_change(page, old_url, "sign-in navigation", timeout=10)
                 except:
-                    continue
+                    pass
 
             if not clicked:
                 print("⚠️  Could not find sign in button automatically")
                 print("📌 Please click 'Sign In' manually in the browser window")
-                time.sleep(5)
 
         # STEP 4: Wait for manual login with verification code support
         if is_login_page(page) or not is_logged_in(page):
@@ -218,39 +230,17 @@ def main():
             print("💡 Take your time - the script will wait for verification codes!\n")
 
             # Extended timeout for verification code entry
-            start_time = time.time()
             timeout = 600  # 10 minutes for verification code
 
-            check_count = 0
-            while time.time() - start_time < timeout:
-                try:
-                    if is_logged_in(page):
-                        print("\n✅ Login successful! Inbox detected!")
-                        break
-
-                    # Check if URL indicates successful login
-                    if "mail.yahoo.com/d/" in page.url:
-                        print("\n✅ Successfully navigated to inbox!")
-                        break
-
-                    # Also check if no longer on login page
-                    if not is_login_page(page) and "mail.yahoo.com" in page.url:
-                        time.sleep(3)  # Give it time to fully load
-                        if is_logged_in(page):
-                            print("\n✅ Login successful!")
-                            break
-
-                    # Progress indicator every 30 seconds
-                    check_count += 1
-                    if check_count % 15 == 0:  # Every 30 seconds (15 * 2 sec)
-                        elapsed = int(time.time() - start_time)
-                        remaining = timeout - elapsed
-                        print(f"⏳ Still waiting... ({remaining//60}m {remaining%60}s remaining)")
-
-                    time.sleep(2)  # Check every 2 seconds
-                except Exception as e:
-                    print(f"⚠️  Check error (continuing): {e}")
-                    time.sleep(2)
+            def report(remaining):
+                print(f"⏳ Still waiting... ({remaining//60}m {remaining%60}s remaining)")
+
+            # is_logged_in also covers the mail.yahoo.com/d/ inbox URL
+            if wait_until("login", lambda: is_logged_in(page), timeout=timeout,
+                          interval=0.5, progress=report):
+                print("\n✅ Login successful! Inbox detected!")
+                session_store.save_session(context, SESSION_NAME)
+                print("🔑 Session saved - next run will skip login")
             else:
                 print("\n⏱️  Timeout waiting for login (10 minutes elapsed)")
                 print("💡 Keeping browser open in case you're still logging in...")
@@ -273,6 +263,8 @@ def main():
         except Exception as e:
             print(f"ℹ️  {e}")
 
+        print_step_timings()
+
         # Keep browser open for user interaction
         print("\n💡 Browser will stay open for 5 minutes...")
         print("   (You can close it manually or wait)")
@@ -11,27 +11,75 @@ This script:
 
 from playwright.sync_api import sync_playwright
 import time
-import subprocess
 import os
 
-def print_step(step, message, status=""):
-    """Print formatted step message"""
-    icons = {"info": "ℹ️", "success": "✅", "wait": "⏳", "work": "🔧", "search": "🔍"}
-    icon = icons.get(status, "▶️")
-    print(f"{icon} [{step}] {message}")
+import browser_broker
+from browser_waits import (wait_until, wait_for_visible, probe_counts, messages_affected,
+                           wait_for_list_change, print_step_timings)
+from request_blocker import install_request_blocking, remove_request_blocking, print_blocking_report
+import screenshot_ring
+from selector_resolver import click_first
+from session_store import restore_session, save_session, confirm_session
+from step_trace import (print_step, span, traced, start_playwright_trace,
+                        stop_playwright_trace)
+
+SESSION_NAME = "yahoo"
+
+# Elements only present in a logged-in Yahoo Mail
+LOGIN_INDICATORS = [
+    '[data-test-id="app-canvas"]',  # Yahoo Mail main canvas
+    'button[data-test-id="compose-button"]',  # Compose button
+    '[aria-label*="mailbox"]',  # Mailbox elements
+    'button[aria-label*="Settings"]'  # Settings button
+]
+
+# Message list rows
+ROW_SELECTOR = '[data-test-id="message-list-item"]'
+
+# Empty search results / empty folder placeholder
+EMPTY_SELECTOR = '[data-test-id="empty-folder"], [data-test-id="search-no-results"]'
+
+# Yahoo shows no result total in search, so verification counts rows
+COUNT_SELECTOR = None
+
+# Toolbar selectors, tried in order
+SELECT_ALL_SELECTORS = [
+    'input[type="checkbox"][aria-label*="Select"]',
+    'button[aria-label*="Select all"]',
+    '[data-test-id="select-all-checkbox"]',
+    'input[data-test-id="bulk-action-checkbox"]',
+    'span[role="checkbox"]',
+    'input[type="checkbox"]'
+]
+
+# "Select all X conversations" link shown after the checkbox is clicked
+SELECT_MORE_SELECTOR = 'button:has-text("Select all"), a:has-text("Select all")'
+
+SPAM_SELECTORS = [
+    'button[data-test-id="spam-button"]',
+    'button[aria-label*="Spam"]',
+    'button[title*="Spam"]',
+    'button:has-text("Spam")',
+    '[data-test-id="toolbar-spam"]'
+]
+
+DELETE_SELECTORS = [
+    'button[data-test-id="toolbar-delete"]',
+    'button[aria-label*="Delete"]',
+    'button[title*="Delete"]',
+    'button:has-text("Delete")'
+]
+
+# Keyboard shortcuts; Yahoo has no spam shortcut, so spam always clicks
+SELECT_ALL_SHORTCUT = ['Control+a']
+DELETE_SHORTCUT = ['Delete']
+SPAM_SHORTCUT = None
 
 def is_logged_in(page):
     """Check if user is logged in to Yahoo Mail"""
     try:
         # Check for common Yahoo Mail logged-in indicators
-        indicators = [
-            '[data-test-id="app-canvas"]',  # Yahoo Mail main canvas
-            'button[data-test-id="compose-button"]',  # Compose button
-            '[aria-label*="mailbox"]',  # Mailbox elements
-            'button[aria-label*="Settings"]'  # Settings button
-        ]
-
-        for selector in indicators:
+        for selector in LOGIN_INDICATORS:
             if page.query_selector(selector):
                 return True
 
@@ -43,8 +91,14 @@ def is_logged_in(page):
     except:
         return False
 
+@traced("login wait")
 def wait_for_login(page, timeout=300):
     """Wait for user to complete manual login"""
+    # A restored session only needs one quick check
+    if confirm_session(page, LOGIN_INDICATORS):
+        print_step("LOGIN", "Session still valid - skipping login", "success")
+        return True
+
     print_step("LOGIN", "Please login to Yahoo Mail in the browser window", "wait")
     print("\n📋 Login steps:")
     print("   1. Enter your email/username")
@@ -52,25 +106,15 @@ def wait_for_login(page, timeout=300):
     print("   3. Complete any 2FA/verification")
     print(f"\n⏳ Waiting up to {timeout//60} minutes for login...\n")
 
-    start_time = time.time()
-
-    while time.time() - start_time < timeout:
-        if is_logged_in(page):
-            print_step("LOGIN", "Login successful!", "success")
-            return True
-
-        # Check if URL changed away from login
-        if "mail.yahoo.com" in page.url and "login" not in page.url.lower():
-            time.sleep(2)  # Give it a moment to load
-            if is_logged_in(page):
-                print_step("LOGIN", "Login successful!", "success")
-                return True
-
-        time.sleep(2)
+    if wait_until("login", lambda: is_logged_in(page), timeout=timeout, interval=0.5, page=page):
+        print_step("LOGIN", "Login successful!", "success")
+        save_session(page.context, SESSION_NAME)
+        return True
 
     print_step("LOGIN", "Login timeout reached", "info")
     return False
 
+@traced("search")
 def search_for_skyscanner(page):
     """Search for Skyscanner emails"""
     print_step("SEARCH", "Searching for Skyscanner emails...", "search")
@@ -80,8 +124,10 @@ def search_for_skyscanner(page):
         search_url = "https://mail.yahoo.com/d/search/keyword=from%253Askyscanner"
         page.goto(search_url, wait_until='domcontentloaded')
 
-        # Wait for search results to load
-        time.sleep(3)
+        # Wait for the first result row instead of a fixed pause
+        if not wait_for_visible(page, ROW_SELECTOR, "search results", timeout=15):
+            print_step("SEARCH", "No result rows appeared", "info")
+            return False
 
         print_step("SEARCH", "Search page loaded", "success")
         return True
@@ -89,39 +135,24 @@ def search_for_skyscanner(page):
         print_step("SEARCH", f"Error: {e}", "info")
         return False
 
+@traced("select")
 def select_all_emails(page):
     """Select all emails in the current view"""
     print_step("SELECT", "Selecting all emails...", "work")
 
     try:
-        # Try different selectors for "Select All" checkbox
-        select_all_selectors = [
-            'input[type="checkbox"][aria-label*="Select"]',
-            'button[aria-label*="Select all"]',
-            '[data-test-id="select-all-checkbox"]',
-            'input[data-test-id="bulk-action-checkbox"]',
-            'span[role="checkbox"]',
-            'input[type="checkbox"]'
-        ]
-
-        for selector in select_all_selectors:
-            element = page.query_selector(selector)
-            if element:
-                try:
-                    element.click()
-                    time.sleep(1)
-                    print_step("SELECT", f"Clicked select all using: {selector}", "success")
-
-                    # Check if there's a "Select all X conversations" link
-                    select_more = page.query_selector('button:has-text("Select all"), a:has-text("Select all")')
-                    if select_more:
-                        select_more.click()
-                        time.sleep(1)
-                        print_step("SELECT", "Selected ALL conversations (not just visible)", "success")
-
-                    return True
-                except:
-                    continue
+        # Resolve the "Select All" checkbox in one round trip, learned order first
+        selector = click_first(page, "select_all", SELECT_ALL_SELECTORS)
+        if selector:
+            print_step("SELECT", f"Clicked select all using: {selector}", "success")
+
+            # Check if there's a "Select all X conversations" link
+            select_more = wait_for_visible(page, SELECT_MORE_SELECTOR, "select-more link", timeout=2)
+            if select_more:
+                select_more.click()
+                print_step("SELECT", "Selected ALL conversations (not just visible)", "success")
+
+            return True
 
         print_step("SELECT", "Could not find select all checkbox", "info")
         return False
@@ -130,37 +161,43 @@ def select_all_emails(page):
         print_step("SELECT", f"Error: {e}", "info")
         return False
 
+@traced("action")
 def mark_as_spam(page):
-    """Mark selected emails as spam"""
+    """Mark selected emails as spam.
+
+    Returns True if messages moved, False if the button was clicked but
+    nothing moved, None if the button was not found (or an error).
+    """
     print_step("SPAM", "Marking emails as spam...", "work")
 
     try:
-        # Try different selectors for spam button
-        spam_selectors = [
-            'button[data-test-id="spam-button"]',
-            'button[aria-label*="Spam"]',
-            'button[title*="Spam"]',
-            'button:has-text("Spam")',
-            '[data-test-id="toolbar-spam"]'
-        ]
-
-        for selector in spam_selectors:
-            element = page.query_selector(selector)
-            if element:
-                try:
-                    element.click()
-                    time.sleep(1)
-                    print_step("SPAM", "Clicked spam button!", "success")
-                    return True
-                except:
-                    continue
+        # The toolbar enables its action buttons once something is selected
+        wait_for_visible(page, ', '.join(SPAM_SELECTORS), "spam button", timeout=5)
+        before = probe_counts(page, ROW_SELECTOR, COUNT_SELECTOR)
+        started = time.monotonic()
+
+        # Resolve the spam button in one round trip, learned order first
+        if click_first(page, "spam", SPAM_SELECTORS):
+            with span("verify") as verify:
+                changed = wait_for_list_change(page, ROW_SELECTOR, before, "spam: list refresh",
+                                               timeout=10, count_selector=COUNT_SELECTOR)
+                after = probe_counts(page, ROW_SELECTOR, COUNT_SELECTOR)
+                affected = messages_affected(before, after)
+                seconds = time.monotonic() - started
+                verify.update(changed=changed, affected=affected,
+                              msgs_per_sec=round(affected / seconds, 1) if seconds else None)
+            if not affected:
+                print_step("SPAM", "Clicked spam, but no messages were moved", "info")
+                return False
+            print_step("SPAM", f"Moved {affected} messages to spam ({affected / seconds:.1f} msgs/s)", "success")
+            return True
 
         print_step("SPAM", "Could not find spam button - may need to do manually", "info")
-        return False
+        return None
 
     except Exception as e:
         print_step("SPAM", f"Error: {e}", "info")
-        return False
+        return None
 
 def main():
     """Main automation function"""
@@ -181,96 +218,64 @@ def main():
     """)
 
     with sync_playwright() as p:
-        # Launch browser using remote debugging
-        print_step("BROWSER", "Launching Windows Chrome from WSL...", "info")
-
-        # Kill any existing Chrome instances to start fresh
+        # Attach to the broker Chrome (launched only if it is not running yet)
+        print_step("BROWSER", "Attaching to Windows Chrome from WSL...", "info")
         try:
-            subprocess.run(['taskkill.exe', '/F', '/IM', 'chrome.exe'],
-                         stderr=subprocess.DEVNULL, stdout=subprocess.DEVNULL)
-            time.sleep(1)
-        except:
-            pass
-
-        # Launch Chrome using PowerShell with remote debugging enabled
-        chrome_exe = 'C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe'
-        ps_command = f'Start-Process -FilePath "{chrome_exe}" -ArgumentList "--remote-debugging-port=9222","--user-data-dir=C:\\temp\\chrome-debug","--no-first-run","--no-default-browser-check"'
-
-        try:
-            subprocess.Popen(['powershell.exe', '-Command', ps_command],
-                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            print_step("BROWSER", "Chrome process started, waiting for debugging port...", "info")
-
-            # Wait for Chrome to be ready (retry connection)
-            browser = None
-            for attempt in range(10):
-                try:
-                    time.sleep(2)
-                    browser = p.chromium.connect_over_cdp("http://localhost:9222")
-                    print_step("BROWSER", "Connected to Windows Chrome!", "success")
-                    break
-                except Exception as retry_error:
-                    if attempt < 9:
-                        print(f"   Retry {attempt + 1}/10...")
-                    else:
-                        raise retry_error
-
-            if not browser:
-                raise Exception("Failed to connect to Chrome after 10 attempts")
-
+            browser = browser_broker.ensure_browser(p)
         except Exception as e:
             print_step("BROWSER", f"Could not launch/connect to Chrome: {e}", "info")
-            print_step("BROWSER", "ERROR: Make sure Chrome is not already running", "info")
             raise
 
-        # Get the default context (Chrome already running)
-        contexts = browser.contexts
-        if contexts:
-            context = contexts[0]
-        else:
-            context = browser.new_context(
-                viewport={'width': 1400, 'height': 900}
-            )
-
-        # Open Yahoo Mail in first page
-        page = context.new_page()
-        print_step("NAVIGATE", "Opening Yahoo Mail...", "info")
-        page.goto("https://mail.yahoo.com", wait_until='domcontentloaded')
-        time.sleep(2)
+        # Reuse the logged-in context and any idle tabs from earlier runs
+        context = browser_broker.get_context(browser)
+
+        # Skip images, fonts, ads and trackers on the mail and Scholar tabs
+        block_stats = install_request_blocking(context)
+        start_playwright_trace(context)
+
+        # Restore the saved login before the first navigation
+        if restore_session(context, SESSION_NAME):
+            print_step("LOGIN", "Restored saved session", "info")
+
+        page = browser_broker.acquire_tab(context, "https://mail.yahoo.com")
+        screenshot_ring.watch_page(page)
+        if not page.url.startswith("https://mail.yahoo.com"):
+            print_step("NAVIGATE", "Opening Yahoo Mail...", "info")
+            with span("navigate", url="https://mail.yahoo.com"):
+                page.goto("https://mail.yahoo.com", wait_until='domcontentloaded')
         print_step("NAVIGATE", "Yahoo Mail loaded", "success")
 
-        # Open Google Scholar in second page
-        scholar_page = context.new_page()
-        print_step("NAVIGATE", "Opening Google Scholar...", "info")
-        scholar_page.goto("https://scholar.google.com/", wait_until='domcontentloaded')
-        time.sleep(2)
+        scholar_page = browser_broker.acquire_tab(context, "https://scholar.google.com")
+        if not scholar_page.url.startswith("https://scholar.google.com"):
+            print_step("NAVIGATE", "Opening Google Scholar...", "info")
+            with span("navigate", url="https://scholar.google.com/"):
+                scholar_page.goto("https://scholar.google.com/", wait_until='domcontentloaded')
         print_step("NAVIGATE", "Google Scholar loaded", "success")
 
         # Switch back to Yahoo Mail page for login and automation
         page.bring_to_front()
-        time.sleep(1)
 
         # Wait for manual login
         if not wait_for_login(page, timeout=300):
             print("\n⚠️  Login not detected. Please ensure you're logged in.")
             print("   Press Ctrl+C to exit or wait for manual continuation...")
-            time.sleep(10)
-
-        time.sleep(2)
+            page.wait_for_timeout(10000)
 
         # Search for Skyscanner emails
         if search_for_skyscanner(page):
-            time.sleep(3)
-
             # Select all emails
             if select_all_emails(page):
-                time.sleep(2)
-
                 # Mark as spam
-                if mark_as_spam(page):
+                moved = mark_as_spam(page)
+                if moved:
                     print("\n" + "="*60)
                     print("🎉 SUCCESS! Skyscanner emails marked as spam!")
                     print("="*60)
+                elif moved is False:
+                    print("\n" + "="*60)
+                    print("⚠️  Clicked 'Spam', but no emails were moved.")
+                    print("   Check the selection in the browser and click 'Spam' again.")
+                    print("="*60)
                 else:
                     print("\n" + "="*60)
                     print("⚠️  Could not find spam button automatically.")
@@ -285,17 +290,23 @@ def main():
                 print("   3. Click the 'Spam' button")
                 print("="*60)
 
+        print_step_timings()
+        print_blocking_report(block_stats)
+        stop_playwright_trace(context)
+
+        # Hand the tabs back unblocked: route handlers stall while we wait
+        remove_request_blocking(context)
+
         # Keep browser open for user to verify
         print("\n💡 Browser will stay open for 30 seconds for you to verify...")
         print("   (Close manually or wait)")
         time.sleep(30)
 
-        # Cleanup
+        # Cleanup: hand the tabs back to the broker and detach
         print("\n🧹 Disconnecting from browser...")
-        try:
-            browser.close()
-        except:
-            pass
+        browser_broker.release_tab(page)
+        browser_broker.release_tab(scholar_page)
+        browser_broker.detach(browser)
         print("✨ Done! (Chrome will remain open)")
 
 if __name__ == "__main__":
@@ -15,14 +15,20 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
 import time
 
-def print_step(step, message, status=""):
-    """Print formatted step message"""
-    icons = {"info": "ℹ️", "success": "✅", "wait": "⏳", "work": "🔧", "search": "🔍"}
-    icon = icons.get(status, "▶️")
-    print(f"{icon} [{step}] {message}")
+from browser_broker import LEAN_FLAGS
+from browser_waits import (wait_until, wait_for_css_visible, wait_for_xpath_visible,
+                           wait_for_driver_row_count_change, print_step_timings)
+from driver_cache import resolve_driver
+from step_trace import print_step, span, traced, annotate
+
+# Gmail message list rows
+ROW_SELECTOR = 'tr.zA'
+
+# Managed profile of its own (the broker Chrome holds PROFILE_DIR), so the
+# HTTP cache and login survive between runs instead of starting fresh
+SELENIUM_PROFILE_DIR = 'C:\\chrome-automation\\selenium-profile'
 
 def is_logged_in(driver):
     """Check if user is logged in to Gmail"""
@@ -50,6 +56,7 @@ def is_logged_in(driver):
     except:
         return False
 
+@traced("login wait")
 def wait_for_login(driver, timeout=300):
     """Wait for user to complete manual login"""
     print_step("LOGIN", "Please login to Gmail in the browser window", "wait")
@@ -60,25 +67,14 @@ def wait_for_login(driver, timeout=300):
     print("   4. Complete any 2FA if required")
     print(f"\n⏳ Waiting up to {timeout//60} minutes for login...\n")
 
-    start_time = time.time()
-
-    while time.time() - start_time < timeout:
-        if is_logged_in(driver):
-            print_step("LOGIN", "Login successful!", "success")
-            return True
-
-        # Check if URL changed away from login
-        if "mail.google.com" in driver.current_url and "signin" not in driver.current_url.lower():
-            time.sleep(2)
-            if is_logged_in(driver):
-                print_step("LOGIN", "Login successful!", "success")
-                return True
-
-        time.sleep(2)
+    if wait_until("login", lambda: is_logged_in(driver), timeout=timeout, interval=0.5):
+        print_step("LOGIN", "Login successful!", "success")
+        return True
 
     print_step("LOGIN", "Login timeout reached", "info")
     return False
 
+@traced("search")
 def search_for_skyscanner(driver):
     """Search for Skyscanner emails"""
     print_step("SEARCH", "Searching for no-reply@sender.skyscanner.com emails...", "search")
@@ -87,7 +83,11 @@ def search_for_skyscanner(driver):
         # Navigate to search with query
         search_url = "https://mail.google.com/mail/u/0/#search/from%3Ano-reply%40sender.skyscanner.com"
         driver.get(search_url)
-        time.sleep(5)
+
+        # Wait for the first result row instead of a fixed pause
+        if not wait_for_css_visible(driver, ROW_SELECTOR, "search results", timeout=15):
+            print_step("SEARCH", "No result rows appeared", "info")
+            return False
 
         print_step("SEARCH", "Search page loaded", "success")
         return True
@@ -95,6 +95,7 @@ def search_for_skyscanner(driver):
         print_step("SEARCH", f"Error: {e}", "info")
         return False
 
+@traced("select")
 def select_all_emails(driver):
     """Select all emails in the current view"""
     print_step("SELECT", "Selecting all emails...", "work")
@@ -113,17 +114,18 @@ def select_all_emails(driver):
             try:
                 element = driver.find_element(By.CSS_SELECTOR, selector)
                 element.click()
-                time.sleep(1)
+                annotate(selector=selector)
                 print_step("SELECT", f"Clicked select all using: {selector}", "success")
 
                 # Check if there's a "Select all conversations that match this search" link
-                try:
-                    select_more = driver.find_element(By.XPATH, "//span[contains(text(), 'Select all')]")
-                    select_more.click()
-                    time.sleep(1)
-                    print_step("SELECT", "Selected ALL matching conversations", "success")
-                except:
-                    pass
+                select_more = wait_for_xpath_visible(driver, "//span[contains(text(), 'Select all')]",
+                                                     "select-more link", timeout=2)
+                if select_more:
+                    try:
+                        select_more.click()
+                        print_step("SELECT", "Selected ALL matching conversations", "success")
+                    except:
+                        pass
 
                 return True
             except:
@@ -136,6 +138,7 @@ def select_all_emails(driver):
         print_step("SELECT", f"Error: {e}", "info")
         return False
 
+@traced("action")
 def delete_emails(driver):
     """Delete selected emails"""
     print_step("DELETE", "Deleting emails...", "work")
@@ -150,11 +153,17 @@ def delete_emails(driver):
             'button[aria-label="Delete"]'
         ]
 
+        # The delete button only appears once something is selected
+        wait_for_css_visible(driver, ', '.join(delete_selectors), "delete button", timeout=5)
+        before = driver.execute_script("return document.querySelectorAll(arguments[0]).length;", ROW_SELECTOR)
+
         for selector in delete_selectors:
             try:
                 element = driver.find_element(By.CSS_SELECTOR, selector)
                 element.click()
-                time.sleep(1)
+                annotate(selector=selector)
+                with span("verify"):
+                    wait_for_driver_row_count_change(driver, ROW_SELECTOR, before, "delete: list refresh")
                 print_step("DELETE", "Clicked delete button!", "success")
                 return True
             except:
@@ -164,7 +173,9 @@ def delete_emails(driver):
         try:
             element = driver.find_element(By.XPATH, "//div[@aria-label='Delete' or @data-tooltip='Delete']")
             element.click()
-            time.sleep(1)
+            annotate(selector="xpath: Delete")
+            with span("verify"):
+                wait_for_driver_row_count_change(driver, ROW_SELECTOR, before, "delete: list refresh")
             print_step("DELETE", "Clicked delete button!", "success")
             return True
         except:
@@ -206,15 +217,19 @@ def main():
     chrome_options.add_argument("--remote-debugging-port=9223")
     chrome_options.add_argument("--start-maximized")
     chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+    chrome_options.add_argument(f"--user-data-dir={SELENIUM_PROFILE_DIR}")
+    for flag in LEAN_FLAGS:
+        chrome_options.add_argument(flag)
 
     # Set WSL-specific preferences
     chrome_options.add_experimental_option("excludeSwitches", ["enable-logging"])
 
     print_step("BROWSER", "Setting up ChromeDriver...", "info")
 
-    # Create driver with webdriver-manager
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=chrome_options)
+    # Driver comes from the local cache; only a new Chrome version downloads
+    with span("browser launch"):
+        service = Service(resolve_driver())
+        driver = webdriver.Chrome(service=service, options=chrome_options)
 
     print_step("BROWSER", "Launching Windows Chrome from WSL...", "info")
 
@@ -223,8 +238,8 @@ def main():
 
         # Open Gmail
         print_step("NAVIGATE", "Opening Gmail...", "info")
-        driver.get("https://mail.google.com/mail/u/0/#inbox")
-        time.sleep(3)
+        with span("navigate", url="https://mail.google.com/mail/u/0/#inbox"):
+            driver.get("https://mail.google.com/mail/u/0/#inbox")
         print_step("NAVIGATE", "Gmail loaded", "success")
 
         # Wait for manual login
@@ -233,16 +248,10 @@ def main():
             print("   Press Ctrl+C to exit or wait for manual continuation...")
             time.sleep(10)
 
-        time.sleep(2)
-
         # Search for Skyscanner emails
         if search_for_skyscanner(driver):
-            time.sleep(3)
-
             # Select all emails
             if select_all_emails(driver):
-                time.sleep(2)
-
                 # Delete emails
                 if delete_emails(driver):
                     print("\n" + "="*60)
@@ -262,6 +271,8 @@ def main():
                 print("   3. Click the 'Delete' button (trash icon)")
                 print("="*60)
 
+        print_step_timings()
+
         # Keep browser open for user to verify
         print("\n💡 Browser will stay open for 60 seconds for you to verify...")
         print("   (Close manually or wait)")